@@ -0,0 +1,201 @@
+"""Durable SQLite checkpoints for the travel planning workflow."""
+
+import os
+import time
+import asyncio
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from loguru import logger
+from typing import Optional
+
+
+CHECKPOINTS_ENABLED = os.getenv("TRAVEL_CHECKPOINTS_ENABLED", "true").lower() == "true"
+
+
+class CheckpointStore:
+    """
+    SQLite-backed LangGraph checkpointer with TTL expiry and compaction.
+
+    Checkpoints are stored per thread, and the workflow uses the trip_plan_id
+    as the thread ID. A side table records when each thread last ran, which
+    graph mode it used and whether it finished cleanly, so maintenance can:
+
+    - expire threads that have not run for longer than the TTL
+    - compact finished threads down to their latest checkpoints (failed
+      threads keep their history so a retry can resume from it)
+    """
+
+    def __init__(self):
+        self.path = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+        self.ttl_seconds = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+        self.keep_last = int(os.getenv("CHECKPOINT_KEEP_LAST", "1"))
+        self.maintenance_interval = int(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL", "600"))
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._saver: Optional[AsyncSqliteSaver] = None
+        self._init_lock = asyncio.Lock()
+        self._last_maintenance = 0.0
+
+    async def get_saver(self) -> AsyncSqliteSaver:
+        """Get the shared checkpointer, opening the database on first use."""
+        if self._saver is not None:
+            return self._saver
+
+        async with self._init_lock:
+            if self._saver is None:
+                logger.info(f"Opening checkpoint store: {self.path}")
+                self._conn = await aiosqlite.connect(self.path)
+                await self._conn.execute("PRAGMA journal_mode=WAL")
+                saver = AsyncSqliteSaver(self._conn)
+                await saver.setup()
+                await self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS thread_activity (
+                        thread_id TEXT PRIMARY KEY,
+                        mode TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+                await self._conn.commit()
+                self._saver = saver
+        return self._saver
+
+    async def get_thread_mode(self, thread_id: str) -> Optional[str]:
+        """Get the graph mode a thread was last run with, if any."""
+        saver = await self.get_saver()
+        async with saver.lock:
+            async with self._conn.execute(
+                "SELECT mode FROM thread_activity WHERE thread_id = ?", (thread_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def record_run(self, thread_id: str, mode: str, status: str):
+        """
+        Record that a thread ran.
+
+        Args:
+            thread_id: Workflow thread ID (trip_plan_id)
+            mode: Graph mode used for the run
+            status: "completed" or "failed"
+        """
+        saver = await self.get_saver()
+        async with saver.lock:
+            await self._conn.execute(
+                """
+                INSERT INTO thread_activity (thread_id, mode, status, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET
+                    mode = excluded.mode,
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                (thread_id, mode, status, time.time()),
+            )
+            await self._conn.commit()
+
+    async def delete_thread(self, thread_id: str):
+        """Delete every checkpoint of a thread."""
+        saver = await self.get_saver()
+        async with saver.lock:
+            await self._delete_threads([thread_id])
+            await self._conn.commit()
+
+    async def expire(self) -> int:
+        """
+        Delete threads that have not run within the TTL.
+
+        Returns:
+            Number of threads deleted
+        """
+        saver = await self.get_saver()
+        cutoff = time.time() - self.ttl_seconds
+        async with saver.lock:
+            async with self._conn.execute(
+                "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (cutoff,)
+            ) as cursor:
+                thread_ids = [row[0] for row in await cursor.fetchall()]
+            await self._delete_threads(thread_ids)
+            await self._conn.commit()
+
+        if thread_ids:
+            logger.info(f"Expired {len(thread_ids)} checkpoint threads")
+        return len(thread_ids)
+
+    async def compact(self) -> int:
+        """
+        Keep only the latest checkpoints of completed threads.
+
+        Returns:
+            Number of checkpoint rows deleted
+        """
+        saver = await self.get_saver()
+        deleted = 0
+        async with saver.lock:
+            async with self._conn.execute(
+                "SELECT thread_id FROM thread_activity WHERE status = 'completed'"
+            ) as cursor:
+                thread_ids = [row[0] for row in await cursor.fetchall()]
+
+            for thread_id in thread_ids:
+                cursor = await self._conn.execute(
+                    """
+                    DELETE FROM checkpoints
+                    WHERE thread_id = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints
+                        WHERE thread_id = ?
+                        ORDER BY checkpoint_id DESC
+                        LIMIT ?
+                    )
+                    """,
+                    (thread_id, thread_id, self.keep_last),
+                )
+                deleted += cursor.rowcount
+                await self._conn.execute(
+                    """
+                    DELETE FROM writes
+                    WHERE thread_id = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?
+                    )
+                    """,
+                    (thread_id, thread_id),
+                )
+            await self._conn.commit()
+
+            if deleted:
+                await self._conn.execute("VACUUM")
+
+        if deleted:
+            logger.info(f"Compacted {deleted} checkpoints from {len(thread_ids)} completed threads")
+        return deleted
+
+    async def maybe_maintain(self):
+        """Run expiry and compaction if the maintenance interval has passed."""
+        now = time.time()
+        if now - self._last_maintenance < self.maintenance_interval:
+            return
+        self._last_maintenance = now
+
+        try:
+            await self.expire()
+            await self.compact()
+        except Exception as e:
+            logger.warning(f"Checkpoint maintenance failed: {e}")
+
+    async def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            await self._conn.close()
+        self._conn = None
+        self._saver = None
+
+    async def _delete_threads(self, thread_ids):
+        for thread_id in thread_ids:
+            await self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            await self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            await self._conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+
+
+# Global checkpoint store instance
+checkpoint_store = CheckpointStore()
@@ -1,320 +1,749 @@
-"""LangGraph nodes for the three travel planning agents."""
+"""LangGraph nodes for the three travel planning agents.
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.agents import create_agent
+Each node returns a partial state update rather than the mutated state, so
+the same nodes work in both the sequential and the parallel (fan-out) graph.
+
+Every node has a sync version and an async version (prefixed with ``a``).
+The async nodes use ``ainvoke`` end to end and run the blocking tools on the
+bounded tool executor, so many workflows can share one event loop. Agents
+and their model clients come from the process-level registry.
+"""
+
+import re
+import asyncio
+import copy
+import traceback
+from typing import Any, Callable, Dict, Optional
+from pydantic import BaseModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from agents.langgraph_state import TravelPlanState
-from config.llm import get_bedrock_model, invoke_agent_with_retry
-from tools.duckduckgo_search import duckduckgo_search, duckduckgo_destination_search
+from agents.registry import get_agent
+from agents.structured_output import PLAN_RESPONSE_FORMAT, render_itinerary, render_budget_analysis
+from config.llm import invoke_agent_with_retry, ainvoke_agent_with_retry, DeadlineExceeded
+from config.deadlines import deadline_config, remaining_seconds
+from config.llm_cache import llm_cache_scope
+from config.prompt_cache import cached_text
+from config.model_routing import model_router, estimate_prompt_tokens
+from config.token_budget import planning_context_budget, planning_max_tokens, CONTEXT_SUMMARY_TIMEOUT_SECONDS
+from tools.duckduckgo_search import duckduckgo_search, duckduckgo_destination_search, duckduckgo_batch_search
 from tools.wikipedia_search import wikipedia_search, wikipedia_destination_info
 from tools.free_scraper import scrape_website
-from tools.google_flight import get_google_flights
+from tools.google_flight import get_google_flights, get_flexible_flights
 from tools.kayak_hotel import kayak_hotel_url_generator, search_kayak_hotels
+from tools.executor import with_tool_executor_all, get_tool_executor, run_in_tool_executor
+from tools.singleflight import get_single_flight, normalize_arg
+from tools.concurrency import tool_concurrency_scope
+from models.travel_plan import TravelPlanTeamResponse
 from loguru import logger
 
 
-def research_discovery_node(state: TravelPlanState) -> TravelPlanState:
-    """
-    Node 1: Research & Discovery Agent
-    Combines Destination Explorer + Dining Agent
-    Uses free APIs: DuckDuckGo, Wikipedia
-    """
-    logger.info("Running Research & Discovery Agent node")
-    
-    try:
-        # Get Bedrock model
-        model = get_bedrock_model(temperature=0.3, max_tokens=4096)
-        
-        # Tools are already LangChain tools (decorated with @tool), use them directly
-        tools = [
-            duckduckgo_destination_search,
-            wikipedia_destination_info,
-            duckduckgo_search,
-        ]
-        
-        # Create messages with tool descriptions
-        system_prompt = """You are a Research & Discovery Agent for travel planning.
+# Tools are already LangChain tools (decorated with @tool), use them directly
+RESEARCH_TOOLS = [
+    duckduckgo_batch_search,
+    duckduckgo_destination_search,
+    wikipedia_destination_info,
+    duckduckgo_search,
+]
+
+BOOKING_TOOLS = [
+    get_google_flights,
+    get_flexible_flights,
+    search_kayak_hotels,
+    kayak_hotel_url_generator,
+    scrape_website,
+]
+
+PLANNING_TOOLS = [
+    duckduckgo_search,
+    wikipedia_search,
+    scrape_website,
+]
+
+# Same tools with an async implementation on the bounded tool executor
+ASYNC_RESEARCH_TOOLS = with_tool_executor_all(RESEARCH_TOOLS)
+ASYNC_BOOKING_TOOLS = with_tool_executor_all(BOOKING_TOOLS)
+ASYNC_PLANNING_TOOLS = with_tool_executor_all(PLANNING_TOOLS)
+
+research_flight = get_single_flight("research_discovery")
+
+# Searches every research run needs, fetched concurrently before the agent starts
+PREFETCH_QUERY_TYPES = ("attractions", "restaurants", "activities")
+
+# Characters kept per tool result when a node returns partial tool output
+PARTIAL_TOOL_OUTPUT_CHARS = 1500
+
+
+RESEARCH_SYSTEM_PROMPT = """You are a Research & Discovery Agent for travel planning.
         Your role is to research destinations and find:
         1. Tourist attractions, landmarks, and activities
         2. Restaurants and dining experiences
         3. Local culture and travel tips
-        
+
         Available tools:
+        - duckduckgo_batch_search: Run several web searches in one call (e.g. attractions,
+          restaurants, activities and tips together), with duplicate results removed
         - search_destination_attractions: Search for tourist attractions and landmarks
         - search_destination_restaurants: Search for restaurants and dining options
         - get_wikipedia_destination_info: Get comprehensive information from Wikipedia
         - general_search: General web search using DuckDuckGo
-        
+
         Use these tools to gather comprehensive information.
+        Gather the topics you need with one duckduckgo_batch_search call rather than separate searches.
         Provide detailed, well-organized research results.
         Focus on mainstream attractions and popular dining options.
         Include practical information like locations, opening hours, and recommendations.
-        
+
         Format your output clearly with sections for:
         - Main Attractions
         - Dining Options
         - Activities & Experiences
         - Travel Tips"""
-        
-        query = f"""
-        Please research the destination: {state.get('destination', '')}
-        
-        User's travel request:
-        {state['travel_request_md']}
-        
-        Provide comprehensive research about:
-        1. Top 10 tourist attractions and landmarks
-        2. Top 5-10 restaurants and dining experiences
-        3. Popular activities and experiences
-        4. Local travel tips and cultural information
-        
-        IMPORTANT: You must use the available tools to search for current information.
-        Call the tools with appropriate parameters to get real data.
-        """
-        
-        # Create agent with tools using LangChain's agent
-        agent = create_agent(model, tools)
-        
-        # Invoke agent with retry logic for throttling
-        result = invoke_agent_with_retry(
-            agent,
-            {
-                "messages": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=query)
-                ]
-            }
-        )
-        
-        # Extract final response
-        if isinstance(result, dict) and "messages" in result:
-            messages = result["messages"]
-            # Get the last AI message
-            for msg in reversed(messages):
-                if hasattr(msg, "content") and msg.content:
-                    output = msg.content
-                    break
-            else:
-                output = str(messages[-1]) if messages else "No response"
-        else:
-            output = str(result)
-        
-        state["research_results"] = output
-        state["current_step"] = "Research & Discovery completed"
-        logger.info("Research & Discovery Agent completed successfully")
-        
-    except Exception as e:
-        import traceback
-        error_trace = traceback.format_exc()
-        logger.error(f"Error in Research & Discovery node: {e}\n{error_trace}")
-        state["errors"].append(f"Research error: {str(e)}")
-        state["research_results"] = f"Error during research: {str(e)}"
-    
-    return state
 
-
-def booking_logistics_node(state: TravelPlanState) -> TravelPlanState:
-    """
-    Node 2: Booking & Logistics Agent
-    Combines Flight Search + Hotel Search
-    Uses: fast-flights, Kayak scraping
-    """
-    logger.info("Running Booking & Logistics Agent node")
-    
-    try:
-        # Get Bedrock model
-        model = get_bedrock_model(temperature=0.3, max_tokens=4096)
-        
-        # Tools are already LangChain tools (decorated with @tool), use them directly
-        tools = [
-            get_google_flights,
-            search_kayak_hotels,
-            kayak_hotel_url_generator,
-            scrape_website,
-        ]
-        
-        # Create agent with tools using LangGraph's react agent
-        system_prompt = """You are a Booking & Logistics Agent for travel planning.
+BOOKING_SYSTEM_PROMPT = """You are a Booking & Logistics Agent for travel planning.
         Your role is to find and recommend:
         1. Flight options with prices, times, and airlines
         2. Hotel accommodations with prices, ratings, and amenities
-        
+
         Available tools:
         - search_flights: Search for flights using Google Flights
+        - get_flexible_flights: Cheapest flights over a window of dates in one call
         - search_hotels: Search for hotels on Kayak
         - generate_hotel_search_url: Generate Kayak hotel search URL
         - scrape_website: Scrape website content for additional information
-        
+
         Coordinate flight and hotel timing to ensure smooth travel.
         Consider user preferences from their travel request.
         Provide top 5 options for both flights and hotels.
-        
+
         Format your output with:
         - Flight Recommendations (top 5)
         - Hotel Recommendations (top 5)
         - Booking coordination notes"""
-        
-        query = f"""
-        Please find flights and hotels according to the user's travel request:
-        {state['travel_request_md']}
-        
-        Requirements:
-        1. Search for flights from starting location to destination
-        2. Search for hotels at the destination
-        3. Coordinate timing between flights and hotel check-in
-        4. Consider user's budget, travel dates, and preferences
-        
-        IMPORTANT: Use the search_flights and search_hotels tools to get real data.
-        Provide top 5 flight options and top 5 hotel options with details.
-        """
-        
-        # Create agent
-        agent = create_agent(model, tools)
-        
-        # Invoke agent with retry logic for throttling
-        result = invoke_agent_with_retry(
-            agent,
-            {
-                "messages": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=query)
-                ]
-            }
-        )
-        
-        # Extract final response
-        if isinstance(result, dict) and "messages" in result:
-            messages = result["messages"]
-            for msg in reversed(messages):
-                if hasattr(msg, "content") and msg.content:
-                    output = msg.content
-                    break
-            else:
-                output = str(messages[-1]) if messages else "No response"
-        else:
-            output = str(result)
-        
-        state["booking_results"] = output
-        state["current_step"] = "Booking & Logistics completed"
-        logger.info("Booking & Logistics Agent completed successfully")
-        
-    except Exception as e:
-        logger.error(f"Error in Booking & Logistics node: {e}")
-        state["errors"].append(f"Booking error: {str(e)}")
-        state["booking_results"] = f"Error during booking search: {str(e)}"
-    
-    return state
-
 
-def planning_optimization_node(state: TravelPlanState) -> TravelPlanState:
-    """
-    Node 3: Planning & Optimization Agent
-    Combines Itinerary Specialist + Budget Agent
-    Uses: DuckDuckGo for timing info, budget calculation
-    """
-    logger.info("Running Planning & Optimization Agent node")
-    
-    try:
-        # Get Bedrock model
-        model = get_bedrock_model(temperature=0.3, max_tokens=4096)
-        
-        # Tools are already LangChain tools (decorated with @tool), use them directly
-        tools = [
-            duckduckgo_search,
-            wikipedia_search,
-            scrape_website,
-        ]
-        
-        # Create agent with tools using LangGraph's react agent
-        system_prompt = """You are a Planning & Optimization Agent for travel planning.
+PLANNING_SYSTEM_PROMPT = """You are a Planning & Optimization Agent for travel planning.
         Your role is to:
         1. Create detailed day-by-day itineraries
         2. Optimize budget and costs
         3. Schedule activities with proper timing
         4. Provide budget breakdown and recommendations
-        
+
         Available tools:
         - search_timing_info: Search for operating hours, timing, and scheduling information
         - get_general_info: Get general information from Wikipedia
         - scrape_for_details: Scrape websites for detailed information
-        
+
         Use the research and booking information provided to create a comprehensive plan.
         Structure each day with morning, afternoon, and evening activities.
         Include realistic travel times and buffer periods.
         Optimize costs while maintaining experience quality.
-        
-        Format your output with:
-        - Day-by-Day Itinerary (detailed schedule)
-        - Budget Breakdown (costs by category)
-        - Budget Optimization Recommendations
-        - Travel Tips and Notes"""
-        
-        context = f"""
+
+        Return the final plan by calling the TravelPlanTeamResponse tool with:
+        - day_by_day_plan: one entry per trip day, in order (detailed schedule)
+        - hotels, flights: the best options from the booking information
+        - attractions, restaurants: the best options from the research information
+        - budget_insights: budget breakdown by category and optimization recommendations
+        - tips: travel tips and notes"""
+
+
+# Parts of the travel request that shape destination research. The traveler,
+# origin, dates, group and budget only matter to booking and planning, so
+# requests that differ only in those share one research run.
+RESEARCH_REQUEST_SECTIONS = ("## Trip Preferences", "## Destination Context")
+RESEARCH_REQUEST_LINES = ("- **Travel Style:**",)
+
+
+def research_request(travel_request_md: str) -> str:
+    """Get the research-relevant lines of a travel request's markdown."""
+    lines = []
+    in_section = False
+    for line in travel_request_md.splitlines():
+        if line.startswith("#"):
+            in_section = line.strip() in RESEARCH_REQUEST_SECTIONS
+            if in_section:
+                lines.append(line)
+        elif in_section or line.startswith(RESEARCH_REQUEST_LINES):
+            lines.append(line)
+    # Not our markdown layout (e.g. a hand-written request): use all of it
+    return "\n".join(lines).strip() or travel_request_md
+
+
+def build_research_input(state: TravelPlanState) -> dict:
+    """Build the agent input for the Research & Discovery node."""
+    prefetched = state.get("prefetched_research")
+    if prefetched:
+        tool_instructions = f"""
+        Search results for this destination were already fetched for you:
+
+        {prefetched}
+
+        IMPORTANT: Base your research on these results first. Only call tools for
+        follow-up questions they do not answer (a specific venue, opening hours,
+        a gap in the results). Do not repeat the searches above.
+        """
+    else:
+        tool_instructions = """
+        IMPORTANT: You must use the available tools to search for current information.
+        Call the tools with appropriate parameters to get real data.
+        """
+
+    query = f"""
+        Please research the destination: {state.get('destination', '')}
+
+        Traveler preferences:
+        {research_request(state['travel_request_md'])}
+
+        Provide comprehensive research about:
+        1. Top 10 tourist attractions and landmarks
+        2. Top 5-10 restaurants and dining experiences
+        3. Popular activities and experiences
+        4. Local travel tips and cultural information
+        {tool_instructions}"""
+
+    return {
+        "messages": [
+            SystemMessage(content=cached_text(RESEARCH_SYSTEM_PROMPT)),
+            HumanMessage(content=query)
+        ]
+    }
+
+
+def build_booking_input(state: TravelPlanState) -> dict:
+    """Build the agent input for the Booking & Logistics node."""
+    query = f"""
+        Please find flights and hotels according to the user's travel request:
+        {state['travel_request_md']}
+
+        Requirements:
+        1. Search for flights from starting location to destination
+        2. Search for hotels at the destination
+        3. Coordinate timing between flights and hotel check-in
+        4. Consider user's budget, travel dates, and preferences
+        5. If the travel dates are flexible, compare nearby dates with one get_flexible_flights call
+
+        IMPORTANT: Use the search_flights and search_hotels tools to get real data.
+        Provide top 5 flight options and top 5 hotel options with details.
+        """
+
+    return {
+        "messages": [
+            SystemMessage(content=cached_text(BOOKING_SYSTEM_PROMPT)),
+            HumanMessage(content=query)
+        ]
+    }
+
+
+def planning_sections(state: TravelPlanState) -> Dict[str, str]:
+    """The context sections of the planning prompt, as measured by the token budget."""
+    return {
+        "research": state.get("research_results") or "No research data available",
+        "booking": state.get("booking_results") or "No booking data available",
+        "request": state["travel_request_md"],
+    }
+
+
+def build_planning_input(state: TravelPlanState, sections: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Build the agent input for the Planning & Optimization node.
+
+    Args:
+        state: Workflow state
+        sections: Compacted planning_sections(state); taken from state as-is if omitted
+    """
+    sections = sections or planning_sections(state)
+    context = f"""
         Research Results:
-        {state.get('research_results', 'No research data available')}
-        
+        {sections['research']}
+
         Booking Results:
-        {state.get('booking_results', 'No booking data available')}
-        
+        {sections['booking']}
+
         User's Travel Request:
-        {state['travel_request_md']}
+        {sections['request']}
         """
-        
-        query = f"""
-        Create a comprehensive travel plan based on the following information:
-        
-        {context}
-        
-        Please provide:
+
+    instructions = """
+        Please provide, through the TravelPlanTeamResponse tool:
         1. Detailed day-by-day itinerary with morning, afternoon, and evening activities
         2. Complete budget breakdown with costs for flights, hotels, activities, dining
         3. Budget optimization recommendations
         4. Practical travel tips and notes
-        
+
         Ensure the itinerary is realistic, well-timed, and within budget constraints.
         Use tools if you need additional timing or scheduling information.
         """
-        
-        # Create agent
-        agent = create_agent(model, tools)
-        
-        # Invoke agent with retry logic for throttling
-        result = invoke_agent_with_retry(
-            agent,
-            {
-                "messages": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=query)
-                ]
-            }
+
+    # The context is the large, stable part of every planning turn, so it is
+    # sent as its own cache point ahead of the instructions
+    return {
+        "messages": [
+            SystemMessage(content=cached_text(PLANNING_SYSTEM_PROMPT)),
+            HumanMessage(content=cached_text(
+                "Create a comprehensive travel plan based on the following information:\n" + context
+            ) + [{"type": "text", "text": instructions}])
+        ]
+    }
+
+
+def extract_agent_output(result) -> str:
+    """Extract the final AI message content from an agent result."""
+    if isinstance(result, dict) and "messages" in result:
+        messages = result["messages"]
+        # Get the last AI message
+        for msg in reversed(messages):
+            if hasattr(msg, "content") and msg.content:
+                return msg.content
+        return str(messages[-1]) if messages else "No response"
+    return str(result)
+
+
+def extract_plan_output(result) -> Any:
+    """Get the TravelPlanTeamResponse from a planning agent result (its text if it returned none)."""
+    if isinstance(result, dict) and isinstance(result.get("structured_response"), TravelPlanTeamResponse):
+        return result["structured_response"]
+    return extract_agent_output(result)
+
+
+def extract_partial_output(partial: Optional[dict]) -> Optional[str]:
+    """
+    Build the best available output from an agent run stopped at its deadline.
+    
+    Prefers the latest AI text; otherwise returns the tool results gathered so far.
+    """
+    if not isinstance(partial, dict):
+        return None
+    messages = partial.get("messages", [])
+
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and isinstance(msg.content, str) and msg.content.strip():
+            return msg.content
+
+    tool_outputs = [
+        f"### {msg.name or 'tool'}\n{str(msg.content)[:PARTIAL_TOOL_OUTPUT_CHARS]}"
+        for msg in messages if isinstance(msg, ToolMessage)
+    ]
+    if tool_outputs:
+        return "Partial tool results (agent stopped at its deadline):\n\n" + "\n\n".join(tool_outputs)
+    return None
+
+
+# A price ("$420", "₹12,500", "EUR 95") and a clock time ("8:05 AM", "14:35")
+_PRICE = re.compile(r"(?:[$€£¥₹]|\b(?:USD|EUR|GBP|INR|JPY|Rs\.?)\s?)\s?\d[\d,]*(?:\.\d+)?", re.IGNORECASE)
+_CLOCK_TIME = re.compile(r"\b(?:[01]?\d|2[0-3]):[0-5]\d(?:\s?[AP]\.?M\.?)?", re.IGNORECASE)
+
+
+def valid_booking_output(text: str) -> bool:
+    """
+    Check that booking output recommends concrete options, not just the
+    words "flight" or "hotel": it needs at least two prices, plus hotels or
+    the departure and arrival times of flights.
+    """
+    if len(text) < 200 or text.startswith("Error"):
+        return False
+    if len(_PRICE.findall(text)) < 2:
+        return False
+    return "hotel" in text.lower() or bool(_CLOCK_TIME.search(text))
+
+
+# Minimal checks a node's output must pass before the cheaper tier's answer is
+# accepted; a failure reruns the node on the next model tier. Text outputs are
+# stripped strings; the planning node's is a TravelPlanTeamResponse
+OUTPUT_VALIDATORS = {
+    "research_discovery": lambda text: len(text) >= 200 and not text.startswith("Error"),
+    "booking_logistics": valid_booking_output,
+    "planning_optimization": lambda plan: isinstance(plan, TravelPlanTeamResponse)
+        and bool(plan.day_by_day_plan) and bool(plan.budget_insights),
+}
+
+
+def validate_output(node: str, output) -> bool:
+    """Check a node's agent output with its OUTPUT_VALIDATORS entry (unknown nodes pass)."""
+    validator = OUTPUT_VALIDATORS.get(node)
+    if validator is None:
+        return True
+    return validator(output if isinstance(output, BaseModel) else str(output).strip())
+
+
+def escalation_input(input_data: dict, result: Any, tools: list) -> dict:
+    """
+    Build the input for rerunning a node on the next model tier.
+
+    The rerun continues the failed attempt's conversation from its last tool
+    result, so the tools it already called are not called again and the
+    more capable model only redoes the reasoning. Without tool results the
+    rerun starts from the original input.
+    """
+    messages = result.get("messages", []) if isinstance(result, dict) else []
+    tool_names = {tool.name for tool in tools}
+    last_tool = max(
+        (i for i, msg in enumerate(messages) if isinstance(msg, ToolMessage) and msg.name in tool_names),
+        default=None,
+    )
+    if last_tool is None:
+        return input_data
+    return {"messages": messages[:last_tool + 1]}
+
+
+def _run_routed(
+    node: str,
+    agent_name: str,
+    tools: list,
+    input_data: dict,
+    max_tokens: int = 4096,
+    response_format: Any = None,
+    extract: Callable[[Any], Any] = extract_agent_output,
+) -> Any:
+    """Run a node's agent on its routed model tier, escalating while the output fails validation."""
+    model_name = model_router.choose(node, estimate_prompt_tokens(input_data["messages"]), max_tokens)
+    while True:
+        agent = get_agent(
+            agent_name, tools, model_name=model_name, max_tokens=max_tokens, response_format=response_format
         )
-        
-        # Extract final response
-        if isinstance(result, dict) and "messages" in result:
-            messages = result["messages"]
-            for msg in reversed(messages):
-                if hasattr(msg, "content") and msg.content:
-                    output = msg.content
-                    break
-            else:
-                output = str(messages[-1]) if messages else "No response"
-        else:
-            output = str(result)
-        
-        # Try to extract itinerary and budget sections
-        if "Itinerary" in output or "Day" in output:
-            state["itinerary"] = output
+        with tool_concurrency_scope(node):
+            result = invoke_agent_with_retry(agent, input_data)
+        output = extract(result)
+        if validate_output(node, output):
+            return output
+        next_model = model_router.escalate(model_name)
+        model_router.record_escalation(node, model_name, next_model)
+        if next_model is None:
+            return output
+        model_name = next_model
+        input_data = escalation_input(input_data, result, tools)
+
+
+async def _arun_routed(
+    node: str,
+    agent_name: str,
+    tools: list,
+    input_data: dict,
+    deadline: float,
+    max_tokens: int = 4096,
+    response_format: Any = None,
+    extract: Callable[[Any], Any] = extract_agent_output,
+) -> Any:
+    """Async version of _run_routed; every attempt shares the node deadline."""
+    model_name = model_router.choose(node, estimate_prompt_tokens(input_data["messages"]), max_tokens)
+    while True:
+        agent = get_agent(
+            agent_name, tools, model_name=model_name, max_tokens=max_tokens, response_format=response_format
+        )
+        with tool_concurrency_scope(node):
+            result = await ainvoke_agent_with_retry(agent, input_data, deadline=deadline)
+        output = extract(result)
+        if validate_output(node, output):
+            return output
+        next_model = model_router.escalate(model_name)
+        model_router.record_escalation(node, model_name, next_model)
+        if next_model is None:
+            return output
+        model_name = next_model
+        input_data = escalation_input(input_data, result, tools)
+
+
+def _cache_scope(config: Optional[RunnableConfig], node: str):
+    """LLM cache scope for a node's model calls, honouring the request's cache flag."""
+    use_cache = (config or {}).get("configurable", {}).get("llm_cache", True)
+    return llm_cache_scope(node, bypass=not use_cache)
+
+
+def _node_deadline(config: Optional[RunnableConfig], node: str) -> float:
+    """Get a node's deadline from its budget and the workflow deadline in config."""
+    workflow_deadline = (config or {}).get("configurable", {}).get("deadline")
+    return deadline_config.node_deadline(node, workflow_deadline)
+
+
+def _deadline_update(node: str, label: str, fields: tuple, e: DeadlineExceeded, fallback: Optional[str] = None) -> dict:
+    """State update for a node stopped at its deadline: partial output plus an error marker."""
+    output = extract_partial_output(e.partial) or fallback or f"{label} did not complete within its time budget."
+    logger.warning(f"{label} stopped at deadline: {e}")
+    update = {field: output for field in fields}
+    update.update({
+        "current_step": f"{label} stopped at deadline",
+        "errors": [f"{label} deadline exceeded: {e} (partial result returned)"],
+        "failed_nodes": [node],
+    })
+    return update
+
+
+def _prefetch_calls(destination: str) -> list:
+    """The (label, function, args) searches the prefetch stage runs."""
+    calls = [
+        (f"DuckDuckGo: {query_type}", duckduckgo_destination_search.func, (destination, query_type))
+        for query_type in PREFETCH_QUERY_TYPES
+    ]
+    calls.append(("Wikipedia", wikipedia_destination_info.func, (destination,)))
+    return calls
+
+
+def _prefetch_update(labels: list, results: list) -> dict:
+    sections = []
+    for label, result in zip(labels, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Research prefetch {label} failed: {result}")
+            continue
+        sections.append(f"### {label}\n{result}")
+    logger.info(f"Research prefetch completed ({len(sections)}/{len(labels)} searches)")
+    return {
+        "prefetched_research": "\n\n".join(sections) or None,
+        "current_step": "Research prefetch completed",
+    }
+
+
+def research_prefetch_node(state: TravelPlanState) -> dict:
+    """
+    Node 0: Research prefetch
+    Runs the searches every research run needs (DuckDuckGo attractions,
+    restaurants and activities, plus Wikipedia) concurrently, so the research
+    agent starts with the results instead of discovering them one LLM turn
+    at a time.
+    """
+    if state.get("research_results"):
+        return {}
+    
+    logger.info("Running research prefetch node")
+    calls = _prefetch_calls(state.get("destination", ""))
+    futures = [get_tool_executor().submit(func, *args) for _, func, args in calls]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return _prefetch_update([label for label, _, _ in calls], results)
+
+
+async def aresearch_prefetch_node(state: TravelPlanState, config: RunnableConfig = None) -> dict:
+    """Async version of research_prefetch_node; searches still running at the deadline are dropped."""
+    if state.get("research_results"):
+        # Research was supplied up front, nothing to prefetch
+        return {}
+    
+    logger.info("Running research prefetch node (async)")
+    deadline = _node_deadline(config, "research_prefetch")
+    calls = _prefetch_calls(state.get("destination", ""))
+    tasks = [asyncio.ensure_future(run_in_tool_executor(func, *args)) for _, func, args in calls]
+    done, pending = await asyncio.wait(tasks, timeout=max(remaining_seconds(deadline), 0))
+    
+    results = []
+    for (label, _, _), task in zip(calls, tasks):
+        if task in pending:
+            task.cancel()
+            results.append(TimeoutError(f"{label} did not finish before the prefetch deadline"))
         else:
-            state["itinerary"] = output
-        
-        state["budget_analysis"] = output  # Budget info is in the same output
-        state["current_step"] = "Planning & Optimization completed"
-        logger.info("Planning & Optimization Agent completed successfully")
-        
+            results.append(task.exception() or task.result())
+    
+    update = _prefetch_update([label for label, _, _ in calls], results)
+    if pending:
+        update["errors"] = [f"Research prefetch deadline exceeded: {len(pending)} searches dropped (partial result returned)"]
+    return update
+
+
+def _research_update(output: str) -> dict:
+    logger.info("Research & Discovery Agent completed successfully")
+    return {
+        "research_results": output,
+        "current_step": "Research & Discovery completed",
+    }
+
+
+def _research_error_update(e: Exception) -> dict:
+    error_trace = traceback.format_exc()
+    logger.error(f"Error in Research & Discovery node: {e}\n{error_trace}")
+    return {
+        "research_results": f"Error during research: {str(e)}",
+        "errors": [f"Research error: {str(e)}"],
+        "failed_nodes": ["research_discovery"],
+    }
+
+
+def _booking_update(output: str) -> dict:
+    logger.info("Booking & Logistics Agent completed successfully")
+    return {
+        "booking_results": output,
+        "current_step": "Booking & Logistics completed",
+    }
+
+
+def _booking_error_update(e: Exception) -> dict:
+    logger.error(f"Error in Booking & Logistics node: {e}")
+    return {
+        "booking_results": f"Error during booking search: {str(e)}",
+        "errors": [f"Booking error: {str(e)}"],
+        "failed_nodes": ["booking_logistics"],
+    }
+
+
+def _planning_update(output: Any) -> dict:
+    logger.info("Planning & Optimization Agent completed successfully")
+    if isinstance(output, TravelPlanTeamResponse):
+        return {
+            "travel_plan": output.model_dump(),
+            "itinerary": render_itinerary(output),
+            "budget_analysis": render_budget_analysis(output),
+            "current_step": "Planning & Optimization completed",
+        }
+    # The agent answered in text instead of calling the plan tool
+    logger.warning("Planning & Optimization Agent returned no structured plan")
+    return {
+        "itinerary": output,
+        "budget_analysis": output,  # Budget info is in the same output
+        "current_step": "Planning & Optimization completed",
+    }
+
+
+def _planning_error_update(e: Exception) -> dict:
+    logger.error(f"Error in Planning & Optimization node: {e}")
+    return {
+        "itinerary": f"Error during planning: {str(e)}",
+        "budget_analysis": f"Error during budget analysis: {str(e)}",
+        "errors": [f"Planning error: {str(e)}"],
+        "failed_nodes": ["planning_optimization"],
+    }
+
+
+def research_discovery_node(state: TravelPlanState) -> dict:
+    """
+    Node 1: Research & Discovery Agent
+    Combines Destination Explorer + Dining Agent
+    Uses free APIs: DuckDuckGo, Wikipedia
+    """
+    logger.info("Running Research & Discovery Agent node")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        with llm_cache_scope("research_discovery"):
+            output = _run_routed("research_discovery", "research_discovery", RESEARCH_TOOLS, build_research_input(state))
+        return _research_update(output)
+
     except Exception as e:
-        logger.error(f"Error in Planning & Optimization node: {e}")
-        state["errors"].append(f"Planning error: {str(e)}")
-        state["itinerary"] = f"Error during planning: {str(e)}"
-        state["budget_analysis"] = f"Error during budget analysis: {str(e)}"
+        return _research_error_update(e)
+
+
+async def aresearch_discovery_node(state: TravelPlanState, config: RunnableConfig = None) -> dict:
+    """Async version of research_discovery_node, bounded by the node deadline."""
+    if state.get("research_results"):
+        # Research was supplied up front (shared across a batch)
+        logger.info("Reusing supplied Research & Discovery results")
+        return {"current_step": "Research & Discovery reused"}
     
-    return state
+    # Concurrent research for the same destination and preferences runs once
+    key = (normalize_arg(state.get("destination", "")), normalize_arg(research_request(state["travel_request_md"])))
+    deadline = _node_deadline(config, "research_discovery")
+    with _cache_scope(config, "research_discovery"):
+        update = await research_flight.ado(key, lambda: _arun_research(state, deadline))
+    return copy.deepcopy(update)
 
+
+async def _arun_research(state: TravelPlanState, deadline: float) -> dict:
+    logger.info("Running Research & Discovery Agent node (async)")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        output = await _arun_routed(
+            "research_discovery", "research_discovery_async", ASYNC_RESEARCH_TOOLS,
+            build_research_input(state), deadline,
+        )
+        return _research_update(output)
+
+    except DeadlineExceeded as e:
+        # The prefetched searches are a usable fallback when the agent produced nothing
+        return _deadline_update(
+            "research_discovery", "Research & Discovery", ("research_results",), e,
+            fallback=state.get("prefetched_research"),
+        )
+
+    except Exception as e:
+        return _research_error_update(e)
+
+
+def booking_logistics_node(state: TravelPlanState) -> dict:
+    """
+    Node 2: Booking & Logistics Agent
+    Combines Flight Search + Hotel Search
+    Uses: fast-flights, Kayak scraping
+    """
+    logger.info("Running Booking & Logistics Agent node")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        with llm_cache_scope("booking_logistics"):
+            output = _run_routed("booking_logistics", "booking_logistics", BOOKING_TOOLS, build_booking_input(state))
+        return _booking_update(output)
+
+    except Exception as e:
+        return _booking_error_update(e)
+
+
+async def abooking_logistics_node(state: TravelPlanState, config: RunnableConfig = None) -> dict:
+    """Async version of booking_logistics_node, bounded by the node deadline."""
+    logger.info("Running Booking & Logistics Agent node (async)")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        deadline = _node_deadline(config, "booking_logistics")
+        with _cache_scope(config, "booking_logistics"):
+            output = await _arun_routed(
+                "booking_logistics", "booking_logistics_async", ASYNC_BOOKING_TOOLS,
+                build_booking_input(state), deadline,
+            )
+        return _booking_update(output)
+
+    except DeadlineExceeded as e:
+        return _deadline_update("booking_logistics", "Booking & Logistics", ("booking_results",), e)
+
+    except Exception as e:
+        return _booking_error_update(e)
+
+
+def planning_optimization_node(state: TravelPlanState) -> dict:
+    """
+    Node 3: Planning & Optimization Agent
+    Combines Itinerary Specialist + Budget Agent
+    Uses: DuckDuckGo for timing info, budget calculation
+    """
+    logger.info("Running Planning & Optimization Agent node")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        with llm_cache_scope("planning_optimization"):
+            # Fit the research and booking context to the token budget first
+            sections = planning_context_budget.compact(planning_sections(state), protected=("request",))
+            output = _run_routed(
+                "planning_optimization", "planning_optimization", PLANNING_TOOLS,
+                build_planning_input(state, sections), planning_max_tokens(state.get("duration")),
+                PLAN_RESPONSE_FORMAT, extract_plan_output,
+            )
+        return _planning_update(output)
+
+    except Exception as e:
+        return _planning_error_update(e)
+
+
+async def aplanning_optimization_node(state: TravelPlanState, config: RunnableConfig = None) -> dict:
+    """Async version of planning_optimization_node, bounded by the node deadline."""
+    logger.info("Running Planning & Optimization Agent node (async)")
+
+    try:
+        # Invoke agent with retry logic for throttling, on the routed model tier
+        deadline = _node_deadline(config, "planning_optimization")
+        with _cache_scope(config, "planning_optimization"):
+            # Fit the research and booking context to the token budget first
+            sections = await planning_context_budget.acompact(
+                planning_sections(state), protected=("request",),
+                timeout=min(CONTEXT_SUMMARY_TIMEOUT_SECONDS, remaining_seconds(deadline) / 4),
+            )
+            output = await _arun_routed(
+                "planning_optimization", "planning_optimization_async", ASYNC_PLANNING_TOOLS,
+                build_planning_input(state, sections), deadline, planning_max_tokens(state.get("duration")),
+                PLAN_RESPONSE_FORMAT, extract_plan_output,
+            )
+        return _planning_update(output)
+
+    except DeadlineExceeded as e:
+        return _deadline_update(
+            "planning_optimization", "Planning & Optimization", ("itinerary", "budget_analysis"), e
+        )
+
+    except Exception as e:
+        return _planning_error_update(e)
@@ -1,30 +1,46 @@
 """State definition for LangGraph travel planning workflow."""
 
-from typing import TypedDict, List, Optional
+import operator
+from typing import Annotated, TypedDict, List, Optional
+
+
+def keep_latest(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """Reducer that keeps the most recent value (safe for parallel writers)."""
+    return update if update is not None else current
 
 
 class TravelPlanState(TypedDict):
-    """State that flows through the LangGraph workflow."""
-    
+    """State that flows through the LangGraph workflow.
+
+    Nodes return partial updates. Fields written by nodes that may run in the
+    same superstep (research and booking in parallel mode) carry a reducer so
+    LangGraph can merge them instead of raising on concurrent writes.
+    """
+
     # Input data
     trip_plan_id: str
     travel_request_md: str
     destination: str
+    duration: Optional[int]  # Trip length in days (0 if unknown)
+
+    # Research prefetch output (searches run before the research agent starts)
+    prefetched_research: Optional[str]
     
     # Research & Discovery Agent output
     research_results: Optional[str]  # Combined attractions + restaurants
-    
+
     # Booking & Logistics Agent output
     booking_results: Optional[str]  # Combined flights + hotels
-    
+
     # Planning & Optimization Agent output
     itinerary: Optional[str]
     budget_analysis: Optional[str]
-    
+    travel_plan: Optional[dict]  # TravelPlanTeamResponse fields (None if the agent gave only text)
+
     # Final output
     final_response: Optional[str]
-    
-    # Status tracking
-    current_step: str
-    errors: List[str]
 
+    # Status tracking
+    current_step: Annotated[str, keep_latest]
+    errors: Annotated[List[str], operator.add]
+    failed_nodes: Annotated[List[str], operator.add]  # Nodes to re-run on resume
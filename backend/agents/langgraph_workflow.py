@@ -1,47 +1,268 @@
 """LangGraph workflow for travel planning."""
 
-from langgraph.graph import StateGraph, END
+import os
+import time
+from typing import AsyncIterator, Optional
+from langgraph.graph import StateGraph, START, END
 from agents.langgraph_state import TravelPlanState
+from agents.registry import registry
+from agents.checkpoints import checkpoint_store, CHECKPOINTS_ENABLED
+from config.deadlines import deadline_config
+from config.llm_cache import llm_cache
+from tools.wikipedia_index import wikipedia_index
+from tools.http_client import http_client
+from config.token_budget import SUMMARY_TAG
+from agents.structured_output import PlanStream
 from agents.langgraph_nodes import (
-    research_discovery_node,
-    booking_logistics_node,
-    planning_optimization_node
+    aresearch_prefetch_node,
+    aresearch_discovery_node,
+    abooking_logistics_node,
+    aplanning_optimization_node
 )
 from loguru import logger
 
 
-def create_travel_planning_graph():
-    """Create the LangGraph workflow for travel planning."""
+# Graph modes: "parallel" fans research (prefetch, then agent) and booking out
+# from the entry point, "sequential" runs every node one after another.
+WORKFLOW_MODES = ("parallel", "sequential")
+DEFAULT_WORKFLOW_MODE = os.getenv("TRAVEL_WORKFLOW_MODE", "parallel")
+
+WORKFLOW_NODES = ("research_prefetch", "research_discovery", "booking_logistics", "planning_optimization")
+
+
+def create_travel_planning_graph(mode: str = DEFAULT_WORKFLOW_MODE, checkpointer=None):
+    """
+    Create the LangGraph workflow for travel planning.
     
-    logger.info("Creating LangGraph workflow")
+    Args:
+        mode: "parallel" runs Research & Discovery and Booking & Logistics
+            concurrently and joins them before Planning & Optimization;
+            "sequential" runs all three nodes one after another.
+        checkpointer: Optional LangGraph checkpointer for per-node checkpoints
+    
+    Returns:
+        Compiled LangGraph application
+    """
+    if mode not in WORKFLOW_MODES:
+        raise ValueError(f"Unknown workflow mode: {mode}. Expected one of {WORKFLOW_MODES}")
+    
+    logger.info(f"Creating LangGraph workflow ({mode})")
     
     # Create the graph
     workflow = StateGraph(TravelPlanState)
     
-    # Add nodes (each agent becomes a node)
-    workflow.add_node("research_discovery", research_discovery_node)
-    workflow.add_node("booking_logistics", booking_logistics_node)
-    workflow.add_node("planning_optimization", planning_optimization_node)
+    # Add nodes (each agent becomes a node). The async nodes keep the event
+    # loop free, so concurrent workflows in one process overlap.
+    workflow.add_node("research_prefetch", aresearch_prefetch_node)
+    workflow.add_node("research_discovery", aresearch_discovery_node)
+    workflow.add_node("booking_logistics", abooking_logistics_node)
+    workflow.add_node("planning_optimization", aplanning_optimization_node)
     
-    # Define the sequential flow
-    workflow.set_entry_point("research_discovery")
+    if mode == "parallel":
+        # Fan-out: booking does not read research_results, so both start at once
+        workflow.add_edge(START, "research_prefetch")
+        workflow.add_edge(START, "booking_logistics")
+        workflow.add_edge("research_prefetch", "research_discovery")
+        
+        # Fan-in: planning waits for both branches to finish
+        workflow.add_edge(["research_discovery", "booking_logistics"], "planning_optimization")
+    else:
+        # Define the sequential flow
+        workflow.set_entry_point("research_prefetch")
+        
+        # Sequential edges
+        workflow.add_edge("research_prefetch", "research_discovery")
+        workflow.add_edge("research_discovery", "booking_logistics")
+        workflow.add_edge("booking_logistics", "planning_optimization")
     
-    # Sequential edges
-    workflow.add_edge("research_discovery", "booking_logistics")
-    workflow.add_edge("booking_logistics", "planning_optimization")
     workflow.add_edge("planning_optimization", END)
     
     # Compile the graph
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
     logger.info("LangGraph workflow created successfully")
     return app
 
 
+def get_travel_planning_graph(mode: str = DEFAULT_WORKFLOW_MODE, checkpointer=None):
+    """
+    Get the compiled workflow for a mode, compiling it once per process.
+    
+    The compiled graph holds no per-run state (checkpoints are keyed by
+    thread ID in the checkpointer), so concurrent requests share it. It is
+    bound to its checkpointer, so a new checkpointer (e.g. after
+    shutdown_workflow closed the old one) gets a new graph.
+    """
+    return registry.get_or_create(
+        ("graph", mode, id(checkpointer) if checkpointer is not None else None),
+        lambda: create_travel_planning_graph(mode, checkpointer=checkpointer),
+    )
+
+
+async def _resume_point(app, config: dict, initial_state: TravelPlanState, mode: str, resume: bool):
+    """
+    Decide where a checkpointed run starts.
+    
+    Returns the (input, config) pair for app.ainvoke(): the initial state for a
+    fresh run, or None plus the config of the checkpoint to continue from.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    
+    previous_mode = await checkpoint_store.get_thread_mode(thread_id)
+    if not resume or (previous_mode is not None and previous_mode != mode):
+        await checkpoint_store.delete_thread(thread_id)
+        return initial_state, config
+    
+    snapshot = await app.aget_state(config)
+    if not snapshot.values:
+        return initial_state, config
+    
+    # The same trip_plan_id re-submitted with a changed request starts over
+    if snapshot.values.get("travel_request_md") != initial_state["travel_request_md"]:
+        await checkpoint_store.delete_thread(thread_id)
+        return initial_state, config
+    
+    # Interrupted mid-run (process died or the graph raised): continue from
+    # the last completed superstep
+    if snapshot.next:
+        logger.info(f"Resuming trip {thread_id} before {list(snapshot.next)}")
+        return None, config
+    
+    failed_nodes = set(snapshot.values.get("failed_nodes") or [])
+    if not failed_nodes:
+        logger.info(f"Trip {thread_id} already completed, reusing checkpointed result")
+        return None, config
+    
+    # Finished with node errors: fork from the latest checkpoint taken before a
+    # failed node ran, so nodes that succeeded earlier are not re-run
+    async for past in app.aget_state_history(config):
+        if failed_nodes & set(past.next):
+            logger.info(f"Resuming trip {thread_id} before {list(past.next)} (failed: {sorted(failed_nodes)})")
+            return None, past.config
+    
+    await checkpoint_store.delete_thread(thread_id)
+    return initial_state, config
+
+
+async def shutdown_workflow():
+    """
+    Release process-level workflow resources (the checkpoint database, the
+    LLM response cache, the Wikipedia index and the scrapers' HTTP client).
+    
+    The SQLite connection runs on a non-daemon thread, so scripts must call
+    this before exiting or the interpreter waits on it forever.
+    """
+    await checkpoint_store.close()
+    # The compiled graphs hold the closed checkpointer
+    registry.discard("graph")
+    llm_cache.close()
+    wikipedia_index.close()
+    http_client.close()
+
+
+def _initial_state(
+    trip_plan_id: str,
+    travel_request_md: str,
+    destination: str,
+    research_results: Optional[str] = None,
+    duration: int = 0
+) -> TravelPlanState:
+    """Build the initial workflow state."""
+    return {
+        "trip_plan_id": trip_plan_id,
+        "travel_request_md": travel_request_md,
+        "destination": destination,
+        "duration": duration,
+        "prefetched_research": None,
+        "research_results": research_results,
+        "booking_results": None,
+        "itinerary": None,
+        "budget_analysis": None,
+        "travel_plan": None,
+        "final_response": None,
+        "current_step": "Initializing workflow",
+        "errors": [],
+        "failed_nodes": []
+    }
+
+
+async def _prepare_run(initial_state: TravelPlanState, mode: str, resume: bool, checkpoints: bool, llm_cache: bool = True):
+    """Get the compiled graph and the (input, config) pair to run it with."""
+    if checkpoints:
+        # Checkpoints are keyed by trip_plan_id, so a retry finds them
+        saver = await checkpoint_store.get_saver()
+        app = get_travel_planning_graph(mode, checkpointer=saver)
+        config = {"configurable": {"thread_id": initial_state["trip_plan_id"]}}
+        run_input, run_config = await _resume_point(app, config, initial_state, mode, resume)
+    else:
+        app = get_travel_planning_graph(mode)
+        run_input, run_config = initial_state, {}
+    
+    # Nodes read the workflow deadline from config to size their own budgets,
+    # and whether this request may use cached model responses
+    run_config = {
+        **run_config,
+        "configurable": {
+            **run_config.get("configurable", {}),
+            "deadline": deadline_config.workflow_deadline(),
+            "llm_cache": llm_cache,
+        },
+    }
+    return app, run_input, run_config
+
+
+async def _finish_run(final_state: dict, mode: str, elapsed: float, checkpoints: bool) -> dict:
+    """Record the run in the checkpoint store and attach the final response."""
+    trip_plan_id = final_state.get("trip_plan_id")
+    
+    if checkpoints:
+        status = "failed" if final_state.get("failed_nodes") else "completed"
+        await checkpoint_store.record_run(trip_plan_id, mode, status)
+        await checkpoint_store.maybe_maintain()
+    
+    # Compile final response
+    final_response = {
+        "trip_plan_id": trip_plan_id,
+        "research_results": final_state.get("research_results"),
+        "booking_results": final_state.get("booking_results"),
+        "itinerary": final_state.get("itinerary"),
+        "budget_analysis": final_state.get("budget_analysis"),
+        "travel_plan": final_state.get("travel_plan"),
+        "current_step": final_state.get("current_step"),
+        "errors": final_state.get("errors", []),
+        "workflow_mode": mode,
+        "elapsed_seconds": round(elapsed, 2),
+    }
+    
+    final_state["final_response"] = final_response
+    
+    logger.info(f"Workflow completed for trip: {trip_plan_id} ({mode}) in {elapsed:.2f} seconds")
+    return final_state
+
+
+async def _record_failure(initial_state: TravelPlanState, mode: str, error: Exception, checkpoints: bool):
+    """Log a workflow failure and keep its checkpoints for a retry."""
+    logger.error(f"Error in workflow execution: {error}")
+    initial_state["errors"].append(str(error))
+    initial_state["current_step"] = f"Workflow failed: {str(error)}"
+    if checkpoints:
+        # Keep the partial checkpoints for a retry, but let the TTL expire them
+        try:
+            await checkpoint_store.record_run(initial_state["trip_plan_id"], mode, "failed")
+        except Exception as record_error:
+            logger.warning(f"Could not record failed run for {initial_state['trip_plan_id']}: {record_error}")
+
+
 async def run_travel_planning_workflow(
     trip_plan_id: str,
     travel_request_md: str,
-    destination: str
+    destination: str,
+    mode: str = DEFAULT_WORKFLOW_MODE,
+    resume: bool = True,
+    checkpoints: bool = CHECKPOINTS_ENABLED,
+    research_results: Optional[str] = None,
+    llm_cache: bool = True,
+    duration: int = 0
 ) -> dict:
     """
     Run the complete travel planning workflow.
@@ -50,53 +271,163 @@ async def run_travel_planning_workflow(
         trip_plan_id: Unique trip plan identifier
         travel_request_md: Markdown formatted travel request
         destination: Destination name
+        mode: Graph mode, "parallel" or "sequential"
+        resume: Continue from the checkpoints of an earlier run of the same
+            trip_plan_id instead of starting over
+        checkpoints: Store per-node checkpoints in the SQLite checkpoint store
+        research_results: Research & Discovery output to reuse; the research
+            node is skipped when this is given
+        llm_cache: Serve repeated model calls from the LLM response cache;
+            False bypasses the cache for this run
+        duration: Trip length in days, used to size the planning output
     
     Returns:
         Final state dictionary with all results
     """
-    logger.info(f"Starting travel planning workflow for trip: {trip_plan_id}")
-    
-    # Create the graph
-    app = create_travel_planning_graph()
+    logger.info(f"Starting travel planning workflow for trip: {trip_plan_id} ({mode})")
     
     # Initialize state
-    initial_state: TravelPlanState = {
-        "trip_plan_id": trip_plan_id,
-        "travel_request_md": travel_request_md,
-        "destination": destination,
-        "research_results": None,
-        "booking_results": None,
-        "itinerary": None,
-        "budget_analysis": None,
-        "final_response": None,
-        "current_step": "Initializing workflow",
-        "errors": []
-    }
+    initial_state = _initial_state(trip_plan_id, travel_request_md, destination, research_results, duration)
     
     try:
+        time_start = time.perf_counter()
+        app, run_input, run_config = await _prepare_run(initial_state, mode, resume, checkpoints, llm_cache)
+        
         # Run the workflow
         logger.info("Executing LangGraph workflow")
-        final_state = await app.ainvoke(initial_state)
+        final_state = await app.ainvoke(run_input, run_config)
         
-        # Compile final response
-        final_response = {
-            "trip_plan_id": trip_plan_id,
-            "research_results": final_state.get("research_results"),
-            "booking_results": final_state.get("booking_results"),
-            "itinerary": final_state.get("itinerary"),
-            "budget_analysis": final_state.get("budget_analysis"),
-            "current_step": final_state.get("current_step"),
-            "errors": final_state.get("errors", [])
-        }
+        return await _finish_run(final_state, mode, time.perf_counter() - time_start, checkpoints)
         
-        final_state["final_response"] = final_response
+    except Exception as e:
+        await _record_failure(initial_state, mode, e, checkpoints)
+        raise
+
+
+def _event_node(event: dict) -> Optional[str]:
+    """Get the top-level workflow node an astream_events event belongs to."""
+    metadata = event.get("metadata", {})
+    # Agents run as subgraphs inside a node, so their namespace starts with
+    # "<node>:<task id>|..."; top-level events only carry langgraph_node
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    if namespace:
+        return namespace.split("|")[0].split(":")[0]
+    return metadata.get("langgraph_node")
+
+
+def _message_text(content) -> str:
+    """Get the text of a message chunk (string or list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") for block in content
+            if isinstance(block, dict) and block.get("type") == "text"
+        )
+    return ""
+
+
+async def astream_travel_planning_workflow(
+    trip_plan_id: str,
+    travel_request_md: str,
+    destination: str,
+    mode: str = DEFAULT_WORKFLOW_MODE,
+    resume: bool = True,
+    checkpoints: bool = CHECKPOINTS_ENABLED,
+    llm_cache: bool = True,
+    duration: int = 0
+) -> AsyncIterator[dict]:
+    """
+    Run the workflow and yield progress events as they happen.
+    
+    Event types:
+        node_start / node_end: a workflow node started or finished
+        tool_start / tool_end: an agent called a tool
+        token: a chunk of text from the planning node
+        day_plan: a DayByDayPlan entry (as a dict) of the structured plan,
+            sent as soon as the model has finished generating it; a day
+            sent again replaces the earlier one
+        complete: the final state, same as run_travel_planning_workflow returns
+    
+    Args:
+        Same as run_travel_planning_workflow
+    
+    Yields:
+        Event dictionaries with a "type" key
+    """
+    logger.info(f"Starting streaming travel planning workflow for trip: {trip_plan_id} ({mode})")
+    
+    initial_state = _initial_state(trip_plan_id, travel_request_md, destination, duration=duration)
+    
+    try:
+        time_start = time.perf_counter()
+        app, run_input, run_config = await _prepare_run(initial_state, mode, resume, checkpoints, llm_cache)
+        final_state = None
+        plan_streams = {}  # Planning model call run_id -> PlanStream
+        
+        async for event in app.astream_events(run_input, run_config, version="v2"):
+            kind = event["event"]
+            name = event.get("name")
+            node = _event_node(event)
+            
+            if kind in ("on_chain_start", "on_chain_end") and name in WORKFLOW_NODES \
+                    and event.get("metadata", {}).get("langgraph_node") == name:
+                if kind == "on_chain_start":
+                    yield {"type": "node_start", "node": name}
+                else:
+                    output = event["data"].get("output") or {}
+                    yield {
+                        "type": "node_end",
+                        "node": name,
+                        "current_step": output.get("current_step") if isinstance(output, dict) else None,
+                        "errors": output.get("errors", []) if isinstance(output, dict) else [],
+                    }
+            
+            elif kind == "on_tool_start":
+                yield {"type": "tool_start", "node": node, "tool": name, "input": event["data"].get("input")}
+            
+            elif kind == "on_tool_end":
+                output = event["data"].get("output")
+                content = getattr(output, "content", output)
+                yield {"type": "tool_end", "node": node, "tool": name, "output_chars": len(str(content))}
+            
+            elif kind == "on_chat_model_stream" and node == "planning_optimization" \
+                    and SUMMARY_TAG not in event.get("tags", []):
+                chunk = event["data"]["chunk"]
+                text = _message_text(chunk.content)
+                if text:
+                    yield {"type": "token", "node": node, "text": text}
+                for day in plan_streams.setdefault(event["run_id"], PlanStream()).feed(chunk):
+                    yield {"type": "day_plan", "node": node, "day": day.model_dump()}
+            
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root run finished: its output is the final graph state
+                final_state = event["data"].get("output")
+        
+        if final_state is None and checkpoints:
+            final_state = (await app.aget_state({"configurable": {"thread_id": trip_plan_id}})).values
         
-        logger.info(f"Workflow completed for trip: {trip_plan_id}")
-        return final_state
+        final_state = await _finish_run(dict(final_state or {}), mode, time.perf_counter() - time_start, checkpoints)
+        yield {"type": "complete", "state": final_state}
         
     except Exception as e:
-        logger.error(f"Error in workflow execution: {e}")
-        initial_state["errors"].append(str(e))
-        initial_state["current_step"] = f"Workflow failed: {str(e)}"
+        await _record_failure(initial_state, mode, e, checkpoints)
         raise
 
+
+async def research_destination(destination: str, travel_request_md: str, llm_cache: bool = True) -> Optional[str]:
+    """
+    Run only the Research & Discovery node for a destination.
+    
+    Used to research a destination once and share the result between
+    several workflows (see run_travel_planning_workflow's research_results).
+    
+    Returns:
+        Research results, or None if research failed
+    """
+    state = _initial_state(f"research:{destination}", travel_request_md, destination)
+    state.update(await aresearch_prefetch_node(state))
+    update = await aresearch_discovery_node(state, {"configurable": {"llm_cache": llm_cache}})
+    if update.get("failed_nodes"):
+        return None
+    return update.get("research_results")
@@ -0,0 +1,117 @@
+"""Process-level registry for compiled graphs, agents and model clients."""
+
+import threading
+import time
+from langchain.agents import create_agent
+from config.llm import get_pooled_model
+from config.prompt_cache import prompt_caching_middleware
+from config.model_routing import ModelRoutingMiddleware
+from tools.concurrency import ToolConcurrencyMiddleware
+from loguru import logger
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class ComponentRegistry:
+    """
+    Build expensive workflow components once per process and reuse them.
+
+    Compiled LangGraph apps and agents hold no per-request state, so a
+    single instance can serve concurrent requests. Construction is guarded
+    by a re-entrant lock so racing first callers build each component
+    exactly once. Model clients are pooled separately in
+    config.bedrock.bedrock_pool.
+    """
+
+    def __init__(self):
+        self._components: Dict[Hashable, Any] = {}
+        self._build_seconds: Dict[Hashable, float] = {}
+        self._lock = threading.RLock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the component for key, building it with factory on first use.
+
+        Args:
+            key: Hashable component key
+            factory: Zero-argument callable that builds the component
+
+        Returns:
+            The shared component
+        """
+        component = self._components.get(key)
+        if component is not None:
+            return component
+
+        with self._lock:
+            component = self._components.get(key)
+            if component is None:
+                time_start = time.perf_counter()
+                component = factory()
+                self._build_seconds[key] = time.perf_counter() - time_start
+                self._components[key] = component
+                logger.info(f"Registered component {key} in {self._build_seconds[key]:.3f} seconds")
+        return component
+
+    def discard(self, kind: str):
+        """Drop the components whose key is a tuple starting with kind (e.g. "graph")."""
+        with self._lock:
+            for key in [key for key in self._components if isinstance(key, tuple) and key[:1] == (kind,)]:
+                del self._components[key]
+                self._build_seconds.pop(key, None)
+
+    def clear(self):
+        """Drop all components (they are rebuilt on next use)."""
+        with self._lock:
+            self._components.clear()
+            self._build_seconds.clear()
+
+    def stats(self) -> dict:
+        """Get the registered component keys and their build times."""
+        with self._lock:
+            return {
+                "components": len(self._components),
+                "build_seconds": {str(key): round(seconds, 4) for key, seconds in self._build_seconds.items()},
+            }
+
+
+def get_model(model_name: str = "claude_3_5_sonnet", temperature: float = 0.3, max_tokens: int = 4096):
+    """Get a shared Bedrock model client (pooled in config.bedrock.bedrock_pool)."""
+    return get_pooled_model(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
+
+
+def get_agent(
+    name: str,
+    tools: List,
+    model_name: str = "claude_3_5_sonnet",
+    temperature: float = 0.3,
+    max_tokens: int = 4096,
+    response_format: Any = None,
+):
+    """
+    Get a shared agent for a workflow node.
+
+    Args:
+        name: Agent name, unique per tool set (e.g. "research_discovery_async")
+        tools: Tools the agent can call
+        model_name: Key from BEDROCK_MODELS dict
+        temperature: Model temperature
+        max_tokens: Maximum tokens to generate
+        response_format: Structured output strategy (e.g. ToolStrategy(schema)),
+            or None for a plain text answer
+
+    Returns:
+        Agent built with create_agent
+    """
+    return registry.get_or_create(
+        ("agent", name, model_name, temperature, max_tokens, getattr(response_format, "schema", None)),
+        lambda: create_agent(
+            get_model(model_name, temperature, max_tokens),
+            tools,
+            middleware=[ModelRoutingMiddleware()] + prompt_caching_middleware() + [ToolConcurrencyMiddleware()],
+            response_format=response_format,
+        ),
+    )
+
+
+# Global registry instance
+registry = ComponentRegistry()
@@ -0,0 +1,152 @@
+"""Structured planning output (TravelPlanTeamResponse) and its incremental parsing."""
+
+import json
+from langchain.agents.structured_output import ToolStrategy
+from loguru import logger
+from pydantic import ValidationError
+from models.travel_plan import DayByDayPlan, TravelPlanTeamResponse
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# The planning agent returns its plan by calling a tool with this schema, so
+# the plan arrives as tool call arguments that stream as JSON
+PLAN_RESPONSE_FORMAT = ToolStrategy(TravelPlanTeamResponse)
+PLAN_TOOL_NAME = TravelPlanTeamResponse.__name__
+
+
+class IncrementalJSONParser:
+    """
+    Parses a JSON object that arrives in chunks and returns each element of
+    its top-level arrays as soon as the element is complete.
+
+    Only the top-level object's keys and array boundaries are tracked; each
+    finished element is decoded with json.loads once. Elements of nested
+    arrays and top-level scalar fields are not reported.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._item_start: Optional[int] = None
+
+    def _in_top_array(self) -> bool:
+        return len(self._stack) == 2 and self._stack[1] == "["
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add a chunk of JSON text.
+
+        Returns:
+            (top-level key, element) for each array element completed by the chunk
+        """
+        self._text += chunk
+        completed = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                    elif self._in_top_array() and self._item_start is not None:
+                        completed.append(self._element(self._item_start, i + 1))
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._in_top_array():
+                    self._item_start = i
+            elif c in "{[":
+                self._stack.append(c)
+                if len(self._stack) == 1:
+                    self._expect_key = True
+                elif len(self._stack) == 3 and self._stack[1] == "[":
+                    self._item_start = i
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._in_top_array() and self._item_start is not None:
+                    completed.append(self._element(self._item_start, i + 1))
+            elif len(self._stack) == 1:
+                if c == ":":
+                    self._expect_key = False
+                elif c == ",":
+                    self._expect_key = True
+        self._pos = len(text)
+        return [item for item in completed if item is not None]
+
+    def _element(self, start: int, end: int) -> Optional[Tuple[str, Any]]:
+        self._item_start = None
+        try:
+            return self._key, json.loads(self._text[start:end])
+        except ValueError:
+            return None
+
+
+class PlanStream:
+    """
+    Turns the planning model's streamed chunks into completed DayByDayPlan entries.
+
+    Fed the AIMessageChunks of one model call; only the arguments of the
+    TravelPlanTeamResponse tool call are parsed. If the agent calls the model
+    again (e.g. after a schema validation error), use a new PlanStream for
+    the new call; days may then be reported again and replace earlier ones.
+    """
+
+    def __init__(self):
+        self._names: Dict[Any, Optional[str]] = {}
+        self._parsers: Dict[Any, IncrementalJSONParser] = {}
+
+    def feed(self, chunk) -> List[DayByDayPlan]:
+        """Get the days completed by a message chunk."""
+        days = []
+        for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+            index = tool_chunk.get("index")
+            if tool_chunk.get("name"):
+                self._names[index] = tool_chunk["name"]
+            if self._names.get(index) != PLAN_TOOL_NAME or not tool_chunk.get("args"):
+                continue
+            parser = self._parsers.setdefault(index, IncrementalJSONParser())
+            for key, element in parser.feed(tool_chunk["args"]):
+                if key != "day_by_day_plan":
+                    continue
+                try:
+                    days.append(DayByDayPlan.model_validate(element))
+                except ValidationError as e:
+                    logger.debug(f"Skipping malformed streamed day plan: {e}")
+        return days
+
+
+def render_itinerary(plan: TravelPlanTeamResponse) -> str:
+    """Render a plan's days, attractions and tips as markdown (the itinerary text)."""
+    lines = ["## Day-by-Day Itinerary"]
+    for day in plan.day_by_day_plan:
+        lines.append(f"\n### Day {day.day}" + (f" ({day.date})" if day.date else ""))
+        for label, text in (("Morning", day.morning), ("Afternoon", day.afternoon),
+                            ("Evening", day.evening), ("Notes", day.notes)):
+            if text:
+                lines.append(f"- **{label}:** {text}")
+    if plan.attractions:
+        lines.append("\n## Attractions")
+        lines.extend(f"- **{a.name}:** {a.description}" for a in plan.attractions)
+    if plan.tips:
+        lines.append("\n## Travel Tips")
+        lines.extend(f"- {tip}" for tip in plan.tips)
+    return "\n".join(lines)
+
+
+def render_budget_analysis(plan: TravelPlanTeamResponse) -> str:
+    """Render a plan's budget insights as markdown (the budget analysis text)."""
+    return "\n".join(["## Budget Analysis"] + [f"- {insight}" for insight in plan.budget_insights])
@@ -0,0 +1,80 @@
+"""HTTP API for the travel planner service."""
+
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from models.travel_plan import TravelPlanAgentRequest
+from services.plan_service import generate_travel_plan, stream_travel_plan
+from agents.langgraph_workflow import shutdown_workflow
+from tools.singleflight import get_single_flight_stats
+from tools.hedging import get_hedge_stats
+from tools.concurrency import get_tool_concurrency_stats
+from tools.duckduckgo_search import get_ddgs_pool_stats
+from tools.wikipedia_index import wikipedia_index
+from tools.http_client import http_client
+from tools.source_policy import source_policies
+from tools.google_flight import get_flight_search_stats
+from config.bedrock import bedrock_pool
+from config.rate_governor import rate_governor
+from config.llm_cache import llm_cache
+from config.prompt_cache import prompt_cache_usage
+from config.model_routing import model_router
+from config.token_budget import planning_context_budget
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await shutdown_workflow()
+
+
+app = FastAPI(title="Travel Planner", lifespan=lifespan)
+
+
+def format_sse(event: dict) -> str:
+    """Format an event dictionary as a server-sent event."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@app.post("/travel-plans")
+async def create_travel_plan(request: TravelPlanAgentRequest, resume: bool = True):
+    """Generate a travel plan and return it when all agents have finished."""
+    result = await generate_travel_plan(request, resume=resume)
+    return Response(content=result, media_type="application/json")
+
+
+@app.post("/travel-plans/stream")
+async def stream_travel_plan_events(request: TravelPlanAgentRequest, resume: bool = True):
+    """Generate a travel plan, streaming progress and itinerary tokens over SSE."""
+
+    async def event_stream():
+        async for event in stream_travel_plan(request, resume=resume):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for the shared tool and agent layers."""
+    return {
+        "single_flight": get_single_flight_stats(),
+        "hedging": get_hedge_stats(),
+        "tool_concurrency": get_tool_concurrency_stats(),
+        "ddgs_pool": get_ddgs_pool_stats(),
+        "wikipedia_index": wikipedia_index.stats(),
+        "http_client": http_client.stats(),
+        "source_policies": source_policies.stats(),
+        "flight_search": get_flight_search_stats(),
+        "bedrock_pool": bedrock_pool.stats(),
+        "rate_governor": rate_governor.stats(),
+        "llm_cache": llm_cache.stats(),
+        "prompt_cache": prompt_cache_usage.stats(),
+        "model_routing": model_router.stats(),
+        "planning_context": planning_context_budget.stats(),
+    }
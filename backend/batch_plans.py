@@ -0,0 +1,81 @@
+"""Generate travel plans in bulk from a JSONL file of TravelPlanAgentRequest records."""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dotenv import load_dotenv
+from loguru import logger
+from pydantic import ValidationError
+from config.logger import setup_logging
+from models.travel_plan import TravelPlanAgentRequest
+from services.plan_service import generate_travel_plans_batch
+from agents.langgraph_workflow import shutdown_workflow
+
+
+def read_requests(path: str) -> list:
+    """Read TravelPlanAgentRequest records from a JSONL file, skipping invalid lines."""
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                requests.append(TravelPlanAgentRequest.model_validate_json(line))
+            except ValidationError as e:
+                logger.error(f"Skipping invalid request on line {line_number}: {e}")
+    return requests
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: int, share_research: bool):
+    """Run the batch and append each result to the output JSONL as it completes."""
+    requests = read_requests(input_path)
+    logger.info(f"Loaded {len(requests)} requests from {input_path}")
+
+    time_start = time.time()
+    completed = 0
+    failed = 0
+
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        async for result in generate_travel_plans_batch(
+            requests,
+            concurrency=concurrency,
+            share_research=share_research,
+        ):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            completed += 1
+            if result.get("success") is False or result.get("errors"):
+                failed += 1
+            logger.info(f"[{completed}/{len(requests)}] {result.get('trip_plan_id')} done")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await shutdown_workflow()
+
+    logger.info(
+        f"Batch finished: {completed} plans ({failed} with errors) "
+        f"in {time.time() - time_start:.2f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    # Logs go to stderr, so they do not mix with results written to stdout
+    setup_logging(console_level="INFO", console=sys.stderr)
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("input", help="JSONL file with one TravelPlanAgentRequest per line")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Workflows to run at once")
+    parser.add_argument(
+        "--no-share-research",
+        action="store_true",
+        help="Research every request separately instead of once per destination",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run_batch(args.input, args.output, args.concurrency, not args.no_share_research))
@@ -0,0 +1,83 @@
+"""
+Measure the tokens a Kayak hotel search adds to a booking run, before and after result parsing.
+
+Before: search_kayak_hotels returned the page's visible text, up to
+SCRAPER_MAX_CHARS (both the original full-tree extraction and the streaming
+one are shown). After: it returns a table of the top hotels parsed by
+KayakResultParser. Runs offline on the saved Kayak fixtures
+(fixtures/html/kayak_*.html.gz).
+
+A tool result stays in the booking agent's conversation, so it is sent again
+with every later model call of the run; the per-run estimate is
+searches * later calls * result tokens.
+
+    python benchmark_kayak_tokens.py
+    python benchmark_kayak_tokens.py --max-results 5 --searches 2 --later-calls 3
+"""
+
+import glob
+import gzip
+import os
+import argparse
+from tools.html_text import StreamingTextExtractor, SCRAPER_MAX_BYTES
+from tools.http_client import HTTP_STREAM_CHUNK_BYTES
+from tools.kayak_parser import KayakResultParser, format_hotel_table
+from config.token_budget import count_tokens
+from benchmark_scraper import extract_full_tree
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html", "kayak_*.html.gz")
+
+
+def read_chunks(path: str):
+    with gzip.open(path, "rb") as page:
+        read = 0
+        while read < SCRAPER_MAX_BYTES:
+            chunk = page.read(min(HTTP_STREAM_CHUNK_BYTES, SCRAPER_MAX_BYTES - read))
+            if not chunk:
+                return
+            read += len(chunk)
+            yield chunk
+
+
+def page_text(path: str) -> str:
+    """The tool result before parsing: the page's visible text."""
+    extractor = StreamingTextExtractor()
+    for chunk in read_chunks(path):
+        if extractor.feed(chunk):
+            break
+    return extractor.text()
+
+
+def hotel_table(path: str, max_results: int) -> tuple:
+    """The tool result now: the top hotels as a table (and the parsed hotels)."""
+    parser = KayakResultParser(max_results)
+    for chunk in read_chunks(path):
+        if parser.feed(chunk):
+            break
+    hotels = parser.hotels()
+    return format_hotel_table(hotels, f"Top {len(hotels)} hotels on Kayak:"), hotels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", help="Gzipped Kayak result pages (default: fixtures/html/kayak_*)")
+    parser.add_argument("--max-results", type=int, default=10, help="Hotels per search (tool default 10)")
+    parser.add_argument("--searches", type=int, default=1, help="Hotel searches per booking run")
+    parser.add_argument("--later-calls", type=int, default=2, help="Model calls that resend each result")
+    args = parser.parse_args()
+
+    per_run = args.searches * args.later_calls
+    print("\n" + "="*80)
+    print(f"Kayak tool result tokens ({args.searches} search(es) x {args.later_calls} later model calls per run)")
+    print("="*80)
+    print(f"{'Fixture':<34} {'Path':<11} {'Tokens':>7} {'Per run':>8} {'Hotels with price':>18}")
+    for path in args.fixtures or sorted(glob.glob(FIXTURES)):
+        table, hotels = hotel_table(path, args.max_results)
+        name = os.path.basename(path)
+        for label, result in (("full tree", extract_full_tree(path)[0]), ("streaming", page_text(path)), ("table", table)):
+            # Hotels whose name and price both made it into the result
+            count = sum(1 for h in hotels if h.hotel_name in result and h.price.split(" ")[0] in result)
+            tokens = count_tokens(result)
+            print(f"{name:<34} {label:<11} {tokens:>7} {tokens * per_run:>8} {count:>18}")
+            name = ""
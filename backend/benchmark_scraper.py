@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: scraper text extraction, full BeautifulSoup tree vs streaming.
+
+Runs both extraction paths on the saved HTML fixtures (fixtures/html/*.html.gz)
+and reports time per page, peak memory and bytes read. The streaming path
+reads the page in chunks, as it arrives from the network, and stops at the
+character budget or SCRAPER_MAX_BYTES.
+
+    python benchmark_scraper.py
+    python benchmark_scraper.py --iterations 50 fixtures/html/kayak_hotels_paris.html.gz
+"""
+
+import glob
+import gzip
+import os
+import argparse
+import statistics
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from tools.html_text import StreamingTextExtractor, SCRAPER_MAX_BYTES, SCRAPER_MAX_CHARS, etree
+from tools.http_client import HTTP_STREAM_CHUNK_BYTES
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html", "*.html.gz")
+
+
+def extract_full_tree(path: str) -> tuple:
+    """Extraction as done before streaming: read the whole body, build the soup, then cut."""
+    with gzip.open(path, "rb") as page:
+        content = page.read()
+    soup = BeautifulSoup(content, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    if len(text) > SCRAPER_MAX_CHARS:
+        text = text[:SCRAPER_MAX_CHARS] + "... [truncated]"
+    return text, len(content)
+
+
+def extract_streaming(path: str) -> tuple:
+    """Extraction as the scraper does it now, fed HTTP_STREAM_CHUNK_BYTES at a time."""
+    extractor = StreamingTextExtractor()
+    truncated = False
+    with gzip.open(path, "rb") as page:
+        while True:
+            chunk = page.read(HTTP_STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            if extractor.bytes_read + len(chunk) > SCRAPER_MAX_BYTES:
+                chunk = chunk[:SCRAPER_MAX_BYTES - extractor.bytes_read]
+                truncated = True
+            if extractor.feed(chunk) or truncated:
+                truncated = True
+                break
+    return extractor.text(truncated=truncated), extractor.bytes_read
+
+
+def measure(func, path: str, iterations: int) -> dict:
+    """Time func over a number of iterations, then measure its peak memory once."""
+    samples = []
+    for _ in range(iterations):
+        time_start = time.perf_counter()
+        text, bytes_read = func(path)
+        samples.append((time.perf_counter() - time_start) * 1000)
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": statistics.median(samples), "peak_mb": peak / 1024 / 1024, "bytes": bytes_read, "chars": len(text)}
+
+
+def report(label: str, result: dict):
+    print(
+        f"  {label:<12} median {result['ms']:>8.1f} ms   peak {result['peak_mb']:>7.1f} MB   "
+        f"read {result['bytes'] / 1024:>7.0f} KB   text {result['chars']:>5} chars"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", help="Gzipped HTML pages (default: fixtures/html)")
+    parser.add_argument("--iterations", type=int, default=10, help="Runs per page and path")
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print(f"Scraper extraction over {args.iterations} iterations "
+          f"(streaming parser: {'lxml' if etree is not None else 'html.parser'})")
+    print("="*80)
+    for path in args.fixtures or sorted(glob.glob(FIXTURES)):
+        full_tree = measure(extract_full_tree, path, args.iterations)
+        streaming = measure(extract_streaming, path, args.iterations)
+        print(os.path.basename(path))
+        report("Full tree", full_tree)
+        report("Streaming", streaming)
+        print(f"  Speedup {full_tree['ms'] / streaming['ms']:.1f}x, "
+              f"peak memory {full_tree['peak_mb'] / max(streaming['peak_mb'], 0.001):.1f}x lower")
@@ -0,0 +1,78 @@
+"""Micro-benchmark: per-request setup cost with and without the component registry."""
+
+import argparse
+import statistics
+import time
+from langchain.agents import create_agent
+from config.llm import get_bedrock_model
+from agents.registry import registry, get_agent
+from agents.langgraph_workflow import create_travel_planning_graph, get_travel_planning_graph
+from agents.langgraph_nodes import (
+    ASYNC_RESEARCH_TOOLS,
+    ASYNC_BOOKING_TOOLS,
+    ASYNC_PLANNING_TOOLS,
+)
+
+
+NODE_TOOLS = {
+    "research_discovery_async": ASYNC_RESEARCH_TOOLS,
+    "booking_logistics_async": ASYNC_BOOKING_TOOLS,
+    "planning_optimization_async": ASYNC_PLANNING_TOOLS,
+}
+
+
+def setup_per_request():
+    """Setup as done before the registry: compile the graph, build every model and agent."""
+    create_travel_planning_graph()
+    for tools in NODE_TOOLS.values():
+        model = get_bedrock_model(temperature=0.3, max_tokens=4096)
+        create_agent(model, tools)
+
+
+def setup_from_registry():
+    """Setup through the registry: look up the shared graph and agents."""
+    get_travel_planning_graph()
+    for name, tools in NODE_TOOLS.items():
+        get_agent(name, tools)
+
+
+def measure(func, iterations: int) -> list:
+    """Time func over a number of iterations, in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        time_start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - time_start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list):
+    print(
+        f"{label:<22} mean {statistics.mean(samples):>9.3f} ms   "
+        f"median {statistics.median(samples):>9.3f} ms   "
+        f"max {max(samples):>9.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20, help="Requests to simulate")
+    args = parser.parse_args()
+
+    registry.clear()
+    per_request = measure(setup_per_request, args.iterations)
+
+    registry.clear()
+    time_start = time.perf_counter()
+    setup_from_registry()
+    first_call_ms = (time.perf_counter() - time_start) * 1000
+    cached = measure(setup_from_registry, args.iterations)
+
+    print("\n" + "="*80)
+    print(f"Setup cost per request over {args.iterations} iterations")
+    print("="*80)
+    report("Rebuild per request", per_request)
+    report("Registry (warm)", cached)
+    print(f"Registry first call:   {first_call_ms:.3f} ms (paid once per process)")
+    print("-"*80)
+    print(f"Setup time removed per request: {statistics.mean(per_request) - statistics.mean(cached):.3f} ms")
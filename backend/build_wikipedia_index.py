@@ -0,0 +1,114 @@
+"""
+Build the local Wikipedia summary index from a dump.
+
+Accepts either the Wikipedia abstracts dump (enwiki-latest-abstract.xml.gz)
+or JSON lines with "title", "text" and optional "url" fields, as written by
+WikiExtractor --json. Files may be gzip or bz2 compressed. By default only
+pages that look like travel destinations are indexed.
+
+    python build_wikipedia_index.py enwiki-latest-abstract.xml.gz
+    python build_wikipedia_index.py extracts.jsonl.bz2 --all --benchmark Paris Kyoto
+"""
+
+import bz2
+import gzip
+import json
+import re
+import time
+import argparse
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, Tuple
+from urllib.parse import quote
+from tools.wikipedia_index import WikipediaIndex, wikipedia_index
+
+
+# Lead sections that mention one of these describe a place worth indexing
+DESTINATION_PATTERN = re.compile(
+    r"\b(city|town|village|capital|island|archipelago|country|state|province|region|municipality|"
+    r"prefecture|county|district|national park|beach|resort|mountain|lake|river|valley|coast|"
+    r"landmark|museum|cathedral|temple|palace|castle|monument|tourist|tourism|UNESCO)\b",
+    re.IGNORECASE,
+)
+SUMMARY_MAX_CHARS = 4000
+ABSTRACT_TITLE_PREFIX = "Wikipedia: "
+
+
+def open_dump(path: str) -> IO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def read_abstracts(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Stream (title, summary, url) from an abstracts XML dump."""
+    with open_dump(path) as dump:
+        for _, element in ET.iterparse(dump, events=("end",)):
+            if element.tag != "doc":
+                continue
+            title = element.findtext("title", "")
+            if title.startswith(ABSTRACT_TITLE_PREFIX):
+                title = title[len(ABSTRACT_TITLE_PREFIX):]
+            yield title, element.findtext("abstract", "") or "", element.findtext("url", "") or ""
+            element.clear()
+
+
+def read_extracts(path: str) -> Iterator[Tuple[str, str, str]]:
+    """Stream (title, lead section, url) from JSON lines extracts."""
+    with open_dump(path) as dump:
+        for line in dump:
+            try:
+                page = json.loads(line)
+            except ValueError:
+                continue
+            title = page.get("title", "")
+            text = page.get("text", "").strip()
+            # The lead section ends at the first heading or blank line
+            lead = re.split(r"\n\s*\n|\n==", text, maxsplit=1)[0].strip()
+            url = page.get("url") or "https://en.wikipedia.org/wiki/" + quote(title.replace(" ", "_"))
+            yield title, lead, url
+
+
+def iter_pages(path: str, travel_only: bool, limit: int) -> Iterator[Tuple[str, str, str]]:
+    reader = read_abstracts if ".xml" in path else read_extracts
+    count = 0
+    for title, summary, url in reader(path):
+        if not title or len(summary) < 40 or summary.lower().startswith(("may refer to", f"{title.lower()} may refer to")):
+            continue  # Empty, stub or disambiguation page
+        if travel_only and not DESTINATION_PATTERN.search(summary):
+            continue
+        yield title, summary[:SUMMARY_MAX_CHARS], url
+        count += 1
+        if limit and count >= limit:
+            break
+
+
+def benchmark(index: WikipediaIndex, queries: list, rounds: int = 100):
+    print(f"\n{'Query':<30} {'Hit':<6} {'Avg ms':>8}")
+    for query in queries:
+        time_start = time.perf_counter()
+        for _ in range(rounds):
+            row = index.lookup(query)
+        elapsed_ms = (time.perf_counter() - time_start) * 1000 / rounds
+        print(f"{query:<30} {'yes' if row else 'no':<6} {elapsed_ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump", help="Abstracts XML dump or JSON lines extracts")
+    parser.add_argument("--all", action="store_true", help="Index every page, not only destinations")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many pages")
+    parser.add_argument("--index", default=None, help="Index database (default WIKIPEDIA_INDEX_PATH)")
+    parser.add_argument("--benchmark", nargs="*", default=[], help="Queries to time against the built index")
+    args = parser.parse_args()
+
+    index = WikipediaIndex(args.index) if args.index else wikipedia_index
+    time_start = time.perf_counter()
+    count = index.put_many(iter_pages(args.dump, not args.all, args.limit), source="dump")
+    index.optimize()
+    print(f"Indexed {count} pages into {index.path} in {time.perf_counter() - time_start:.1f} seconds")
+
+    if args.benchmark:
+        benchmark(index, args.benchmark)
+    index.close()
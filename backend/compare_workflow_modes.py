@@ -0,0 +1,76 @@
+"""Compare wall-clock time of the parallel and sequential workflow graphs."""
+
+import argparse
+import asyncio
+import time
+from models.travel_plan import TravelPlanRequest
+from services.plan_service import travel_request_to_markdown
+from agents.langgraph_workflow import run_travel_planning_workflow, shutdown_workflow
+from loguru import logger
+
+
+async def _run_modes(travel_request_md: str, destination: str, runs: int, rows: list):
+    """Run each mode once per run and append (run, sequential, parallel, saving) rows."""
+    for run in range(1, runs + 1):
+        timings = {}
+        for mode in ("sequential", "parallel"):
+            time_start = time.perf_counter()
+            await run_travel_planning_workflow(
+                trip_plan_id=f"compare-{mode}-{run}",
+                travel_request_md=travel_request_md,
+                destination=destination,
+                mode=mode,
+                checkpoints=False,  # A checkpointed rerun would skip the agents
+            )
+            timings[mode] = time.perf_counter() - time_start
+
+        saving = timings["sequential"] - timings["parallel"]
+        rows.append((run, timings["sequential"], timings["parallel"], saving))
+        logger.info(
+            f"Run {run}: sequential {timings['sequential']:.2f}s, "
+            f"parallel {timings['parallel']:.2f}s, saved {saving:.2f}s"
+        )
+
+
+async def compare_workflow_modes(runs: int = 1):
+    """Run the same trip through both graph modes and report the saving per run."""
+
+    travel_plan = TravelPlanRequest(
+        name="Test User",
+        destination="Paris",
+        starting_location="New York",
+        duration=5,
+        adults=2,
+        children=0,
+        budget=5000,
+        budget_currency="USD",
+        travel_style="comfort",
+        vibes=["romantic", "cultural"],
+        priorities=["museums", "food"],
+        interests="Art, history, French cuisine",
+    )
+    travel_request_md = travel_request_to_markdown(travel_plan)
+
+    rows = []
+    try:
+        await _run_modes(travel_request_md, travel_plan.destination, runs, rows)
+    finally:
+        await shutdown_workflow()
+
+    print("\n" + "="*80)
+    print(f"{'Run':>4} {'Sequential (s)':>16} {'Parallel (s)':>14} {'Saved (s)':>11} {'Saved (%)':>10}")
+    print("="*80)
+    for run, sequential, parallel, saving in rows:
+        percent = (saving / sequential * 100) if sequential else 0.0
+        print(f"{run:>4} {sequential:>16.2f} {parallel:>14.2f} {saving:>11.2f} {percent:>9.1f}%")
+
+    mean_saving = sum(row[3] for row in rows) / len(rows)
+    print("-"*80)
+    print(f"Mean wall-clock saving per run: {mean_saving:.2f} seconds")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=1, help="Number of runs per mode")
+    args = parser.parse_args()
+    asyncio.run(compare_workflow_modes(args.runs))
@@ -1,9 +1,11 @@
 """AWS Bedrock configuration."""
 
 import os
+import threading
 import boto3
+from botocore.config import Config
 from anthropic import AnthropicBedrock
-from typing import Optional
+from typing import Any, Callable, Dict, Hashable, Optional
 from loguru import logger
 
 
@@ -15,18 +17,39 @@ class BedrockConfig:
         self.aws_access_key = os.getenv('AWS_ACCESS_KEY_ID')
         self.aws_secret_key = os.getenv('AWS_SECRET_ACCESS_KEY')
         self.aws_session_token = os.getenv('AWS_SESSION_TOKEN')
+        self.max_pool_connections = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', '50'))
+        # Point the runtime client elsewhere, e.g. at fake_bedrock.py for load tests
+        self.runtime_endpoint_url = os.getenv('BEDROCK_ENDPOINT_URL')
     
-    def get_bedrock_runtime_client(self):
+    def get_client_config(self) -> Config:
+        """Get botocore config sizing the HTTP connection pool of a client."""
+        return Config(max_pool_connections=self.max_pool_connections)
+    
+    def get_bedrock_runtime_client(self, region: Optional[str] = None):
         """Get boto3 Bedrock Runtime client."""
         try:
             return boto3.client(
                 service_name='bedrock-runtime',
-                region_name=self.region
+                region_name=region or self.region,
+                endpoint_url=self.runtime_endpoint_url,
+                config=self.get_client_config(),
             )
         except Exception as e:
             logger.error(f"Failed to create Bedrock runtime client: {e}")
             raise
     
+    def get_bedrock_client(self, region: Optional[str] = None):
+        """Get boto3 Bedrock (control plane) client."""
+        try:
+            return boto3.client(
+                service_name='bedrock',
+                region_name=region or self.region,
+                config=self.get_client_config(),
+            )
+        except Exception as e:
+            logger.error(f"Failed to create Bedrock client: {e}")
+            raise
+    
     def get_anthropic_bedrock_client(self):
         """Get Anthropic Bedrock client (for direct Claude access)."""
         try:
@@ -49,6 +72,132 @@ BEDROCK_MODELS = {
     "claude_3_opus": "us.anthropic.claude-3-opus-20240229-v1:0",
 }
 
-# Global config instance
-bedrock_config = BedrockConfig()
+# Largest max_tokens each model accepts; Bedrock rejects larger requests
+# with a ValidationException
+MODEL_MAX_OUTPUT_TOKENS = {
+    "claude_sonnet_4": 64000,
+    "claude_3_5_sonnet": 8192,
+    "claude_3_haiku": 4096,
+    "claude_3_opus": 4096,
+}
+
+
+def max_output_tokens(model_name: str) -> int:
+    """Get the largest max_tokens a model key accepts (4096 if unknown)."""
+    return MODEL_MAX_OUTPUT_TOKENS.get(model_name, 4096)
+
+
+class BedrockClientPool:
+    """
+    Lazily created Bedrock clients shared across concurrent runs.
+
+    Nothing is created until first use, so importing the service does not
+    build AWS clients or resolve credentials. There is one boto3 runtime
+    client per region, whose connection pool (BEDROCK_MAX_POOL_CONNECTIONS)
+    is shared by every model on that region, and one model client per
+    (model_id, temperature, max_tokens, region).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._config: Optional[BedrockConfig] = None
+        self._runtime_clients: Dict[str, Any] = {}
+        self._control_clients: Dict[str, Any] = {}
+        self._models: Dict[Hashable, Any] = {}
+        self._model_uses: Dict[Hashable, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._peak_in_flight: Dict[str, int] = {}
+        self._requests: Dict[str, int] = {}
+
+    @property
+    def config(self) -> BedrockConfig:
+        with self._lock:
+            if self._config is None:
+                self._config = BedrockConfig()
+            return self._config
+
+    def get_runtime_client(self, region: Optional[str] = None):
+        """Get the shared Bedrock Runtime client for a region."""
+        region = region or self.config.region
+        with self._lock:
+            client = self._runtime_clients.get(region)
+            if client is None:
+                client = self.config.get_bedrock_runtime_client(region)
+                events = client.meta.events
+                events.register("before-send.bedrock-runtime.*", lambda **kwargs: self._request_started(region))
+                events.register("response-received.bedrock-runtime.*", lambda **kwargs: self._request_finished(region))
+                self._runtime_clients[region] = client
+                logger.info(
+                    f"Created Bedrock runtime client for {region} "
+                    f"(max {self.config.max_pool_connections} connections)"
+                )
+            return client
+
+    def get_control_client(self, region: Optional[str] = None):
+        """Get the shared Bedrock control plane client for a region."""
+        region = region or self.config.region
+        with self._lock:
+            client = self._control_clients.get(region)
+            if client is None:
+                client = self.config.get_bedrock_client(region)
+                self._control_clients[region] = client
+            return client
+
+    def get_model(self, model_id: str, temperature: float, max_tokens: int, region: str, factory: Callable[[], Any]):
+        """
+        Get the shared model client for a key, building it with factory on first use.
+
+        Args:
+            model_id: Bedrock model ID
+            temperature: Model temperature
+            max_tokens: Maximum tokens to generate
+            region: AWS region
+            factory: Zero-argument callable that builds the model client
+
+        Returns:
+            The shared model client
+        """
+        key = (model_id, temperature, max_tokens, region)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = factory()
+                self._models[key] = model
+            self._model_uses[key] = self._model_uses.get(key, 0) + 1
+            return model
+
+    def _request_started(self, region: str):
+        # Returning None lets botocore send the request as usual
+        with self._lock:
+            self._requests[region] = self._requests.get(region, 0) + 1
+            self._in_flight[region] = self._in_flight.get(region, 0) + 1
+            self._peak_in_flight[region] = max(self._peak_in_flight.get(region, 0), self._in_flight[region])
+
+    def _request_finished(self, region: str):
+        with self._lock:
+            self._in_flight[region] = max(0, self._in_flight.get(region, 0) - 1)
+
+    def stats(self) -> dict:
+        """Get client counts and connection pool utilization per region."""
+        with self._lock:
+            pool_size = self._config.max_pool_connections if self._config else None
+            regions = {}
+            for region in self._runtime_clients:
+                in_flight = self._in_flight.get(region, 0)
+                regions[region] = {
+                    "requests": self._requests.get(region, 0),
+                    "in_flight": in_flight,
+                    "peak_in_flight": self._peak_in_flight.get(region, 0),
+                    "utilization": round(in_flight / pool_size, 3) if pool_size else None,
+                }
+            return {
+                "max_pool_connections": pool_size,
+                "runtime_clients": len(self._runtime_clients),
+                "models": {"/".join(str(part) for part in key): uses for key, uses in self._model_uses.items()},
+                "regions": regions,
+            }
+
+
+# Global client pool (clients are created on first use)
+bedrock_pool = BedrockClientPool()
 
@@ -0,0 +1,56 @@
+"""Deadline budgets for the travel planning workflow."""
+
+import os
+import time
+from typing import Optional
+
+
+class DeadlineConfig:
+    """
+    Per-workflow and per-node time budgets.
+
+    The workflow deadline is the latency target for a whole trip (set it to
+    the p99 you want generate_travel_plan to meet). Each node also has its own
+    budget, and nodes that run before Planning & Optimization stop early
+    enough to leave it its reserved time.
+    """
+
+    def __init__(self):
+        self.workflow_seconds = float(os.getenv("WORKFLOW_DEADLINE_SECONDS", "240"))
+        self.planning_reserve_seconds = float(os.getenv("PLANNING_RESERVE_SECONDS", "90"))
+        self.node_seconds = {
+            "research_prefetch": float(os.getenv("RESEARCH_PREFETCH_DEADLINE_SECONDS", "20")),
+            "research_discovery": float(os.getenv("RESEARCH_DEADLINE_SECONDS", "120")),
+            "booking_logistics": float(os.getenv("BOOKING_DEADLINE_SECONDS", "120")),
+            "planning_optimization": float(os.getenv("PLANNING_DEADLINE_SECONDS", "120")),
+        }
+
+    def workflow_deadline(self) -> float:
+        """Get the deadline (time.monotonic() based) for a workflow starting now."""
+        return time.monotonic() + self.workflow_seconds
+
+    def node_deadline(self, node: str, workflow_deadline: Optional[float] = None) -> float:
+        """
+        Get the deadline for a node starting now.
+
+        Args:
+            node: Workflow node name
+            workflow_deadline: Deadline of the enclosing workflow, if any
+
+        Returns:
+            time.monotonic() based deadline
+        """
+        deadline = time.monotonic() + self.node_seconds.get(node, self.workflow_seconds)
+        if workflow_deadline is not None:
+            reserve = 0.0 if node == "planning_optimization" else self.planning_reserve_seconds
+            deadline = min(deadline, workflow_deadline - reserve)
+        return deadline
+
+
+def remaining_seconds(deadline: float) -> float:
+    """Seconds left until a time.monotonic() based deadline."""
+    return deadline - time.monotonic()
+
+
+# Global deadline config instance
+deadline_config = DeadlineConfig()
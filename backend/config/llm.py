@@ -1,30 +1,54 @@
 """LLM configuration for LangGraph agents using AWS Bedrock."""
 
-import os
 import time
+import random
+import asyncio
 from langchain_aws import ChatBedrock
-from config.bedrock import bedrock_config, BEDROCK_MODELS
+from config.bedrock import bedrock_pool, BEDROCK_MODELS
+from config.rate_governor import rate_governor
+from config.llm_cache import llm_cache, LLM_CACHE_ENABLED
+from config.prompt_cache import prompt_cache_usage
 from loguru import logger
 from botocore.exceptions import ClientError
+from typing import Optional
 
 
-def get_bedrock_model(model_name: str = "claude_3_5_sonnet", temperature: float = 0.3, max_tokens: int = 4096):
+class DeadlineExceeded(Exception):
+    """An agent call ran out of time; partial holds the agent state reached so far."""
+
+    def __init__(self, message: str, partial: Optional[dict] = None):
+        super().__init__(message)
+        self.partial = partial
+
+
+def get_bedrock_model(
+    model_name: str = "claude_3_5_sonnet",
+    temperature: float = 0.3,
+    max_tokens: int = 4096,
+    region: Optional[str] = None,
+):
     """
     Get AWS Bedrock model for LangChain with retry logic.
     
     Uses ChatBedrock which is specifically designed for AWS Bedrock models.
-    This is the correct class for Bedrock, NOT OpenAI.
+    This is the correct class for Bedrock, NOT OpenAI. Each call builds a new
+    ChatBedrock, but on the pooled boto3 clients, so HTTP connections are
+    shared; use get_pooled_model to share the model client as well.
     
     Args:
         model_name: Key from BEDROCK_MODELS dict
         temperature: Model temperature
         max_tokens: Maximum tokens to generate
+        region: AWS region (defaults to AWS_REGION)
     
     Returns:
         ChatBedrock model instance (Bedrock-specific, not OpenAI)
     """
     try:
         model_id = BEDROCK_MODELS.get(model_name, BEDROCK_MODELS["claude_3_5_sonnet"])
+        region = region or bedrock_pool.config.region
+        client = bedrock_pool.get_runtime_client(region)
+        rate_governor.attach(client)
         
         # ChatBedrock is the correct class for AWS Bedrock models
         # It automatically uses AWS credentials from boto3/environment
@@ -34,7 +58,11 @@ def get_bedrock_model(model_name: str = "claude_3_5_sonnet", temperature: float
                 "temperature": temperature,
                 "max_tokens": max_tokens,
             },
-            region_name=os.getenv('AWS_REGION', 'us-east-1'),
+            region_name=region,
+            client=client,
+            bedrock_client=bedrock_pool.get_control_client(region),
+            cache=llm_cache if LLM_CACHE_ENABLED else None,
+            callbacks=[prompt_cache_usage],
         )
         
         logger.info(f"Initialized AWS Bedrock model: {model_id}")
@@ -45,10 +73,42 @@ def get_bedrock_model(model_name: str = "claude_3_5_sonnet", temperature: float
         raise
 
 
+def get_pooled_model(
+    model_name: str = "claude_3_5_sonnet",
+    temperature: float = 0.3,
+    max_tokens: int = 4096,
+    region: Optional[str] = None,
+):
+    """
+    Get the shared Bedrock model client for (model_id, temperature, max_tokens, region).
+    
+    Args:
+        model_name: Key from BEDROCK_MODELS dict
+        temperature: Model temperature
+        max_tokens: Maximum tokens to generate
+        region: AWS region (defaults to AWS_REGION)
+    
+    Returns:
+        Shared ChatBedrock model instance
+    """
+    model_id = BEDROCK_MODELS.get(model_name, BEDROCK_MODELS["claude_3_5_sonnet"])
+    region = region or bedrock_pool.config.region
+    return bedrock_pool.get_model(
+        model_id,
+        temperature,
+        max_tokens,
+        region,
+        lambda: get_bedrock_model(model_name, temperature, max_tokens, region),
+    )
+
+
 def invoke_agent_with_retry(agent, input_data, max_retries: int = 5, initial_delay: float = 2.0):
     """
     Invoke agent with exponential backoff retry logic for throttling errors.
     
+    Waits are drawn uniformly up to the exponential delay (full jitter) so
+    concurrent workflows throttled together do not retry together.
+    
     Args:
         agent: LangChain agent instance
         input_data: Input data for agent.invoke()
@@ -68,7 +128,7 @@ def invoke_agent_with_retry(agent, input_data, max_retries: int = 5, initial_del
             
             # Check if it's a throttling error
             if error_code == 'ThrottlingException' and attempt < max_retries - 1:
-                wait_time = delay * (2 ** attempt)  # Exponential backoff
+                wait_time = random.uniform(0, delay * (2 ** attempt))  # Exponential backoff, full jitter
                 logger.warning(
                     f"Throttling error (attempt {attempt + 1}/{max_retries}). "
                     f"Retrying in {wait_time:.2f} seconds..."
@@ -83,7 +143,7 @@ def invoke_agent_with_retry(agent, input_data, max_retries: int = 5, initial_del
             # Check if it's a throttling exception in the error message
             error_str = str(e)
             if 'ThrottlingException' in error_str and attempt < max_retries - 1:
-                wait_time = delay * (2 ** attempt)  # Exponential backoff
+                wait_time = random.uniform(0, delay * (2 ** attempt))  # Exponential backoff, full jitter
                 logger.warning(
                     f"Throttling error detected (attempt {attempt + 1}/{max_retries}). "
                     f"Retrying in {wait_time:.2f} seconds..."
@@ -99,6 +159,110 @@ def invoke_agent_with_retry(agent, input_data, max_retries: int = 5, initial_del
     raise Exception("Max retries reached for agent invocation")
 
 
-# Default model instance
-default_model = get_bedrock_model()
+async def _ainvoke_before(agent, input_data, deadline: float):
+    """
+    Run an agent until it finishes or the deadline passes.
+    
+    The agent is streamed so the latest state is known at all times; when the
+    deadline passes the run (and any tool calls in flight) is cancelled and
+    DeadlineExceeded carries that state as the partial result.
+    """
+    progress = {}
+    
+    async def run():
+        async for state in agent.astream(input_data, stream_mode="values"):
+            progress["state"] = state
+        return progress.get("state")
+    
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("No time left before the deadline")
+    
+    try:
+        return await asyncio.wait_for(run(), timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(
+            f"Agent did not finish within {remaining:.1f} seconds",
+            partial=progress.get("state"),
+        )
+
+
+def _check_backoff(wait_time: float, deadline: Optional[float]):
+    """Raise DeadlineExceeded if a backoff wait would run past the deadline."""
+    if deadline is not None and time.monotonic() + wait_time >= deadline:
+        raise DeadlineExceeded(f"Throttled, and a {wait_time:.1f} second backoff would pass the deadline")
+
+
+async def ainvoke_agent_with_retry(
+    agent,
+    input_data,
+    max_retries: int = 5,
+    initial_delay: float = 2.0,
+    deadline: Optional[float] = None
+):
+    """
+    Async variant of invoke_agent_with_retry.
+    
+    Uses agent.ainvoke() and asyncio.sleep() so that backoff waits and model
+    calls never block the event loop while other workflows are in flight.
+    
+    Args:
+        agent: LangChain agent instance
+        input_data: Input data for agent.ainvoke()
+        max_retries: Maximum number of retry attempts
+        initial_delay: Initial delay in seconds (will be doubled on each retry)
+        deadline: Optional time.monotonic() deadline; the run is cancelled
+            when it passes and no backoff waits beyond it
+    
+    Returns:
+        Agent response
+    
+    Raises:
+        DeadlineExceeded: The deadline passed (carries the partial agent state)
+    """
+    delay = initial_delay
+    
+    for attempt in range(max_retries):
+        try:
+            if deadline is None:
+                return await agent.ainvoke(input_data)
+            return await _ainvoke_before(agent, input_data, deadline)
+        except DeadlineExceeded:
+            raise
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            
+            # Check if it's a throttling error
+            if error_code == 'ThrottlingException' and attempt < max_retries - 1:
+                wait_time = random.uniform(0, delay * (2 ** attempt))  # Exponential backoff, full jitter
+                logger.warning(
+                    f"Throttling error (attempt {attempt + 1}/{max_retries}). "
+                    f"Retrying in {wait_time:.2f} seconds..."
+                )
+                _check_backoff(wait_time, deadline)
+                await asyncio.sleep(wait_time)
+                continue
+            else:
+                # Not a throttling error, or max retries reached
+                logger.error(f"Bedrock API error: {e}")
+                raise
+        except Exception as e:
+            # Check if it's a throttling exception in the error message
+            error_str = str(e)
+            if 'ThrottlingException' in error_str and attempt < max_retries - 1:
+                wait_time = random.uniform(0, delay * (2 ** attempt))  # Exponential backoff, full jitter
+                logger.warning(
+                    f"Throttling error detected (attempt {attempt + 1}/{max_retries}). "
+                    f"Retrying in {wait_time:.2f} seconds..."
+                )
+                _check_backoff(wait_time, deadline)
+                await asyncio.sleep(wait_time)
+                continue
+            else:
+                # Other errors - don't retry
+                logger.error(f"Error invoking agent: {e}")
+                raise
+    
+    # Should never reach here, but just in case
+    raise Exception("Max retries reached for agent invocation")
 
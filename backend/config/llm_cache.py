@@ -0,0 +1,214 @@
+"""Persistent SQLite cache for Bedrock model responses."""
+
+import os
+import time
+import sqlite3
+import hashlib
+import warnings
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+from loguru import logger
+from typing import Any, Dict, Optional
+
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+# Classes a cached response may contain
+CACHED_OBJECTS = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+# Node the current model call belongs to, and whether its request bypasses the cache
+_cache_node: ContextVar[str] = ContextVar("llm_cache_node", default="unknown")
+_cache_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def get_current_node() -> str:
+    """Get the node the current model call is attributed to ("unknown" outside a scope)."""
+    return _cache_node.get()
+
+
+@contextmanager
+def llm_cache_scope(node: str, bypass: bool = False):
+    """
+    Attribute model calls made inside the block to a node, for the cache metrics.
+
+    Args:
+        node: Workflow node name
+        bypass: Skip cache lookups for these calls (responses are still
+            stored, so the next request gets the fresh answer)
+    """
+    node_token = _cache_node.set(node)
+    bypass_token = _cache_bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _cache_node.reset(node_token)
+        _cache_bypass.reset(bypass_token)
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache for model responses, stored in SQLite on local disk.
+
+    Set as the cache of every ChatBedrock model, so it sits under the agents:
+    each model call is keyed by LangChain's serialized message list and its
+    llm_string, which holds the model ID, temperature, max_tokens and the
+    schemas of the bound tools. A hit returns the stored generations without
+    calling Bedrock. Entries expire after LLM_CACHE_TTL_SECONDS, and the least
+    recently used entries are evicted once the cache is larger than
+    LLM_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self):
+        self.path = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.sqlite")
+        self.ttl_seconds = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+        self.max_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self._node_stats: Dict[str, Dict[str, int]] = {}
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held; the database is opened on first use
+        if self._conn is None:
+            logger.info(f"Opening LLM response cache: {self.path}")
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used_at)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        return self._conn
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def _count(self, counter: str):
+        # Called with the lock held
+        stats = self._node_stats.setdefault(_cache_node.get(), {"hits": 0, "misses": 0, "bypassed": 0, "writes": 0})
+        stats[counter] += 1
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Get the cached generations for a model call, or None on a miss."""
+        with self._lock:
+            if _cache_bypass.get():
+                self._count("bypassed")
+                return None
+
+            conn = self._connect()
+            key = self._key(prompt, llm_string)
+            row = conn.execute("SELECT value, size, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= row[1]
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+
+            conn.execute("UPDATE llm_responses SET last_used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self._count("hits")
+            value = row[0]
+
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # loads is marked beta
+                return loads(value, allowed_objects=CACHED_OBJECTS)
+        except Exception as e:
+            logger.warning(f"Unreadable LLM cache entry, ignoring it: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations for a model call and evict if over the size limit."""
+        value = dumps(return_val)
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            key = self._key(prompt, llm_string)
+            now = time.time()
+            previous = conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._count("writes")
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete expired entries, then least recently used ones down to max_bytes."""
+        # Called with the lock held
+        if self._total_bytes <= self.max_bytes:
+            return
+        conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+
+        rows = conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM llm_responses WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} LLM cache entries")
+
+    def clear(self, **kwargs: Any) -> None:
+        """Delete every cached response."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        """Close the database (it is reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._total_bytes = None
+
+    def stats(self) -> dict:
+        """Get hit/miss counters per node and the cache size."""
+        with self._lock:
+            nodes = {node: dict(stats) for node, stats in self._node_stats.items()}
+            for stats in nodes.values():
+                lookups = stats["hits"] + stats["misses"]
+                stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+            return {
+                "enabled": LLM_CACHE_ENABLED,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "nodes": nodes,
+            }
+
+
+# Global cache instance (the database is opened on first use)
+llm_cache = SQLiteLLMCache()
@@ -4,11 +4,17 @@ import sys
 from loguru import logger
 
 
-def setup_logging(console_level: str = "INFO"):
-    """Setup logging configuration."""
+def setup_logging(console_level: str = "INFO", console=None):
+    """
+    Setup logging configuration.
+
+    Args:
+        console_level: Level for console logs
+        console: Stream for console logs (default: stdout)
+    """
     logger.remove()
     logger.add(
-        sys.stdout,
+        console or sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=console_level,
         colorize=True,
@@ -0,0 +1,219 @@
+"""Per-node model tier routing with latency and cost targets."""
+
+import os
+import time
+import threading
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from loguru import logger
+from config.bedrock import BEDROCK_MODELS, max_output_tokens
+from config.llm import get_pooled_model
+from config.llm_cache import get_current_node
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+# Re-route every ReAct turn on its own prompt size, not just once per node
+MODEL_ROUTING_PER_TURN = os.getenv("MODEL_ROUTING_PER_TURN", "false").lower() == "true"
+# Model keys from cheapest to most capable; escalation moves one step right
+MODEL_TIERS = [
+    name.strip() for name in os.getenv("MODEL_ROUTING_TIERS", "claude_3_haiku,claude_3_5_sonnet").split(",")
+    if name.strip() in BEDROCK_MODELS
+]
+DEFAULT_MODEL = "claude_3_5_sonnet"
+# Faster calls are LLM response cache hits and say nothing about model latency
+MIN_MEASURED_SECONDS = 0.25
+# A node's measured latency on a model is forgotten after this long without a
+# new measurement, so a model dropped for being slow is tried again
+LATENCY_TTL_SECONDS = float(os.getenv("MODEL_ROUTING_LATENCY_TTL_SECONDS", "900"))
+
+# Per model key: USD per million input tokens, USD per million output tokens,
+# and the latency (seconds) assumed for a call until calls have been measured
+MODEL_PROFILES = {
+    "claude_3_haiku": (0.25, 1.25, 4.0),
+    "claude_3_5_sonnet": (3.0, 15.0, 12.0),
+    "claude_sonnet_4": (3.0, 15.0, 12.0),
+    "claude_3_opus": (15.0, 75.0, 25.0),
+}
+
+# Per node: target seconds and target USD per model call.
+# Override with e.g. MODEL_ROUTING_TARGETS="research_discovery=10:0.02,planning_optimization=40:0.2"
+NODE_TARGETS = {
+    "research_discovery": (8.0, 0.01),
+    "booking_logistics": (8.0, 0.01),
+    "planning_optimization": (60.0, 0.10),
+}
+
+
+def load_node_targets() -> Dict[str, Tuple[float, float]]:
+    """Get (latency target seconds, cost target USD) per node."""
+    targets = dict(NODE_TARGETS)
+    for entry in os.getenv("MODEL_ROUTING_TARGETS", "").split(","):
+        if "=" not in entry:
+            continue
+        node, values = entry.split("=", 1)
+        latency, cost = values.split(":", 1)
+        targets[node.strip()] = (float(latency), float(cost))
+    return targets
+
+
+def estimate_prompt_tokens(messages: List[Any]) -> int:
+    """Rough prompt size of a message list (about four characters per token)."""
+    return sum(len(str(getattr(message, "content", message))) for message in messages) // 4
+
+
+class ModelRouter:
+    """
+    Picks the model tier for each node (and optionally each ReAct turn).
+
+    Only tiers that accept the call's max_tokens are considered. A call is
+    routed to the most capable of them whose expected latency and cost fit
+    the node's targets, or to the cheapest of them if none does. Expected
+    latency starts from MODEL_PROFILES and then follows the measured latency
+    of the node's calls on that model (moving average, forgotten after
+    LATENCY_TTL_SECONDS without calls); expected cost comes from the prompt
+    size, max_tokens and the model's token prices. A node escalates to the
+    next tier only when its output fails validation.
+    """
+
+    def __init__(self):
+        self.enabled = MODEL_ROUTING_ENABLED
+        self.targets = load_node_targets()
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+
+    def expected_latency(self, node: str, model_name: str) -> float:
+        with self._lock:
+            measured = self._latency.get((node, model_name))
+        if measured is None or time.monotonic() - measured[1] > LATENCY_TTL_SECONDS:
+            return MODEL_PROFILES.get(model_name, (0, 0, 0))[2]
+        return measured[0]
+
+    @staticmethod
+    def expected_cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+        input_price, output_price, _ = MODEL_PROFILES.get(model_name, (0, 0, 0))
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def choose(self, node: str, input_tokens: int = 0, max_tokens: int = 4096) -> str:
+        """
+        Get the model key for a node's call.
+
+        Args:
+            node: Workflow node name
+            input_tokens: Estimated prompt size of the call
+            max_tokens: max_tokens of the call (tiers that do not accept it are skipped)
+
+        Returns:
+            Key from BEDROCK_MODELS
+        """
+        if not self.enabled or not MODEL_TIERS or node not in self.targets:
+            return DEFAULT_MODEL
+        tiers = [name for name in MODEL_TIERS if max_output_tokens(name) >= max_tokens]
+        if not tiers:
+            return max(MODEL_TIERS, key=max_output_tokens)
+        latency_target, cost_target = self.targets[node]
+        for model_name in reversed(tiers):
+            if self.expected_latency(node, model_name) <= latency_target \
+                    and self.expected_cost(model_name, input_tokens, max_tokens) <= cost_target:
+                return model_name
+        return tiers[0]
+
+    def escalate(self, model_name: str) -> Optional[str]:
+        """Get the next more capable tier, or None if model_name is the top tier."""
+        if not self.enabled or model_name not in MODEL_TIERS:
+            return None
+        index = MODEL_TIERS.index(model_name)
+        return MODEL_TIERS[index + 1] if index + 1 < len(MODEL_TIERS) else None
+
+    def _node_stats(self, node: str) -> Dict[str, Any]:
+        # Called with the lock held
+        return self._nodes.setdefault(node, {"calls": {}, "validation_failures": 0, "escalations": 0})
+
+    def record_call(self, node: str, model_name: str, seconds: float):
+        """Record which tier served a node's model call, and its latency."""
+        with self._lock:
+            if seconds >= MIN_MEASURED_SECONDS:
+                now = time.monotonic()
+                previous = self._latency.get((node, model_name))
+                if previous is not None and now - previous[1] <= LATENCY_TTL_SECONDS:
+                    seconds = 0.8 * previous[0] + 0.2 * seconds
+                self._latency[(node, model_name)] = (seconds, now)
+            calls = self._node_stats(node)["calls"]
+            calls[model_name] = calls.get(model_name, 0) + 1
+
+    def record_escalation(self, node: str, from_model: str, to_model: Optional[str]):
+        """Record a failed output validation (and the escalation, if any)."""
+        with self._lock:
+            stats = self._node_stats(node)
+            stats["validation_failures"] += 1
+            if to_model:
+                stats["escalations"] += 1
+        if to_model:
+            logger.warning(f"{node} output failed validation on {from_model}; escalating to {to_model}")
+        else:
+            logger.warning(f"{node} output failed validation on {from_model} (top tier, not escalating)")
+
+    def stats(self) -> dict:
+        """Get tier usage and the measured latency per model for each node."""
+        with self._lock:
+            latency: Dict[str, Dict[str, float]] = {}
+            for (node, model_name), (seconds, _) in self._latency.items():
+                latency.setdefault(node, {})[model_name] = round(seconds, 3)
+            return {
+                "enabled": self.enabled,
+                "per_turn": MODEL_ROUTING_PER_TURN,
+                "tiers": MODEL_TIERS,
+                "nodes": {
+                    node: {**stats, "calls": dict(stats["calls"]), "latency_seconds": latency.get(node, {})}
+                    for node, stats in self._nodes.items()
+                },
+            }
+
+
+MODEL_KEYS = {model_id: name for name, model_id in BEDROCK_MODELS.items()}
+
+
+class ModelRoutingMiddleware(AgentMiddleware):
+    """
+    Agent middleware that records the tier serving each model call.
+
+    With MODEL_ROUTING_PER_TURN, each ReAct turn is also routed on its own
+    prompt size, so turns carrying large tool results can drop to a cheaper
+    tier. A turn never goes above the agent's own model, which keeps a
+    node's escalation in effect.
+    """
+
+    def _route(self, request: ModelRequest) -> Tuple[ModelRequest, str]:
+        model = request.model
+        model_name = MODEL_KEYS.get(getattr(model, "model_id", ""), DEFAULT_MODEL)
+        if MODEL_ROUTING_PER_TURN:
+            routed = model_router.choose(
+                get_current_node(), estimate_prompt_tokens(request.messages), model.max_tokens or 4096
+            )
+            if routed in MODEL_TIERS and model_name in MODEL_TIERS \
+                    and MODEL_TIERS.index(routed) < MODEL_TIERS.index(model_name):
+                model_name = routed
+                request = request.override(
+                    model=get_pooled_model(routed, temperature=model.temperature, max_tokens=model.max_tokens)
+                )
+        return request, model_name
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Any]) -> Any:
+        request, model_name = self._route(request)
+        time_start = time.perf_counter()
+        try:
+            return handler(request)
+        finally:
+            model_router.record_call(get_current_node(), model_name, time.perf_counter() - time_start)
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[Any]]) -> Any:
+        request, model_name = self._route(request)
+        time_start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            model_router.record_call(get_current_node(), model_name, time.perf_counter() - time_start)
+
+
+# Global router instance
+model_router = ModelRouter()
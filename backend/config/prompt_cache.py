@@ -0,0 +1,154 @@
+"""Bedrock prompt caching for the agents' stable prompt prefixes."""
+
+import os
+import threading
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_aws.middleware.prompt_caching import BedrockPromptCachingMiddleware
+from langchain.agents.middleware import ModelRequest
+from config.bedrock import BEDROCK_MODELS
+from config.llm_cache import get_current_node
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Model keys that support Bedrock prompt caching; requests to any other model
+# are sent without cache points. Claude 3 Haiku and Opus do not support it,
+# and Claude 3.5 Sonnet v2 only did in preview. Override with e.g.
+# PROMPT_CACHE_MODELS="claude_sonnet_4,claude_3_5_sonnet"
+PROMPT_CACHE_MODELS = [
+    name.strip() for name in os.getenv("PROMPT_CACHE_MODELS", "claude_sonnet_4").split(",") if name.strip()
+]
+
+
+def supports_prompt_caching(model_id: str) -> bool:
+    """Check whether a Bedrock model ID is on the prompt caching allowlist."""
+    return any(BEDROCK_MODELS.get(name) == model_id for name in PROMPT_CACHE_MODELS)
+
+
+def strip_cache_control(message: BaseMessage) -> BaseMessage:
+    """Get a copy of a message without cache_control on its content blocks."""
+    if not isinstance(message.content, list) or not any(
+        isinstance(block, dict) and "cache_control" in block for block in message.content
+    ):
+        return message
+    content = [
+        {key: value for key, value in block.items() if key != "cache_control"} if isinstance(block, dict) else block
+        for block in message.content
+    ]
+    return message.model_copy(update={"content": content})
+
+
+def cached_text(text: str) -> List[dict]:
+    """
+    Mark a stable block of message text as a Bedrock cache point.
+
+    Bedrock caches the whole request prefix up to the cache point, in the
+    order tools, system prompt, messages. A system prompt marked this way
+    therefore also caches the agent's tool schemas. Cache points reaching a
+    model that does not support prompt caching are removed by
+    PromptCachingMiddleware.
+
+    Returns:
+        Message content: one text block, with cache_control unless prompt
+        caching is disabled
+    """
+
+    block = {"type": "text", "text": text}
+    if PROMPT_CACHE_ENABLED:
+        block["cache_control"] = CACHE_CONTROL
+    return [block]
+
+
+class PromptCachingMiddleware(BedrockPromptCachingMiddleware):
+    """
+    Bedrock prompt caching limited to the models in PROMPT_CACHE_MODELS.
+
+    For those models, a cache point is moved onto the latest message of
+    every model call, so each ReAct turn reuses the previous turn's prefix.
+    Calls to any other model have the cache points set by cached_text
+    removed. Runs inside the model routing middleware, so the check is made
+    against the model that actually serves the call.
+    """
+
+    def _uncached(self, request: ModelRequest) -> ModelRequest:
+        overrides = {"messages": [strip_cache_control(message) for message in request.messages]}
+        if request.system_message is not None:
+            overrides["system_message"] = strip_cache_control(request.system_message)
+        return request.override(**overrides)
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Any]) -> Any:
+        if not supports_prompt_caching(getattr(request.model, "model_id", "")):
+            return handler(self._uncached(request))
+        return super().wrap_model_call(request, handler)
+
+    async def awrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], Awaitable[Any]]) -> Any:
+        if not supports_prompt_caching(getattr(request.model, "model_id", "")):
+            return await handler(self._uncached(request))
+        return await super().awrap_model_call(request, handler)
+
+
+def prompt_caching_middleware() -> list:
+    """
+    Agent middleware for Bedrock prompt caching (see PromptCachingMiddleware).
+
+    Must come after the model routing middleware in the middleware list.
+    """
+    if not PROMPT_CACHE_ENABLED:
+        return []
+    return [PromptCachingMiddleware(unsupported_model_behavior="ignore")]
+
+
+class PromptCacheUsage(BaseCallbackHandler):
+    """
+    Callback that totals Bedrock prompt cache reads and writes per node.
+
+    Reads the usage metadata of every model response, attributed to the
+    node in the current llm_cache_scope. Responses replayed from the LLM
+    response cache are skipped, since they did not call Bedrock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, int]] = {}
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage or usage.get("total_cost") == 0:
+                    continue  # No usage, or an LLM response cache hit
+                details = usage.get("input_token_details") or {}
+                self.record(
+                    get_current_node(),
+                    usage.get("input_tokens", 0),
+                    details.get("cache_read") or 0,
+                    details.get("cache_creation") or 0,
+                )
+
+    def record(self, node: str, input_tokens: int, cache_read_tokens: int, cache_write_tokens: int):
+        with self._lock:
+            stats = self._nodes.setdefault(
+                node, {"calls": 0, "input_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["cache_read_tokens"] += cache_read_tokens
+            stats["cache_write_tokens"] += cache_write_tokens
+
+    def stats(self) -> dict:
+        """Get cache read/write token counts per node (input_tokens includes both)."""
+        with self._lock:
+            nodes = {node: dict(stats) for node, stats in self._nodes.items()}
+        for stats in nodes.values():
+            stats["cache_read_ratio"] = (
+                round(stats["cache_read_tokens"] / stats["input_tokens"], 3) if stats["input_tokens"] else None
+            )
+        return {"enabled": PROMPT_CACHE_ENABLED, "nodes": nodes}
+
+
+# Global usage tracker (attached to every Bedrock model)
+prompt_cache_usage = PromptCacheUsage()
@@ -0,0 +1,328 @@
+"""Process-wide rate governor for Bedrock model calls."""
+
+import os
+import json
+import time
+import random
+import threading
+from loguru import logger
+from typing import Dict, Optional, Tuple
+from config.bedrock import BEDROCK_MODELS
+
+
+RATE_GOVERNOR_ENABLED = os.getenv("RATE_GOVERNOR_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bucket capacity in seconds of quota; quotas are enforced per minute, so keep bursts small
+RATE_GOVERNOR_BURST_SECONDS = float(os.getenv("RATE_GOVERNOR_BURST_SECONDS", "1"))
+RATE_GOVERNOR_INCREASE = float(os.getenv("RATE_GOVERNOR_INCREASE", "0.02"))
+RATE_GOVERNOR_DECREASE = float(os.getenv("RATE_GOVERNOR_DECREASE", "0.5"))
+RATE_GOVERNOR_MIN_FACTOR = float(os.getenv("RATE_GOVERNOR_MIN_FACTOR", "0.05"))
+RATE_GOVERNOR_MAX_ATTEMPTS = int(os.getenv("RATE_GOVERNOR_MAX_ATTEMPTS", "4"))
+RATE_GOVERNOR_RETRY_BASE_SECONDS = float(os.getenv("RATE_GOVERNOR_RETRY_BASE_SECONDS", "1.0"))
+RATE_GOVERNOR_RETRY_MAX_SECONDS = float(os.getenv("RATE_GOVERNOR_RETRY_MAX_SECONDS", "20"))
+# Starting rate for models without a configured quota; it grows with each
+# success and is cut on each throttle
+RATE_GOVERNOR_START_RPM = float(os.getenv("RATE_GOVERNOR_START_RPM", "60"))
+RATE_GOVERNOR_START_TPM = float(os.getenv("RATE_GOVERNOR_START_TPM", "200000"))
+# How far past the starting rate it may grow (so years of successes cannot
+# leave a rate that takes dozens of throttles to bring down)
+RATE_GOVERNOR_MAX_GROWTH = float(os.getenv("RATE_GOVERNOR_MAX_GROWTH", "20"))
+
+# Quotas per model key: (requests per minute, tokens per minute). Quotas
+# differ per account and region, so none are assumed: configure them with the
+# values from the account's Service Quotas page, e.g. BEDROCK_RATE_LIMITS="claude_3_5_sonnet=50:400000,claude_3_haiku=1000:2000000"
+BEDROCK_RATE_LIMITS: Dict[str, Tuple[float, float]] = {}
+
+# Bedrock runtime operations that invoke a model
+GOVERNED_OPERATIONS = ("InvokeModel", "InvokeModelWithResponseStream", "Converse", "ConverseStream")
+THROTTLING_ERROR_CODES = ("ThrottlingException", "TooManyRequestsException")
+
+
+def load_rate_limits() -> Dict[str, Tuple[float, float]]:
+    """Get (requests per minute, tokens per minute) per model ID."""
+    limits = dict(BEDROCK_RATE_LIMITS)
+    for entry in os.getenv("BEDROCK_RATE_LIMITS", "").split(","):
+        if "=" not in entry:
+            continue
+        model_name, values = entry.split("=", 1)
+        rpm, tpm = values.split(":", 1)
+        limits[model_name.strip()] = (float(rpm), float(tpm))
+    return {BEDROCK_MODELS[name]: limit for name, limit in limits.items() if name in BEDROCK_MODELS}
+
+
+def estimate_tokens(body) -> int:
+    """
+    Estimate the tokens a model call can use: its prompt (about four
+    characters per token) plus the max_tokens it may generate.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8", errors="ignore")
+    if not isinstance(body, str):
+        return 0
+    try:
+        max_tokens = int(json.loads(body).get("max_tokens", 0))
+    except (ValueError, AttributeError):
+        max_tokens = 0
+    return len(body) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Bucket refilled at rate units per second up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (capped at a full bucket, so large calls still pass)."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def take(self, amount: float):
+        # The level may go negative; later callers then wait for the debt to refill
+        self.level -= amount
+
+    def resize(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = min(self.level, capacity)
+
+
+class ModelRateLimiter:
+    """
+    Request and token buckets for one model ID, with AIMD rate adaptation.
+
+    Callers wait in line (FIFO through a turnstile lock) until both buckets
+    allow their call. The buckets refill at factor * (rpm, tpm); a throttle
+    multiplies factor by RATE_GOVERNOR_DECREASE and each success adds
+    RATE_GOVERNOR_INCREASE. With a configured quota, factor never exceeds
+    1.0. Without one (capped=False), rpm and tpm are only a starting rate
+    and factor keeps growing until Bedrock throttles (up to
+    RATE_GOVERNOR_MAX_GROWTH).
+    """
+
+    def __init__(self, model_id: str, rpm: float, tpm: float, capped: bool = True):
+        self.model_id = model_id
+        self.rpm = rpm
+        self.tpm = tpm
+        self.capped = capped
+        self.max_factor = 1.0 if capped else RATE_GOVERNOR_MAX_GROWTH
+        self.factor = 1.0
+        self._lock = threading.Lock()
+        self._line = threading.Lock()
+        self._last_decrease = 0.0
+        self._requests = TokenBucket(*self._bucket_size(rpm))
+        self._tokens = TokenBucket(*self._bucket_size(tpm))
+        self.calls = 0
+        self.throttles = 0
+        self.waited_calls = 0
+        self.wait_seconds = 0.0
+
+    def _bucket_size(self, per_minute: float) -> Tuple[float, float]:
+        rate = per_minute * self.factor / 60.0
+        return rate, max(1.0, rate * RATE_GOVERNOR_BURST_SECONDS)
+
+    def _resize(self):
+        self._requests.resize(*self._bucket_size(self.rpm))
+        self._tokens.resize(*self._bucket_size(self.tpm))
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until one request and tokens fit in the quota, then take them.
+
+        Runs in botocore event hooks, so time.sleep blocks the thread making
+        the model call (async LangChain calls run boto3 in executor threads,
+        so the event loop is not blocked).
+
+        Returns:
+            Seconds spent waiting
+        """
+        time_start = time.monotonic()
+        with self._line:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._requests.refill(now)
+                    self._tokens.refill(now)
+                    wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self._requests.take(1)
+                        self._tokens.take(tokens)
+                        break
+                time.sleep(wait)
+
+        waited = time.monotonic() - time_start
+        with self._lock:
+            self.calls += 1
+            if waited > 0.001:
+                self.waited_calls += 1
+                self.wait_seconds += waited
+        return waited
+
+    def release_tokens(self, tokens: int):
+        """Return reserved tokens the call did not use."""
+        if tokens > 0:
+            with self._lock:
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + tokens)
+
+    def on_success(self):
+        with self._lock:
+            if self.factor < self.max_factor:
+                self.factor = min(self.max_factor, self.factor + RATE_GOVERNOR_INCREASE)
+                self._resize()
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            # Concurrent calls throttled by the same burst count as one signal
+            if now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            self.factor = max(RATE_GOVERNOR_MIN_FACTOR, self.factor * RATE_GOVERNOR_DECREASE)
+            self._resize()
+            self._requests.level = min(self._requests.level, 0.0)
+        logger.warning(
+            f"Bedrock throttled {self.model_id}; rate reduced to "
+            f"{self.rpm * self.factor:.0f} requests and {self.tpm * self.factor:.0f} tokens per minute"
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "quota_configured": self.capped,
+                "rate_factor": round(self.factor, 3),
+                "calls": self.calls,
+                "throttles": self.throttles,
+                "waited_calls": self.waited_calls,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class RateGovernor:
+    """
+    Shared limiter for every Bedrock runtime client in the process.
+
+    Attached to a boto3 client through botocore events, so each model call
+    (including streaming calls and calls made by agents) waits for quota
+    before it is sent, and throttled attempts are retried with full jitter
+    after waiting in line again. Model IDs without a configured quota start
+    at RATE_GOVERNOR_START_RPM/TPM and adapt from there; model IDs outside
+    BEDROCK_MODELS are not limited.
+    """
+
+    def __init__(self):
+        self.enabled = RATE_GOVERNOR_ENABLED
+        self._lock = threading.Lock()
+        self._limits: Optional[Dict[str, Tuple[float, float]]] = None
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._attached = set()
+
+    def configure(self, model_id: str, rpm: float, tpm: float):
+        """Set the quota for a model ID (replaces its limiter)."""
+        with self._lock:
+            self._get_limits()[model_id] = (rpm, tpm)
+            self._limiters.pop(model_id, None)
+
+    def _get_limits(self) -> Dict[str, Tuple[float, float]]:
+        if self._limits is None:
+            self._limits = load_rate_limits()
+        return self._limits
+
+    def get_limiter(self, model_id: str) -> Optional[ModelRateLimiter]:
+        with self._lock:
+            limiter = self._limiters.get(model_id)
+            if limiter is None:
+                limit = self._get_limits().get(model_id)
+                if limit is not None:
+                    limiter = ModelRateLimiter(model_id, *limit)
+                elif model_id in BEDROCK_MODELS.values():
+                    limiter = ModelRateLimiter(
+                        model_id, RATE_GOVERNOR_START_RPM, RATE_GOVERNOR_START_TPM, capped=False
+                    )
+                else:
+                    return None
+                self._limiters[model_id] = limiter
+            return limiter
+
+    def attach(self, client):
+        """Register the governor on a Bedrock runtime client (once per client)."""
+        with self._lock:
+            if id(client) in self._attached:
+                return
+            self._attached.add(id(client))
+        events = client.meta.events
+        for operation in GOVERNED_OPERATIONS:
+            events.register(f"before-parameter-build.bedrock-runtime.{operation}", self._before_call)
+            events.register(f"needs-retry.bedrock-runtime.{operation}", self._needs_retry)
+            events.register(f"after-call.bedrock-runtime.{operation}", self._after_call)
+
+    def _before_call(self, params, context, **kwargs):
+        if not self.enabled:
+            return
+        limiter = self.get_limiter(params.get("modelId", ""))
+        if limiter is None:
+            return
+        tokens = estimate_tokens(params.get("body", ""))
+        limiter.acquire(tokens)
+        context["rate_governor"] = {"model_id": limiter.model_id, "tokens": tokens}
+
+    def _needs_retry(self, response, attempts, request_dict, caught_exception=None, **kwargs):
+        reservation = request_dict.get("context", {}).get("rate_governor")
+        if reservation is None or response is None:
+            return None
+        http_response, parsed = response
+        error_code = parsed.get("Error", {}).get("Code", "")
+        if error_code not in THROTTLING_ERROR_CODES and http_response.status_code != 429:
+            return None  # Let botocore decide on other errors
+
+        limiter = self.get_limiter(reservation["model_id"])
+        limiter.on_throttle()
+        if attempts >= RATE_GOVERNOR_MAX_ATTEMPTS:
+            return False  # Stop botocore retrying too; the caller sees the throttle
+
+        # Full jitter, so throttled callers do not retry in lockstep
+        backoff = random.uniform(
+            0, min(RATE_GOVERNOR_RETRY_MAX_SECONDS, RATE_GOVERNOR_RETRY_BASE_SECONDS * (2 ** (attempts - 1)))
+        )
+        # Blocks the calling thread, like acquire
+        logger.warning(
+            f"Bedrock throttled {reservation['model_id']} (attempt {attempts}/{RATE_GOVERNOR_MAX_ATTEMPTS}). "
+            f"Retrying after {backoff:.2f} seconds and the rate limit..."
+        )
+        time.sleep(backoff)
+        limiter.acquire(reservation["tokens"])
+        return 0  # Retry now; the wait already happened
+
+    def _after_call(self, http_response, context, **kwargs):
+        reservation = context.get("rate_governor")
+        if reservation is None or http_response.status_code >= 300:
+            return
+        limiter = self.get_limiter(reservation["model_id"])
+        headers = http_response.headers
+        if "x-amzn-bedrock-input-token-count" in headers:
+            used = int(headers.get("x-amzn-bedrock-input-token-count", 0)) + int(
+                headers.get("x-amzn-bedrock-output-token-count", 0)
+            )
+            limiter.release_tokens(reservation["tokens"] - used)
+        limiter.on_success()
+
+    def stats(self) -> dict:
+        """Get limiter counters per model ID."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {
+            "enabled": self.enabled,
+            "models": {limiter.model_id: limiter.stats() for limiter in limiters},
+        }
+
+
+# Global governor instance (attached to each Bedrock runtime client on creation)
+rate_governor = RateGovernor()
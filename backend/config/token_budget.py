@@ -0,0 +1,286 @@
+"""Token budget and context compaction for the planning node's prompt."""
+
+import os
+import re
+import asyncio
+import threading
+from loguru import logger
+from langchain_core.messages import HumanMessage
+from config.llm import get_pooled_model
+from config.bedrock import max_output_tokens
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# Input tokens allowed for the planning context (research, booking and request)
+PLANNING_CONTEXT_TOKENS = int(os.getenv("PLANNING_CONTEXT_TOKENS", "12000"))
+# Share of the context budget each section gets before unused budget is redistributed
+SECTION_SHARES = {"research": 0.5, "booking": 0.35, "request": 0.15}
+# Cheaper model that summarizes sections still over budget after cleanup
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "claude_3_haiku")
+CONTEXT_SUMMARY_ENABLED = os.getenv("CONTEXT_SUMMARY_ENABLED", "true").lower() == "true"
+CONTEXT_SUMMARY_TIMEOUT_SECONDS = float(os.getenv("CONTEXT_SUMMARY_TIMEOUT_SECONDS", "30"))
+# Run tag of summary calls, so streams can tell them from the planning output
+SUMMARY_TAG = "context_summary"
+
+# Planning output tokens: a base for the budget and tips plus a share per trip day,
+# rounded up to PLANNING_MAX_TOKENS_STEP so trips of similar length share one agent
+PLANNING_BASE_TOKENS = int(os.getenv("PLANNING_BASE_TOKENS", "1500"))
+PLANNING_TOKENS_PER_DAY = int(os.getenv("PLANNING_TOKENS_PER_DAY", "500"))
+PLANNING_MAX_TOKENS_STEP = 1024
+PLANNING_MIN_TOKENS = 2048
+PLANNING_MAX_TOKENS = int(os.getenv("PLANNING_MAX_TOKENS", "8192"))
+PLANNING_DEFAULT_TOKENS = 4096  # Trip duration unknown
+
+# Lines that carry no planning value: bare URLs, page chrome picked up by the
+# scraper, tool errors and truncation markers
+NOISE_PATTERNS = [
+    re.compile(r"^\W*https?://\S+\W*$"),
+    re.compile(r"^(error|no results found|no hotels found|no flights found)\b", re.IGNORECASE),
+    re.compile(
+        r"\b(cookies?|sign in|log in|subscribe|newsletter|javascript|accept all|privacy policy|"
+        r"terms of (use|service)|all rights reserved|skip to (main )?content)\b",
+        re.IGNORECASE,
+    ),
+]
+NOISE_MAX_CHARS = 120  # Longer lines are kept even if they mention a noise phrase
+# Shorter repeated lines (labels such as "Price: $20") may belong to different items
+DEDUPE_MIN_CHARS = 20
+TRUNCATION_MARKER = "... [truncated]"
+
+SUMMARY_PROMPT = """Condense the following {section} notes for a travel planner to at most {words} words.
+Keep every name, price, date, time, rating, address and booking detail. Drop repetition,
+marketing language and anything unrelated to the trip. Reply with the condensed notes only.
+
+{text}"""
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the tokens in a text (about four characters per token for Claude)."""
+    return (len(text) + 3) // 4
+
+
+def planning_max_tokens(duration: Optional[int]) -> int:
+    """
+    Get max_tokens for the planning agent from the trip duration.
+
+    Args:
+        duration: Trip length in days (0 or None if unknown)
+
+    Returns:
+        Output token limit, a multiple of PLANNING_MAX_TOKENS_STEP
+    """
+    if not duration or duration < 0:
+        return PLANNING_DEFAULT_TOKENS
+    tokens = PLANNING_BASE_TOKENS + PLANNING_TOKENS_PER_DAY * duration
+    tokens = -(-tokens // PLANNING_MAX_TOKENS_STEP) * PLANNING_MAX_TOKENS_STEP
+    return max(PLANNING_MIN_TOKENS, min(PLANNING_MAX_TOKENS, tokens))
+
+
+def dedupe_lines(text: str) -> str:
+    """Drop repeated lines (case and whitespace insensitive), keeping the first."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = " ".join(line.split()).lower().strip("-*#> ")
+        if len(key) >= DEDUPE_MIN_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        elif not key and lines and not lines[-1].strip():
+            continue  # Collapse runs of blank lines
+        lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def drop_tool_noise(text: str) -> str:
+    """Drop lines matching NOISE_PATTERNS and the scraper's truncation markers."""
+    lines = []
+    for line in text.replace(TRUNCATION_MARKER, "").splitlines():
+        stripped = line.strip()
+        if stripped and len(stripped) <= NOISE_MAX_CHARS and any(p.search(stripped) for p in NOISE_PATTERNS):
+            continue
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut a text to about tokens, at a line boundary where possible."""
+    max_chars = tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    cut = cut if cut > max_chars // 2 else max_chars
+    return text[:cut].rstrip() + "\n[... condensed to fit the context budget]"
+
+
+class ContextBudget:
+    """
+    Keeps a prompt's context sections within a token budget.
+
+    Each section is measured before the call. The budget is split by
+    SECTION_SHARES, and budget a section does not use goes to the sections
+    over their share. Sections still over budget are compacted in order of
+    cost: duplicate lines are dropped, then tool noise, then (if enabled)
+    the section is summarized with CONTEXT_SUMMARY_MODEL. A section the
+    summary cannot bring under budget, or that fails to summarize in time,
+    is truncated. Protected sections (the user's request) are never
+    compacted and are charged to the budget first.
+    """
+
+    def __init__(self, total_tokens: int = PLANNING_CONTEXT_TOKENS, shares: Dict[str, float] = None):
+        self.total_tokens = total_tokens
+        self.shares = shares or SECTION_SHARES
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "compacted_sections": 0,
+            "summaries": 0,
+            "summary_failures": 0,
+            "truncations": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+        }
+
+    def allocate(self, sections: Dict[str, str], protected: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        Split the budget between sections.
+
+        Returns:
+            Token budget per section name
+        """
+        sizes = {name: count_tokens(text) for name, text in sections.items()}
+        budgets = {name: sizes[name] for name in protected if name in sizes}
+        remaining = max(0, self.total_tokens - sum(budgets.values()))
+        open_sections = [name for name in sections if name not in budgets]
+
+        # Hand out shares; sections that fit take only what they need, and the
+        # surplus is split again between the sections that do not fit
+        while open_sections:
+            total_share = sum(self.shares.get(name, 0.1) for name in open_sections)
+            grants = {name: remaining * self.shares.get(name, 0.1) / total_share for name in open_sections}
+            fitting = [name for name in open_sections if sizes[name] <= grants[name]]
+            if not fitting:
+                budgets.update({name: int(grant) for name, grant in grants.items()})
+                break
+            for name in fitting:
+                budgets[name] = sizes[name]
+                remaining -= sizes[name]
+                open_sections.remove(name)
+        return budgets
+
+    def _clean(self, sections: Dict[str, str], budgets: Dict[str, int]) -> Tuple[Dict[str, str], list]:
+        """Dedupe and drop noise in over-budget sections; get those still over budget."""
+        cleaned = dict(sections)
+        over = []
+        for name, text in sections.items():
+            if count_tokens(text) <= budgets[name]:
+                continue
+            cleaned[name] = drop_tool_noise(dedupe_lines(text))
+            if count_tokens(cleaned[name]) > budgets[name]:
+                over.append(name)
+        return cleaned, over
+
+    @staticmethod
+    def _summary_tokens(budget: int) -> int:
+        """Output tokens for a section's summary: its budget, within what the summary model accepts."""
+        return min(max(256, budget), max_output_tokens(CONTEXT_SUMMARY_MODEL))
+
+    def _summary_prompt(self, name: str, text: str, budget: int) -> list:
+        # Words run about 1.3 tokens; leave room for the model overshooting
+        words = int(self._summary_tokens(budget) * 0.6)
+        return [HumanMessage(content=SUMMARY_PROMPT.format(section=name, words=words, text=text))]
+
+    def _summary_model(self, budget: int):
+        return get_pooled_model(CONTEXT_SUMMARY_MODEL, temperature=0.0, max_tokens=self._summary_tokens(budget))
+
+    def _finish(self, name: str, text: str, summary: Optional[str], budget: int) -> str:
+        """Use the summary if it fits, else truncate; record the outcome."""
+        with self._lock:
+            if summary is not None:
+                self._stats["summaries"] += 1
+            if summary is not None and count_tokens(summary) <= budget:
+                return summary
+            self._stats["truncations"] += 1
+        return truncate_to_tokens(summary if summary is not None else text, budget)
+
+    def _summary_failed(self, name: str, e: Exception):
+        with self._lock:
+            self._stats["summary_failures"] += 1
+        logger.warning(f"Could not summarize {name} context, truncating it instead: {e}")
+
+    def _record(self, sections: Dict[str, str], compacted: Dict[str, str]) -> Dict[str, str]:
+        before = sum(count_tokens(text) for text in sections.values())
+        after = sum(count_tokens(text) for text in compacted.values())
+        changed = sum(1 for name in sections if compacted[name] != sections[name])
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["compacted_sections"] += changed
+            self._stats["tokens_before"] += before
+            self._stats["tokens_after"] += after
+        if changed:
+            logger.info(f"Compacted {changed} context sections from {before} to {after} tokens (budget {self.total_tokens})")
+        return compacted
+
+    def compact(self, sections: Dict[str, str], protected: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        Compact sections to fit the budget.
+
+        Args:
+            sections: Context text per section name
+            protected: Names of sections that must be kept as they are
+
+        Returns:
+            Sections with the same names, each within its budget
+        """
+        budgets = self.allocate(sections, protected)
+        compacted, over = self._clean(sections, budgets)
+        for name in over:
+            summary = None
+            if CONTEXT_SUMMARY_ENABLED:
+                try:
+                    prompt = self._summary_prompt(name, compacted[name], budgets[name])
+                    summary = str(self._summary_model(budgets[name]).invoke(prompt, config={"tags": [SUMMARY_TAG]}).content).strip()
+                except Exception as e:
+                    self._summary_failed(name, e)
+            compacted[name] = self._finish(name, compacted[name], summary, budgets[name])
+        return self._record(sections, compacted)
+
+    async def acompact(
+        self,
+        sections: Dict[str, str],
+        protected: Iterable[str] = (),
+        timeout: float = CONTEXT_SUMMARY_TIMEOUT_SECONDS,
+    ) -> Dict[str, str]:
+        """Async version of compact; sections are summarized concurrently, within timeout seconds."""
+        budgets = self.allocate(sections, protected)
+        compacted, over = self._clean(sections, budgets)
+
+        async def summarize(name: str) -> Optional[str]:
+            if not CONTEXT_SUMMARY_ENABLED or timeout <= 0:
+                return None
+            try:
+                prompt = self._summary_prompt(name, compacted[name], budgets[name])
+                message = await asyncio.wait_for(
+                    self._summary_model(budgets[name]).ainvoke(prompt, config={"tags": [SUMMARY_TAG]}), timeout
+                )
+                return str(message.content).strip()
+            except Exception as e:
+                self._summary_failed(name, e)
+                return None
+
+        summaries = await asyncio.gather(*(summarize(name) for name in over))
+        for name, summary in zip(over, summaries):
+            compacted[name] = self._finish(name, compacted[name], summary, budgets[name])
+        return self._record(sections, compacted)
+
+    def stats(self) -> dict:
+        """Get compaction counters and the tokens saved."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["budget_tokens"] = self.total_tokens
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        return stats
+
+
+# Global budget for the planning node's context
+planning_context_budget = ContextBudget()
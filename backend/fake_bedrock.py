@@ -0,0 +1,184 @@
+"""
+Local fake Bedrock runtime endpoint that throttles, for testing the rate governor.
+
+Run it directly to compare concurrent model calls with and without the governor:
+
+    python fake_bedrock.py --calls 40 --rpm 120
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from config.bedrock import BEDROCK_MODELS
+from config.llm import get_pooled_model
+from config.rate_governor import rate_governor
+
+
+class FakeQuota:
+    """Requests and tokens allowed per sliding window, like a Bedrock on-demand quota."""
+
+    def __init__(self, rpm: float, tpm: float, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.max_requests = rpm * window_seconds / 60.0
+        self.max_tokens = tpm * window_seconds / 60.0
+        self._calls = deque()  # (time, tokens)
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.throttled = 0
+
+    def allow(self, tokens: int) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            used_tokens = sum(call_tokens for _, call_tokens in self._calls)
+            if len(self._calls) + 1 > self.max_requests or used_tokens + tokens > self.max_tokens:
+                self.throttled += 1
+                return False
+            self._calls.append((now, tokens))
+            self.accepted += 1
+            return True
+
+
+class FakeBedrockHandler(BaseHTTPRequestHandler):
+    """Serves POST /model/{modelId}/invoke with an Anthropic messages response."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = self.path.split("/")
+        if len(parts) != 4 or parts[1] != "model" or parts[3] != "invoke":
+            self._send_json(404, {"message": f"Unsupported path {self.path}"}, "ResourceNotFoundException")
+            return
+
+        request = json.loads(body or b"{}")
+        input_tokens = len(body) // 4
+        output_tokens = min(int(request.get("max_tokens", 256)), self.server.output_tokens)
+        if not self.server.quota.allow(input_tokens + output_tokens):
+            self._send_json(429, {"message": "Too many requests, please wait before trying again."}, "ThrottlingException")
+            return
+
+        time.sleep(self.server.latency_seconds)
+        self._send_json(
+            200,
+            {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": unquote(parts[2]),
+                "content": [{"type": "text", "text": "Fake response " + "word " * (output_tokens - 2)}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            },
+            headers={
+                "x-amzn-bedrock-input-token-count": str(input_tokens),
+                "x-amzn-bedrock-output-token-count": str(output_tokens),
+            },
+        )
+
+    def _send_json(self, status: int, payload: dict, error_type: str = None, headers: dict = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", error_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBedrockServer(ThreadingHTTPServer):
+    """
+    Fake Bedrock runtime on localhost; set BEDROCK_ENDPOINT_URL to its url
+    before the first Bedrock client is created.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, rpm: float = 120, tpm: float = 400000, window_seconds: float = 10,
+                 latency_seconds: float = 0.2, output_tokens: int = 200, port: int = 0):
+        super().__init__(("127.0.0.1", port), FakeBedrockHandler)
+        self.quota = FakeQuota(rpm, tpm, window_seconds)
+        self.latency_seconds = latency_seconds
+        self.output_tokens = output_tokens
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def run_load(calls: int, concurrency: int) -> dict:
+    """Make concurrent model calls and count successes, failures and wall time."""
+    model = get_pooled_model(max_tokens=256)
+    results = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def call(index: int):
+        try:
+            model.invoke(f"Call {index}: suggest one thing to do in Paris.")
+            outcome = "ok"
+        except Exception:
+            outcome = "failed"
+        with lock:
+            results[outcome] += 1
+
+    time_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(calls)))
+    results["seconds"] = time.perf_counter() - time_start
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40, help="Model calls per run")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent callers")
+    parser.add_argument("--rpm", type=float, default=120, help="Fake quota, requests per minute")
+    parser.add_argument("--tpm", type=float, default=400000, help="Fake quota, tokens per minute")
+    parser.add_argument("--window", type=float, default=10, help="Fake quota window in seconds")
+    args = parser.parse_args()
+
+    server = FakeBedrockServer(rpm=args.rpm, tpm=args.tpm, window_seconds=args.window).start()
+    os.environ["BEDROCK_ENDPOINT_URL"] = server.url
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "fake")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+
+    rows = []
+    for governed in (False, True):
+        rate_governor.enabled = governed
+        rate_governor.configure(BEDROCK_MODELS["claude_3_5_sonnet"], args.rpm, args.tpm)
+        throttled_before = server.quota.throttled
+        time.sleep(args.window)  # Start each run with an empty fake quota window
+        result = run_load(args.calls, args.concurrency)
+        rows.append(("governed" if governed else "ungoverned", result, server.quota.throttled - throttled_before))
+
+    server.stop()
+
+    print("\n" + "="*80)
+    print(f"{args.calls} calls, {args.concurrency} concurrent, fake quota {args.rpm:.0f} RPM / {args.tpm:.0f} TPM")
+    print("="*80)
+    print(f"{'Mode':<12} {'OK':>5} {'Failed':>7} {'Throttled (server)':>20} {'Seconds':>9}")
+    for mode, result, throttled in rows:
+        print(f"{mode:<12} {result['ok']:>5} {result['failed']:>7} {throttled:>20} {result['seconds']:>9.2f}")
+    print("-"*80)
+    print(json.dumps(rate_governor.stats(), indent=2))
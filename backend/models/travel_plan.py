@@ -35,6 +35,7 @@ class TravelPlanRequest(BaseModel):
 class TravelPlanAgentRequest(BaseModel):
     trip_plan_id: str
     travel_plan: TravelPlanRequest
+    bypass_cache: bool = False
 
 
 class TravelPlanResponse(BaseModel):
@@ -7,7 +7,15 @@ from models.travel_plan import (
     TravelPlanTeamResponse,
 )
 from loguru import logger
-from agents.langgraph_workflow import run_travel_planning_workflow
+from agents.langgraph_workflow import (
+    run_travel_planning_workflow,
+    astream_travel_planning_workflow,
+    research_destination,
+)
+from agents.langgraph_nodes import research_request
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+import asyncio
 import json
 import time
 
@@ -109,16 +117,43 @@ def travel_request_to_markdown(data: TravelPlanRequest) -> str:
     return "\n".join(lines)
 
 
-async def generate_travel_plan(request: TravelPlanAgentRequest) -> str:
-    """
-    Generate a travel plan using LangGraph workflow.
-    
-    Args:
-        request: Travel plan request with trip_plan_id and travel_plan data
-    
-    Returns:
-        JSON string with complete travel plan
-    """
+def build_plan_response(trip_plan_id: str, result: dict) -> dict:
+    """Build the travel plan response payload from the final workflow state."""
+    return {
+        "itinerary": {
+            "research_results": result.get("research_results"),
+            "booking_results": result.get("booking_results"),
+            "itinerary": result.get("itinerary"),
+            "budget_analysis": result.get("budget_analysis"),
+        },
+        "research_agent_response": result.get("research_results"),
+        "booking_agent_response": result.get("booking_results"),
+        "itinerary_agent_response": result.get("itinerary"),
+        "budget_agent_response": result.get("budget_analysis"),
+        "travel_plan": result.get("travel_plan"),
+        "current_step": result.get("current_step"),
+        "errors": result.get("errors", []),
+        "trip_plan_id": trip_plan_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def build_error_response(trip_plan_id: str, error: Exception) -> dict:
+    """Build the error response payload."""
+    return {
+        "success": False,
+        "error": str(error),
+        "trip_plan_id": trip_plan_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def _generate_travel_plan_response(
+    request: TravelPlanAgentRequest,
+    resume: bool = True,
+    research_results: Optional[str] = None
+) -> dict:
+    """Run the workflow for a request and build the response (or error) payload."""
     trip_plan_id = request.trip_plan_id
     logger.info(f"Generating travel plan for tripPlanId: {trip_plan_id}")
 
@@ -134,43 +169,176 @@ async def generate_travel_plan(request: TravelPlanAgentRequest) -> str:
         result = await run_travel_planning_workflow(
             trip_plan_id=trip_plan_id,
             travel_request_md=travel_request_md,
-            destination=request.travel_plan.destination
+            destination=request.travel_plan.destination,
+            resume=resume,
+            research_results=research_results,
+            llm_cache=not request.bypass_cache,
+            duration=request.travel_plan.duration
         )
 
         time_end = time.time()
         logger.info(f"Total time taken: {time_end - time_start:.2f} seconds")
 
-        # Compile final response in the expected format
-        final_response = json.dumps({
-            "itinerary": {
-                "research_results": result.get("research_results"),
-                "booking_results": result.get("booking_results"),
-                "itinerary": result.get("itinerary"),
-                "budget_analysis": result.get("budget_analysis"),
-            },
-            "research_agent_response": result.get("research_results"),
-            "booking_agent_response": result.get("booking_results"),
-            "itinerary_agent_response": result.get("itinerary"),
-            "budget_agent_response": result.get("budget_analysis"),
-            "current_step": result.get("current_step"),
-            "errors": result.get("errors", []),
-            "trip_plan_id": trip_plan_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }, indent=2)
-
         logger.info(f"Travel plan generated successfully for {trip_plan_id}")
-        return final_response
+        # Compile final response in the expected format
+        return build_plan_response(trip_plan_id, result)
 
     except Exception as e:
         logger.error(
             f"Error generating travel plan for {trip_plan_id}: {str(e)}", exc_info=True
         )
         # Return error response
-        error_response = json.dumps({
-            "success": False,
-            "error": str(e),
-            "trip_plan_id": trip_plan_id,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }, indent=2)
-        return error_response
+        return build_error_response(trip_plan_id, e)
+
+
+async def generate_travel_plan(request: TravelPlanAgentRequest, resume: bool = True) -> str:
+    """
+    Generate a travel plan using LangGraph workflow.
+    
+    Args:
+        request: Travel plan request with trip_plan_id and travel_plan data
+            (bypass_cache skips the LLM response cache for this request)
+        resume: Reuse checkpoints from an earlier attempt with the same
+            trip_plan_id, re-running only the nodes that did not complete
+    
+    Returns:
+        JSON string with complete travel plan
+    """
+    final_response = await _generate_travel_plan_response(request, resume=resume)
+    return json.dumps(final_response, indent=2)
+
+
+def normalize_destination(destination: str) -> str:
+    """Normalize a destination name for grouping ("  paris " == "Paris")."""
+    return " ".join(destination.split()).lower()
+
+
+def research_key(request: TravelPlanAgentRequest) -> Tuple[str, str]:
+    """
+    Get the batch grouping key for a request's research: its destination
+    and the preferences the Research & Discovery node reads.
+    """
+    travel_request_md = travel_request_to_markdown(request.travel_plan)
+    return normalize_destination(request.travel_plan.destination), research_request(travel_request_md)
+
+
+async def generate_travel_plans_batch(
+    requests: Iterable[TravelPlanAgentRequest],
+    concurrency: int = 4,
+    share_research: bool = True,
+    resume: bool = True
+) -> AsyncIterator[dict]:
+    """
+    Generate many travel plans with bounded concurrency.
+    
+    Requests with the same destination and research preferences (travel
+    vibe, style, interests and destination context; see research_request)
+    reuse one Research & Discovery result, so each is researched exactly as
+    it would be on its own. Requests whose research is not shared are
+    researched inside their own workflow as usual, and if shared research
+    fails each request falls back to researching on its own.
+    
+    Args:
+        requests: Travel plan requests
+        concurrency: Maximum number of workflows running at once
+        share_research: Research each destination once for the whole batch
+        resume: Reuse checkpoints from earlier attempts with the same trip_plan_id
+    
+    Yields:
+        Response payloads (same as generate_travel_plan) in completion order
+    """
+    requests = list(requests)
+    semaphore = asyncio.Semaphore(concurrency)
+    research_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    research_keys = [research_key(r) for r in requests]
+    key_counts = Counter(research_keys)
+    # Shared research bypasses the LLM cache if any request in its group does
+    bypass_keys = {key for key, r in zip(research_keys, requests) if r.bypass_cache}
+    shared_keys = set()
+    if share_research:
+        shared_keys = {key for key, count in key_counts.items() if count > 1}
+        saved = sum(key_counts[key] - 1 for key in shared_keys)
+        logger.info(
+            f"Batch of {len(requests)} requests across {len(key_counts)} destination/preference groups "
+            f"({saved} research runs saved)"
+        )
+
+    def shared_research(key: Tuple[str, str], request: TravelPlanAgentRequest) -> asyncio.Task:
+        if key not in research_tasks:
+            # Researched from the group's first request; the rest share its research input
+            research_tasks[key] = asyncio.create_task(
+                research_destination(
+                    request.travel_plan.destination,
+                    travel_request_to_markdown(request.travel_plan),
+                    llm_cache=key not in bypass_keys,
+                )
+            )
+        return research_tasks[key]
+
+    async def run_one(request: TravelPlanAgentRequest, key: Tuple[str, str]) -> dict:
+        async with semaphore:
+            research_results = None
+            if key in shared_keys:
+                try:
+                    # Shielded so one cancelled request does not cancel the shared research
+                    research_results = await asyncio.shield(shared_research(key, request))
+                except Exception as e:
+                    logger.warning(f"Shared research failed for {request.travel_plan.destination}: {e}")
+            return await _generate_travel_plan_response(
+                request, resume=resume, research_results=research_results
+            )
+
+    tasks = [asyncio.create_task(run_one(request, key)) for request, key in zip(requests, research_keys)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        for task in tasks + list(research_tasks.values()):
+            task.cancel()
+
+
+async def stream_travel_plan(request: TravelPlanAgentRequest, resume: bool = True) -> AsyncIterator[dict]:
+    """
+    Generate a travel plan, yielding progress events while it runs.
+    
+    Yields a "started" event immediately, then node, tool and token events
+    from the workflow, and finally a "complete" event whose "response" is the
+    same payload generate_travel_plan returns (or an "error" event).
+    
+    Args:
+        request: Travel plan request with trip_plan_id and travel_plan data
+        resume: Reuse checkpoints from an earlier attempt with the same trip_plan_id
+    
+    Yields:
+        Event dictionaries with a "type" key
+    """
+    trip_plan_id = request.trip_plan_id
+    logger.info(f"Streaming travel plan for tripPlanId: {trip_plan_id}")
+
+    time_start = time.time()
+    yield {"type": "started", "trip_plan_id": trip_plan_id}
+
+    try:
+        travel_request_md = travel_request_to_markdown(request.travel_plan)
+
+        async for event in astream_travel_planning_workflow(
+            trip_plan_id=trip_plan_id,
+            travel_request_md=travel_request_md,
+            destination=request.travel_plan.destination,
+            resume=resume,
+            llm_cache=not request.bypass_cache,
+            duration=request.travel_plan.duration
+        ):
+            if event["type"] == "complete":
+                logger.info(f"Total time taken: {time.time() - time_start:.2f} seconds")
+                yield {"type": "complete", "response": build_plan_response(trip_plan_id, event["state"])}
+            else:
+                yield event
+
+    except Exception as e:
+        logger.error(
+            f"Error streaming travel plan for {trip_plan_id}: {str(e)}", exc_info=True
+        )
+        yield {"type": "error", "response": build_error_response(trip_plan_id, e)}
 
@@ -3,6 +3,7 @@
 import asyncio
 from models.travel_plan import TravelPlanRequest, TravelPlanAgentRequest
 from services.plan_service import generate_travel_plan
+from agents.langgraph_workflow import shutdown_workflow
 from loguru import logger
 
 
@@ -47,6 +48,9 @@ async def test_workflow():
         logger.error(f"Test failed: {e}")
         import traceback
         traceback.print_exc()
+    
+    finally:
+        await shutdown_workflow()
 
 
 if __name__ == "__main__":
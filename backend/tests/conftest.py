@@ -0,0 +1,6 @@
+"""Make the backend modules importable as they are when the service runs from backend/."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
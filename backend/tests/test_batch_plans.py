@@ -0,0 +1,104 @@
+"""Tests for batch travel plan generation."""
+
+import asyncio
+import batch_plans
+from models.travel_plan import TravelPlanAgentRequest
+from services import plan_service
+
+
+def trip(trip_plan_id: str, destination: str, vibe: str = "cultural", budget: int = 75000) -> TravelPlanAgentRequest:
+    return TravelPlanAgentRequest(
+        trip_plan_id=trip_plan_id,
+        travel_plan={"destination": destination, "vibes": [vibe], "budget": budget},
+    )
+
+
+def run_batch(requests, **kwargs) -> list:
+    async def collect():
+        return [result async for result in plan_service.generate_travel_plans_batch(requests, **kwargs)]
+    return asyncio.run(collect())
+
+
+class FakeWorkflow:
+    """Stands in for research_destination and the per-request workflow."""
+
+    def __init__(self, research_fails: bool = False):
+        self.research_fails = research_fails
+        self.researched = []
+        self.research_results = {}
+        self.running = 0
+        self.max_running = 0
+
+    async def research_destination(self, destination, travel_request_md, llm_cache=True):
+        self.researched.append(destination)
+        await asyncio.sleep(0.01)
+        if self.research_fails:
+            raise RuntimeError("Bedrock unavailable")
+        return f"research for {destination} #{len(self.researched)}"
+
+    async def generate(self, request, resume=True, research_results=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        self.research_results[request.trip_plan_id] = research_results
+        return {"trip_plan_id": request.trip_plan_id, "success": True}
+
+
+def install(monkeypatch, workflow: FakeWorkflow):
+    monkeypatch.setattr(plan_service, "research_destination", workflow.research_destination)
+    monkeypatch.setattr(plan_service, "_generate_travel_plan_response", workflow.generate)
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    workflow = FakeWorkflow()
+    install(monkeypatch, workflow)
+    results = run_batch([trip(str(i), f"City {i}") for i in range(8)], concurrency=3)
+    assert sorted(result["trip_plan_id"] for result in results) == [str(i) for i in range(8)]
+    assert workflow.max_running == 3
+
+
+def test_research_shared_once_per_destination_and_preferences(monkeypatch):
+    workflow = FakeWorkflow()
+    install(monkeypatch, workflow)
+    run_batch([
+        trip("a", "Paris", budget=1000),
+        trip("b", " paris ", budget=9000),  # Budget is not a research input
+        trip("c", "Paris", vibe="adventure"),
+        trip("d", "Rome"),
+    ])
+    assert workflow.researched == ["Paris"]
+    assert workflow.research_results["a"] == workflow.research_results["b"] == "research for Paris #1"
+    # Different preferences, or a destination seen once: researched inside their own workflow
+    assert workflow.research_results["c"] is None and workflow.research_results["d"] is None
+
+
+def test_no_shared_research_when_disabled(monkeypatch):
+    workflow = FakeWorkflow()
+    install(monkeypatch, workflow)
+    run_batch([trip("a", "Paris"), trip("b", "Paris")], share_research=False)
+    assert workflow.researched == []
+
+
+def test_failed_shared_research_falls_back(monkeypatch):
+    workflow = FakeWorkflow(research_fails=True)
+    install(monkeypatch, workflow)
+    results = run_batch([trip("a", "Paris"), trip("b", "Paris")])
+    assert len(results) == 2
+    assert workflow.researched == ["Paris"]  # Tried once, not once per request
+    assert workflow.research_results == {"a": None, "b": None}
+
+
+def test_read_requests_skips_invalid_lines(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text(
+        '{"trip_plan_id": "a", "travel_plan": {"destination": "Paris"}}\n'
+        "\n"
+        '{"travel_plan": {"destination": "Rome"}}\n'
+        "not json\n"
+        '{"trip_plan_id": "b", "travel_plan": {"destination": "Rome"}, "bypass_cache": true}\n',
+        encoding="utf-8",
+    )
+    requests = batch_plans.read_requests(str(path))
+    assert [r.trip_plan_id for r in requests] == ["a", "b"]
+    assert requests[1].bypass_cache and requests[1].travel_plan.destination == "Rome"
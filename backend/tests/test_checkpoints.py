@@ -0,0 +1,136 @@
+"""Tests for the checkpoint store and resuming checkpointed workflow runs."""
+
+import asyncio
+import pytest
+from agents import checkpoints, langgraph_workflow
+from agents.checkpoints import CheckpointStore
+from agents.langgraph_workflow import _resume_point, create_travel_planning_graph
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DB_PATH", str(tmp_path / "checkpoints.sqlite"))
+    store = CheckpointStore()
+    monkeypatch.setattr(langgraph_workflow, "checkpoint_store", store)
+    return store
+
+
+class FakeNodes:
+    """Workflow nodes that record their runs; nodes named in fail return a node error once."""
+
+    def __init__(self, monkeypatch, fail=()):
+        self.runs = []
+        self.fail = set(fail)
+        for node in langgraph_workflow.WORKFLOW_NODES:
+            monkeypatch.setattr(langgraph_workflow, f"a{node}_node", self.node(node))
+
+    def node(self, name):
+        async def run(state, config=None):
+            self.runs.append(name)
+            if name in self.fail:
+                self.fail.discard(name)
+                return {"errors": [f"{name} failed"], "failed_nodes": [name]}
+            return {"current_step": name}
+        return run
+
+
+def initial_state(request_md: str = "# Paris trip") -> dict:
+    return {
+        "trip_plan_id": "trip-1", "travel_request_md": request_md, "destination": "Paris", "duration": 3,
+        "current_step": "start", "errors": [], "failed_nodes": [],
+    }
+
+
+async def run_workflow(store, state: dict, resume: bool = True):
+    app = create_travel_planning_graph("sequential", checkpointer=await store.get_saver())
+    config = {"configurable": {"thread_id": "trip-1"}}
+    input_data, run_config = await _resume_point(app, config, state, "sequential", resume)
+    result = await app.ainvoke(input_data, run_config)
+    await store.record_run("trip-1", "sequential", "failed" if result.get("failed_nodes") else "completed")
+    return result
+
+
+async def checkpoint_count(store, thread_id: str) -> int:
+    async with store._conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)) as cursor:
+        return (await cursor.fetchone())[0]
+
+
+def test_resume_reruns_only_from_the_failed_node(store, monkeypatch):
+    nodes = FakeNodes(monkeypatch, fail={"booking_logistics"})
+
+    async def scenario():
+        try:
+            first = await run_workflow(store, initial_state())
+            second = await run_workflow(store, initial_state())
+            return first, second
+        finally:
+            await store.close()
+
+    first, second = asyncio.run(scenario())
+    assert first["failed_nodes"] == ["booking_logistics"]
+    assert second["failed_nodes"] == [] and second["current_step"] == "planning_optimization"
+    assert nodes.runs == list(langgraph_workflow.WORKFLOW_NODES) + ["booking_logistics", "planning_optimization"]
+
+
+def test_completed_run_is_reused_and_changed_request_starts_over(store, monkeypatch):
+    nodes = FakeNodes(monkeypatch)
+
+    async def scenario():
+        try:
+            await run_workflow(store, initial_state())
+            await run_workflow(store, initial_state())  # Nothing to re-run
+            assert len(nodes.runs) == 4
+            await run_workflow(store, initial_state("# Paris trip, now with kids"))
+            assert len(nodes.runs) == 8
+            await run_workflow(store, initial_state("# Paris trip, now with kids"), resume=False)
+            assert len(nodes.runs) == 12
+        finally:
+            await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_compaction_keeps_failed_threads(store, monkeypatch):
+    FakeNodes(monkeypatch)
+
+    async def scenario():
+        saver = await store.get_saver()
+        app = create_travel_planning_graph("sequential", checkpointer=saver)
+        for thread_id, status in (("done", "completed"), ("broken", "failed")):
+            await app.ainvoke(initial_state(), {"configurable": {"thread_id": thread_id}})
+            await store.record_run(thread_id, "sequential", status)
+        before = await checkpoint_count(store, "broken")
+        deleted = await store.compact()
+        counts = await checkpoint_count(store, "done"), await checkpoint_count(store, "broken")
+        await store.close()
+        return before, deleted, counts
+
+    before, deleted, counts = asyncio.run(scenario())
+    assert counts == (store.keep_last, before)
+    assert deleted == before - store.keep_last
+
+
+def test_expiry_deletes_idle_threads(store, monkeypatch):
+    FakeNodes(monkeypatch)
+
+    async def scenario():
+        saver = await store.get_saver()
+        app = create_travel_planning_graph("sequential", checkpointer=saver)
+        for thread_id in ("old", "recent"):
+            await app.ainvoke(initial_state(), {"configurable": {"thread_id": thread_id}})
+        now = checkpoints.time.time()
+        monkeypatch.setattr(checkpoints.time, "time", lambda: now - store.ttl_seconds - 60)
+        await store.record_run("old", "sequential", "completed")
+        monkeypatch.setattr(checkpoints.time, "time", lambda: now)
+        await store.record_run("recent", "sequential", "completed")
+        expired = await store.expire()
+        result = (
+            expired, await checkpoint_count(store, "old"), await checkpoint_count(store, "recent"),
+            await store.get_thread_mode("old"),
+        )
+        await store.close()
+        return result
+
+    expired, old, recent, old_mode = asyncio.run(scenario())
+    assert (expired, old, old_mode) == (1, 0, None)
+    assert recent > 0
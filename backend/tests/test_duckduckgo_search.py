@@ -0,0 +1,21 @@
+"""Tests for DuckDuckGo result URL normalization."""
+
+from tools.duckduckgo_search import normalize_url
+
+
+def test_same_page_normalizes_alike():
+    assert normalize_url("https://www.Example.com/Paris/?utm_source=x&utm_medium=y") \
+        == normalize_url("http://example.com/Paris")
+
+
+def test_tracking_parameters_dropped_by_exact_name():
+    assert normalize_url("https://example.com/a?ref=home&ref_src=twsrc&gclid=1&id=3") == "//example.com/a?id=3"
+
+
+def test_parameters_that_only_start_like_tracking_are_kept():
+    assert normalize_url("https://example.com/a?refine=museums&region_ref=fr") \
+        == "//example.com/a?refine=museums&region_ref=fr"
+
+
+def test_path_case_kept():
+    assert normalize_url("https://example.com/Paris") != normalize_url("https://example.com/paris")
@@ -0,0 +1,120 @@
+"""Tests for the flexible-date flight search helpers."""
+
+from datetime import date, timedelta
+import pytest
+from tools import google_flight
+from tools.google_flight import FlightCache, _date_window, _matrix_cells, _price_value, get_flexible_flights
+
+
+def day(offset: int) -> str:
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+def flight(price: str, airline: str = "AirX") -> dict:
+    return {
+        "airline": airline, "departure_time": "8:00 AM", "arrival_time": "11:00 AM",
+        "duration": "3 hr", "price": price, "stops": 0, "is_best": False,
+    }
+
+
+@pytest.mark.parametrize("price,value", [
+    ("$1,234", 1234.0),
+    ("₹12,500", 12500.0),
+    ("$99.50", 99.5),
+    ("Price unavailable", None),
+    ("", None),
+])
+def test_price_value(price, value):
+    assert _price_value({"price": price}) == value
+
+
+def test_date_window():
+    assert _date_window(day(10), 2) == [day(8), day(9), day(10), day(11), day(12)]
+    assert _date_window(day(10), 0) == [day(10)]
+
+
+def test_date_window_skips_past_dates():
+    assert _date_window(day(1), 3) == [day(0), day(1), day(2), day(3), day(4)]
+    assert _date_window(day(-10), 3) == []
+
+
+def test_one_way_cells():
+    cells = _matrix_cells(_date_window(day(10), 1), [None], day(10), None)
+    assert cells == [(day(9), None), (day(10), None), (day(11), None)]
+
+
+def test_round_trip_cells_return_after_departure():
+    cells = _matrix_cells(_date_window(day(10), 2), _date_window(day(11), 2), day(10), day(11))
+    assert cells and all(ret > out for out, ret in cells)
+    assert (day(12), day(9)) not in cells
+
+
+def test_cells_capped_closest_to_requested_dates(monkeypatch):
+    monkeypatch.setattr(google_flight, "FLIGHT_MATRIX_MAX_CELLS", 5)
+    cells = _matrix_cells(_date_window(day(20), 3), _date_window(day(30), 3), day(20), day(30))
+
+    def distance(cell):
+        return abs((date.fromisoformat(cell[0]) - date.fromisoformat(day(20))).days) \
+            + abs((date.fromisoformat(cell[1]) - date.fromisoformat(day(30))).days)
+
+    assert len(cells) == 5
+    assert (day(20), day(30)) in cells
+    assert max(distance(cell) for cell in cells) <= 1
+    assert cells == sorted(cells)
+
+
+def test_flight_cache_expiry_and_eviction(monkeypatch):
+    cache = FlightCache()
+    cache.put(("a",), [1])
+    assert cache.get(("a",)) == [1]
+    monkeypatch.setattr(google_flight, "FLIGHT_CACHE_TTL_SECONDS", -1)
+    cache.put(("b",), [2])
+    assert cache.get(("b",)) is None
+    monkeypatch.setattr(google_flight, "FLIGHT_CACHE_TTL_SECONDS", 600)
+    monkeypatch.setattr(google_flight, "FLIGHT_CACHE_MAX_ENTRIES", 2)
+    for key in ("c", "d", "e"):
+        cache.put((key,), [key])
+    assert cache.get(("c",)) is None and cache.get(("e",)) == ["e"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_flexible_search_one_way(monkeypatch):
+    prices = {day(9): "$420", day(10): "$500", day(11): "Price unavailable"}
+
+    def search(departure, destination, out, trip, adults, children, cabin_class, ret):
+        assert (trip, ret) == ("one-way", None)
+        if out == day(12):
+            raise RuntimeError("blocked")
+        return [flight(prices.get(out, "$700")), flight("$1,234", "AirY")]
+
+    monkeypatch.setattr(google_flight, "search_flights", search)
+    result = get_flexible_flights.invoke(
+        {"departure": "JFK", "destination": "LAX", "date": day(10), "days": 2, "top_n": 2}
+    )
+    requested = date.fromisoformat(day(10)).strftime("%a %Y-%m-%d")
+    assert f"| {requested}* | $500 |" in result
+    assert f"Cheapest: depart {day(9)} at $420 (80 less than the requested dates at $500)." in result
+    assert f"1. {day(9)}: AirX" in result and f"2. {day(10)}: AirX" in result
+    assert f"Search failed for: {day(12)}" in result
+
+
+def test_flexible_search_round_trip_grid(monkeypatch):
+    def search(departure, destination, out, trip, adults, children, cabin_class, ret):
+        assert trip == "round-trip"
+        offset = (date.fromisoformat(out) - date.today()).days + (date.fromisoformat(ret) - date.today()).days
+        return [flight(f"${100 + offset}")]
+
+    monkeypatch.setattr(google_flight, "search_flights", search)
+    result = get_flexible_flights.invoke({
+        "departure": "JFK", "destination": "LAX", "date": day(10), "days": 1,
+        "return_date": day(17), "return_days": 1,
+    })
+    assert "| Depart / Return |" in result
+    rows = [line for line in result.splitlines() if line.startswith("| ") and "Depart" not in line]
+    assert len(rows) == 3 and all(line.count("|") == 5 for line in rows)
+    assert f"Cheapest: depart {day(9)}, return {day(16)} at $125" in result
+
+
+def test_flexible_search_past_dates():
+    result = get_flexible_flights.invoke({"departure": "JFK", "destination": "LAX", "date": day(-30)})
+    assert result.startswith("No future dates to search")
@@ -0,0 +1,84 @@
+"""Tests for hedged tool calls."""
+
+import threading
+import time
+import pytest
+from tools import hedging, free_scraper
+from tools.hedging import HedgePolicy, hedged_call
+from tools.http_client import FetchResult
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    """A policy whose hedge delay is 50 ms and whose budget always allows a hedge."""
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATE", 1.0)
+    policy = HedgePolicy("test")
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        policy.record_latency(0.05)
+    return policy
+
+
+def attempts(*behaviours):
+    """A call whose nth attempt sleeps, then returns or raises, as behaviours[n] says."""
+    lock = threading.Lock()
+    count = [0]
+
+    def call():
+        with lock:
+            seconds, outcome = behaviours[count[0]]
+            count[0] += 1
+        time.sleep(seconds)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, count
+
+
+def test_fast_call_not_hedged(policy):
+    call, count = attempts((0.0, "page"))
+    assert hedged_call(policy, call) == "page"
+    assert count[0] == 1 and policy.stats()["hedged"] == 0
+
+
+def test_backup_wins_when_primary_is_slow(policy):
+    call, count = attempts((0.5, "slow"), (0.0, "fast"))
+    assert hedged_call(policy, call) == "fast"
+    assert count[0] == 2 and policy.stats()["hedge_wins"] == 1
+
+
+def test_failed_attempt_does_not_beat_a_slower_result(policy):
+    call, _ = attempts((0.3, "page"), (0.0, ConnectionError("reset")))
+    assert hedged_call(policy, call) == "page"
+    assert policy.stats()["hedge_wins"] == 0
+
+
+def test_error_raised_when_every_attempt_fails(policy):
+    call, _ = attempts((0.2, ValueError("first")), (0.0, ValueError("second")))
+    with pytest.raises(ValueError):
+        hedged_call(policy, call)
+
+
+def test_scraper_error_string_does_not_win_a_hedge(monkeypatch):
+    """scrape_url_text returns error strings, so only its raising inner fetch is hedged."""
+    monkeypatch.setattr(hedging, "HEDGE_ENABLED_TOOLS", {"scraper"})
+    monkeypatch.setattr(hedging, "HEDGE_MAX_RATE", 1.0)
+    policy = free_scraper._fetch_text.hedge_policy
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        policy.record_latency(0.05)
+    lock = threading.Lock()
+    calls = [0]
+
+    def fetch(url, timeout, max_bytes=None, sink=None):
+        with lock:
+            calls[0] += 1
+            first = calls[0] == 1
+        if not first:
+            raise ConnectionError("reset")
+        time.sleep(0.3)
+        sink(b"<html><body><p>The real page</p></body></html>")
+        return FetchResult(url=url, status=200, content=b"", revalidated=False, truncated=False)
+
+    monkeypatch.setattr(free_scraper.http_client, "fetch", fetch)
+    assert free_scraper.scrape_url_text("https://example.com/hedge-test") == "The real page"
+    assert calls[0] == 2
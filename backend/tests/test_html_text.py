@@ -0,0 +1,86 @@
+"""Tests for streaming visible-text extraction from HTML."""
+
+import pytest
+from tools import free_scraper, html_text
+from tools.html_text import TRUNCATION_MARK, StreamingTextExtractor, sniff_encoding
+from tools.http_client import FetchResult
+
+
+def feed_in_chunks(extractor: StreamingTextExtractor, html: bytes, size: int) -> int:
+    """Feed html in chunks until the extractor asks to stop; returns the chunks fed."""
+    for count, start in enumerate(range(0, len(html), size), 1):
+        if extractor.feed(html[start:start + size]):
+            return count
+    return -1
+
+
+def paragraphs(count: int) -> bytes:
+    body = "".join(f"<p>Paragraph {i} about the old town and its markets.</p>" for i in range(count))
+    return f"<html><body>{body}</body></html>".encode()
+
+
+def test_visible_text_only():
+    extractor = StreamingTextExtractor()
+    extractor.feed(
+        b"<html><head><title>Goa</title><style>p {color: red}</style></head><body>"
+        b"<nav><a>Home</a></nav><script>var x = '<p>hidden</p>';</script>"
+        b"<h1>Beaches</h1><p>Calangute  is busy.</p><p>Palolem is quiet &amp; clean.</p></body></html>"
+    )
+    assert extractor.text() == "Goa\nBeaches\nCalangute\nis busy.\nPalolem is quiet & clean."
+
+
+def test_text_split_across_chunks():
+    html = "<p>Café Mondegar serves breakfast</p>".encode()
+    extractor = StreamingTextExtractor()
+    for i in range(len(html)):  # One byte at a time, splitting the UTF-8 character
+        extractor.feed(html[i:i + 1])
+    assert extractor.text() == "Café Mondegar serves breakfast"
+
+
+def test_character_cap_stops_reading_early():
+    html = paragraphs(1000)
+    extractor = StreamingTextExtractor(max_chars=500)
+    chunks = feed_in_chunks(extractor, html, 1024)
+    assert 0 < chunks < len(html) // 1024
+    text = extractor.text()
+    assert text.endswith(TRUNCATION_MARK)
+    assert len(text) <= 500 + len(TRUNCATION_MARK)
+
+
+def test_byte_cap_marks_text_truncated():
+    extractor = StreamingTextExtractor(max_chars=100_000)
+    extractor.feed(paragraphs(10)[:300])
+    text = extractor.text(truncated=True)
+    assert text.startswith("Paragraph 0") and text.endswith(TRUNCATION_MARK)
+
+
+@pytest.mark.parametrize("head,encoding", [
+    (b"\xef\xbb\xbf<html>", "utf-8-sig"),
+    (b'<meta charset="iso-8859-1"><p>', "iso8859-1"),
+    (b"<meta http-equiv='Content-Type' content='text/html; charset=windows-1252'>", "cp1252"),
+    (b'<meta charset="no-such-charset">', "utf-8"),
+    (b"<p>plain</p>", "utf-8"),
+])
+def test_sniff_encoding(head, encoding):
+    assert sniff_encoding(head) == encoding
+
+
+def test_scraper_passes_byte_cap_and_stops_at_character_cap(monkeypatch):
+    html = paragraphs(1000)
+    calls = []
+    fed = []
+
+    def fetch(url, timeout, max_bytes=None, sink=None):
+        calls.append(max_bytes)
+        for start in range(0, len(html), 512):
+            fed.append(start)
+            if sink(html[start:start + 512]):
+                break
+        return FetchResult(url=url, status=200, content=b"", truncated=len(fed) * 512 < len(html))
+
+    monkeypatch.setattr(free_scraper.http_client, "fetch", fetch)
+    text = free_scraper.scrape_url_text("https://example.com/html-text-test")
+    assert calls == [html_text.SCRAPER_MAX_BYTES]
+    assert len(fed) * 512 < len(html) // 2  # Stopped reading well before the end
+    assert text.startswith("Paragraph 0") and text.endswith(TRUNCATION_MARK)
+    assert len(text) <= html_text.SCRAPER_MAX_CHARS + len(TRUNCATION_MARK)
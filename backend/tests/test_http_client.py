@@ -0,0 +1,86 @@
+"""Tests for the pooled HTTP client's ETag/Last-Modified revalidation."""
+
+import httpx
+import pytest
+from tools.http_client import PooledHTTPClient
+
+
+PAGE = b"<html><body><p>Opening hours: 9:00 to 18:00</p></body></html>"
+
+
+class FakeServer:
+    """Serves one page per URL and answers 304 when the client's validators match."""
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(dict(request.headers))
+        etag = self.headers.get("ETag")
+        last_modified = self.headers.get("Last-Modified")
+        if (etag and request.headers.get("If-None-Match") == etag) or (
+            not etag and last_modified and request.headers.get("If-Modified-Since") == last_modified
+        ):
+            return httpx.Response(304, headers=self.headers)
+        return httpx.Response(200, headers=self.headers, content=PAGE)
+
+
+@pytest.fixture
+def client_for(tmp_path, monkeypatch):
+    monkeypatch.setenv("HTTP_CACHE_DB_PATH", str(tmp_path / "http_cache.sqlite"))
+    clients = []
+
+    def make(server: FakeServer) -> PooledHTTPClient:
+        client = PooledHTTPClient()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(server))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.mark.parametrize("headers,sent", [
+    ({"ETag": '"v1"'}, {"if-none-match": '"v1"'}),
+    ({"Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"}, {"if-modified-since": "Wed, 01 Oct 2025 10:00:00 GMT"}),
+])
+def test_second_fetch_revalidates_with_stored_validators(client_for, headers, sent):
+    server = FakeServer(headers)
+    client = client_for(server)
+    first = client.fetch("https://example.com/hours")
+    second = client.fetch("https://example.com/hours")
+
+    assert (first.status, first.revalidated, first.content) == (200, False, PAGE)
+    assert (second.status, second.revalidated, second.content) == (304, True, PAGE)
+    assert not {"if-none-match", "if-modified-since"} & set(server.requests[0])
+    assert sent.items() <= server.requests[1].items()
+    stats = client.stats()
+    assert (stats["not_modified"], stats["bytes_saved"]) == (1, len(PAGE))
+
+
+def test_response_without_validators_not_stored(client_for):
+    server = FakeServer({})
+    client = client_for(server)
+    client.fetch("https://example.com/hours")
+    second = client.fetch("https://example.com/hours")
+    assert second.status == 200 and not second.revalidated
+    assert "if-none-match" not in server.requests[1]
+
+
+def test_no_store_response_not_stored(client_for):
+    server = FakeServer({"ETag": '"v1"', "Cache-Control": "no-store"})
+    client = client_for(server)
+    client.fetch("https://example.com/hours")
+    client.fetch("https://example.com/hours")
+    assert "if-none-match" not in server.requests[1]
+
+
+def test_revalidated_body_replayed_to_sink_within_cap(client_for):
+    client = client_for(FakeServer({"ETag": '"v1"'}))
+    client.fetch("https://example.com/hours")
+    chunks = []
+    result = client.fetch("https://example.com/hours", max_bytes=20, sink=lambda chunk: chunks.append(chunk) or False)
+    assert result.revalidated and result.truncated
+    assert b"".join(chunks) == PAGE[:20]
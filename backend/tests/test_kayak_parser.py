@@ -0,0 +1,163 @@
+"""Tests for the streaming Kayak results parser."""
+
+import gzip
+import json
+import os
+import random
+import pytest
+from tools import kayak_parser
+from tools.kayak_parser import KayakResultParser, parse_kayak_hotels, format_hotel_table
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "html")
+
+CARD = """
+<div data-resultid="h1" class="yuAt-card">
+  <a class="FLpo-big-name" href="/hotels/H%C3%B4tel-Lutetia,Paris-c36014-h1-details?ucs=abc#photos">Hôtel   Lutetia</a>
+  <div class="FLpo-stars" aria-label="5 stars"></div>
+  <span class="Ptt7-rating-badge">9.1</span><span class="Ptt7-rating-label">Exceptional</span>
+  <span class="Ptt7-review-count">(2,140 reviews)</span>
+  <div class="zV27-location-name">Saint-Germain-des-Prés</div>
+  <ul class="zV27-amenities"><li>Free WiFi</li><li> Spa </li></ul>
+  <div class="c1XBO-price">$612</div><div class="c1XBO-provider">Booking.com</div>
+</div>
+<div data-resultid="h2"><span class="FLpo-big-name">Hotel | Two</span></div>
+<div data-resultid="h3"><span class="c1XBO-price">$99</span></div>
+"""
+
+JSON_LD = {
+    "@context": "https://schema.org",
+    "@type": "ItemList",
+    "itemListElement": [
+        {"@type": "ListItem", "position": 1, "item": {
+            "@type": "Hotel", "name": "Park Hotel Tokyo", "url": "/hotels/Park-Hotel-Tokyo?x=1",
+            "offers": {"price": "210", "priceCurrency": "USD"},
+            "aggregateRating": {"ratingValue": 8.9, "bestRating": 10, "reviewCount": 2311},
+            "starRating": {"ratingValue": 4},
+            "address": {"streetAddress": "1-7-1 Higashi Shimbashi", "addressLocality": "Minato"},
+            "amenityFeature": [{"name": "Free WiFi"}, "Restaurant"],
+        }},
+        {"@type": "ListItem", "position": 2, "item": {
+            "@type": ["Hotel", "LodgingBusiness"], "name": "Hotel Gracery", "priceRange": "$$",
+        }},
+        {"@type": "ListItem", "position": 3, "item": {"@type": "Restaurant", "name": "Not a hotel"}},
+    ],
+}
+
+
+@pytest.fixture(params=["lxml", "html.parser"])
+def parser_backend(request, monkeypatch):
+    """Run a test with lxml and with the standard library fallback."""
+    if request.param == "lxml":
+        if kayak_parser.etree is None:
+            pytest.skip("lxml is not installed")
+    else:
+        monkeypatch.setattr(kayak_parser, "etree", None)
+    return request.param
+
+
+def read_fixture(name: str) -> bytes:
+    with gzip.open(os.path.join(FIXTURES, name), "rb") as page:
+        return page.read()
+
+
+def parse_in_chunks(html: bytes, cuts, max_results: int = 10) -> list:
+    parser = KayakResultParser(max_results)
+    start = 0
+    for cut in list(cuts) + [len(html)]:
+        if parser.feed(html[start:cut]):
+            break
+        start = cut
+    return parser.hotels()
+
+
+def test_card_fields(parser_backend):
+    hotels = parse_kayak_hotels(f"<html><body>{CARD}</body></html>".encode())
+    assert [hotel.hotel_name for hotel in hotels] == ["Hôtel Lutetia", "Hotel | Two"]
+    lutetia = hotels[0]
+    assert lutetia.price == "$612 per night"
+    assert lutetia.rating == "5-star, 9.1 Exceptional (2,140 reviews)"
+    assert lutetia.address == "Saint-Germain-des-Prés"
+    assert lutetia.amenities == ["Free WiFi", "Spa"]
+    assert lutetia.description == "Best price on Booking.com"
+    # Absolute, without the tracking query and fragment
+    assert lutetia.url == "https://www.kayak.com/hotels/H%C3%B4tel-Lutetia,Paris-c36014-h1-details"
+    assert hotels[1].price == "" and hotels[1].url == ""
+
+
+def test_json_ld(parser_backend):
+    html = f'<html><head><script type="application/ld+json">{json.dumps(JSON_LD)}</script></head></html>'
+    hotels = parse_kayak_hotels(html.encode())
+    assert [hotel.hotel_name for hotel in hotels] == ["Park Hotel Tokyo", "Hotel Gracery"]
+    park = hotels[0]
+    assert park.price == "$210 per night"
+    assert park.rating == "4-star, 8.9/10 (2311 reviews)"
+    assert park.address == "1-7-1 Higashi Shimbashi, Minato"
+    assert park.amenities == ["Free WiFi", "Restaurant"]
+    assert park.url == "https://www.kayak.com/hotels/Park-Hotel-Tokyo"
+    assert hotels[1].price == "$$"
+
+
+def test_json_ld_graph_and_malformed_scripts(parser_backend):
+    graph = {"@graph": [{"@type": "WebPage"}, {"@type": "Hotel", "name": "Graph Hotel"}]}
+    html = (
+        '<script type="application/ld+json">{not json</script>'
+        f'<script type="application/ld+json">{json.dumps(graph)}</script>'
+    )
+    assert [hotel.hotel_name for hotel in parse_kayak_hotels(html.encode())] == ["Graph Hotel"]
+
+
+def test_page_without_results(parser_backend):
+    assert parse_kayak_hotels(b"<html><body><h1>Are you a robot?</h1></body></html>") == []
+
+
+@pytest.mark.parametrize("fixture,first", [
+    ("kayak_hotels_paris.html.gz", "Hôtel Lutetia"),
+    ("kayak_hotels_tokyo_jsonld.html.gz", "Park Hotel Tokyo"),
+])
+def test_fixture_pages(parser_backend, fixture, first):
+    hotels = parse_kayak_hotels(read_fixture(fixture), max_results=5)
+    assert len(hotels) == 5
+    assert hotels[0].hotel_name == first
+    assert all(hotel.price.endswith("per night") for hotel in hotels)
+
+
+def test_stops_reading_once_enough_hotels(parser_backend):
+    html = read_fixture("kayak_hotels_paris.html.gz")
+    parser = KayakResultParser(max_results=3)
+    for start in range(0, len(html), 65536):
+        if parser.feed(html[start:start + 65536]):
+            break
+    assert parser.done
+    assert parser.bytes_read < len(html)
+    assert parser.feed(b"<div>") is True  # Further chunks are ignored
+    assert len(parser.hotels()) == 3
+
+
+def test_random_chunk_boundaries(parser_backend):
+    """Chunks may split tags, entities, JSON-LD and multi-byte characters."""
+    rng = random.Random(11)
+    cards = f"<html><head><meta charset='utf-8'></head><body>{CARD * 3}</body></html>".encode()
+    ld = f'<html><script type="application/ld+json">{json.dumps(JSON_LD)}</script></html>'.encode()
+    for html in (cards, ld):
+        expected = parse_kayak_hotels(html)
+        assert expected
+        for _ in range(100):
+            cuts = sorted(rng.sample(range(1, len(html)), rng.randint(1, 30)))
+            assert parse_in_chunks(html, cuts) == expected
+        assert parse_in_chunks(html, range(1, len(html))) == expected
+
+
+def test_latin1_page(parser_backend):
+    html = '<meta charset="iso-8859-1"><div data-resultid="1"><b class="x-big-name">Hôtel Régina</b></div>'
+    assert parse_kayak_hotels(html.encode("latin-1"))[0].hotel_name == "Hôtel Régina"
+
+
+def test_format_hotel_table():
+    hotels = parse_kayak_hotels(CARD.encode())
+    table = format_hotel_table(hotels, "Top 2 hotels on Kayak:").splitlines()
+    assert table[0] == "Top 2 hotels on Kayak:"
+    assert table[1] == "| # | Hotel | Price | Rating | Area | Link |"
+    assert table[3].startswith("| 1 | Hôtel Lutetia | $612 per night | 5-star, 9.1 Exceptional")
+    # Pipes in values cannot break the row; empty cells show "-"
+    assert table[4] == "| 2 | Hotel / Two | - | - | - | - |"
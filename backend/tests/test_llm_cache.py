@@ -0,0 +1,91 @@
+"""Tests for the SQLite LLM response cache."""
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+from config import llm_cache as llm_cache_module
+from config.llm_cache import SQLiteLLMCache, get_current_node, llm_cache_scope
+
+
+LLM = "model=claude_3_haiku,temperature=0.3"
+
+
+def generations(text: str) -> list:
+    return [ChatGeneration(message=AIMessage(content=text))]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_DB_PATH", str(tmp_path / "llm_cache.sqlite"))
+    cache = SQLiteLLMCache()
+    yield cache
+    cache.close()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module.time, "time", clock.time)
+    return clock
+
+
+def test_hit_after_update(cache):
+    assert cache.lookup("prompt", LLM) is None
+    cache.update("prompt", LLM, generations("Paris is lovely"))
+    assert cache.lookup("prompt", LLM)[0].message.content == "Paris is lovely"
+    assert cache.lookup("prompt", "model=claude_3_5_sonnet") is None  # Keyed by model settings too
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.update("prompt", LLM, generations("old answer"))
+    clock.now += cache.ttl_seconds + 1
+    assert cache.lookup("prompt", LLM) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_least_recently_used_entries_evicted(cache, clock):
+    size = len(llm_cache_module.dumps(generations("answer a")).encode())
+    cache.max_bytes = size * 2
+    cache.update("a", LLM, generations("answer a"))
+    clock.now += 1
+    cache.update("b", LLM, generations("answer b"))
+    clock.now += 1
+    cache.lookup("a", LLM)  # a is now more recently used than b
+    clock.now += 1
+    cache.update("c", LLM, generations("answer c"))
+    assert cache.lookup("b", LLM) is None
+    assert cache.lookup("a", LLM) is not None and cache.lookup("c", LLM) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_oversized_entry_not_stored(cache):
+    cache.max_bytes = 10
+    cache.update("prompt", LLM, generations("an answer longer than ten bytes"))
+    assert cache.lookup("prompt", LLM) is None
+
+
+def test_bypass_scope_skips_lookups_but_stores(cache):
+    cache.update("prompt", LLM, generations("cached answer"))
+    with llm_cache_scope("research_discovery", bypass=True):
+        assert get_current_node() == "research_discovery"
+        assert cache.lookup("prompt", LLM) is None
+        cache.update("prompt", LLM, generations("fresh answer"))
+    assert get_current_node() == "unknown"
+    with llm_cache_scope("research_discovery"):
+        assert cache.lookup("prompt", LLM)[0].message.content == "fresh answer"
+    stats = cache.stats()["nodes"]["research_discovery"]
+    assert (stats["bypassed"], stats["hits"], stats["writes"]) == (1, 1, 1)
+
+
+def test_cache_survives_reopen(cache):
+    cache.update("prompt", LLM, generations("kept"))
+    cache.close()
+    assert cache.lookup("prompt", LLM)[0].message.content == "kept"
@@ -0,0 +1,84 @@
+"""Tests for node output validation and escalation to the next model tier."""
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from agents import langgraph_nodes
+from agents.langgraph_nodes import BOOKING_TOOLS, escalation_input, valid_booking_output
+
+
+FLIGHTS = """## Flight Recommendations
+1. IndiGo 6E-2041, departs 06:10, arrives 08:35, nonstop, ₹5,430
+2. Air India AI-805, departs 9:00 AM, arrives 11:20 AM, nonstop, ₹6,120
+These are the best fares for the requested date; book early for the lower price.
+"""
+HOTELS = """## Hotel Recommendations
+1. Taj Fort Aguada Resort - $210 per night, rated 9.1, pool and spa
+2. Novotel Goa Candolim - $95 per night, rated 8.4, near the beach
+Both are close to the airport transfer routes mentioned above and suit the budget.
+"""
+
+
+def test_booking_output_with_priced_options_is_valid():
+    assert valid_booking_output(FLIGHTS + HOTELS)
+    assert valid_booking_output(FLIGHTS + "\nNo hotels were found for these dates, please retry later." * 2)
+    assert valid_booking_output(HOTELS + "\nFlights were not searched as no starting location was given.")
+
+
+def test_booking_output_without_structure_is_invalid():
+    vague = (
+        "I looked for a flight and a hotel for your trip to Goa. There are many good options for a flight "
+        "and plenty of hotels in every price range, so you should compare them before booking anything. "
+    )
+    assert not valid_booking_output(vague)
+    assert not valid_booking_output(vague + "The hotel we like costs $120 per night.")  # One price only
+    assert not valid_booking_output("Error: Kayak blocked the request. " + FLIGHTS)
+    assert not valid_booking_output("Flights: $420 and $510.")  # Too short
+
+
+def conversation() -> list:
+    return [
+        SystemMessage(content="You are a booking agent."),
+        HumanMessage(content="Find flights and hotels"),
+        AIMessage(content="", tool_calls=[
+            {"id": "1", "name": "get_google_flights", "args": {}},
+            {"id": "2", "name": "search_kayak_hotels", "args": {}},
+        ]),
+        ToolMessage(content="flights...", tool_call_id="1", name="get_google_flights"),
+        ToolMessage(content="hotels...", tool_call_id="2", name="search_kayak_hotels"),
+        AIMessage(content="Some flights and hotels exist."),
+    ]
+
+
+def test_escalation_input_keeps_tool_results():
+    messages = conversation()
+    escalated = escalation_input({"messages": messages[:2]}, {"messages": messages}, BOOKING_TOOLS)
+    assert escalated["messages"] == messages[:5]
+
+
+def test_escalation_input_without_tool_results():
+    original = {"messages": conversation()[:2]}
+    result = {"messages": original["messages"] + [AIMessage(content="No idea.")]}
+    assert escalation_input(original, result, BOOKING_TOOLS) is original
+    assert escalation_input(original, "plain text", BOOKING_TOOLS) is original
+
+
+def test_rerun_on_next_tier_does_not_repeat_tool_calls(monkeypatch):
+    attempts = []
+
+    def invoke(agent, input_data):
+        attempts.append((agent, input_data["messages"]))
+        if agent == "claude_3_haiku":
+            return {"messages": conversation()}
+        return {"messages": input_data["messages"] + [AIMessage(content=FLIGHTS + HOTELS)]}
+
+    monkeypatch.setattr(langgraph_nodes.model_router, "choose", lambda node, tokens, max_tokens: "claude_3_haiku")
+    monkeypatch.setattr(langgraph_nodes.model_router, "escalate", lambda name: "claude_3_5_sonnet")
+    monkeypatch.setattr(langgraph_nodes.model_router, "record_escalation", lambda node, from_model, to_model: None)
+    monkeypatch.setattr(langgraph_nodes, "get_agent", lambda name, tools, model_name, **kwargs: model_name)
+    monkeypatch.setattr(langgraph_nodes, "invoke_agent_with_retry", invoke)
+
+    output = langgraph_nodes._run_routed(
+        "booking_logistics", "booking_logistics", BOOKING_TOOLS, {"messages": conversation()[:2]}
+    )
+    assert output == FLIGHTS + HOTELS
+    assert [agent for agent, _ in attempts] == ["claude_3_haiku", "claude_3_5_sonnet"]
+    assert attempts[1][1] == conversation()[:5]  # Continues from the tool results
@@ -0,0 +1,79 @@
+"""Tests for Bedrock prompt caching and its model allowlist."""
+
+import pytest
+from langchain.agents.middleware import ModelRequest
+from langchain_aws import ChatBedrock
+from langchain_core.messages import HumanMessage, SystemMessage
+from config import model_routing, prompt_cache
+from config.bedrock import BEDROCK_MODELS
+from config.model_routing import ModelRoutingMiddleware
+from config.prompt_cache import PromptCachingMiddleware, cached_text, supports_prompt_caching
+
+
+def model(name: str) -> ChatBedrock:
+    return ChatBedrock(model_id=BEDROCK_MODELS[name], region_name="us-east-1", max_tokens=4096)
+
+
+def request_for(chat_model) -> ModelRequest:
+    return ModelRequest(
+        model=chat_model,
+        messages=[SystemMessage(content=cached_text("You are a travel agent.")), HumanMessage(content="Plan Paris")],
+        model_settings={},
+    )
+
+
+def has_cache_control(request: ModelRequest) -> bool:
+    return "cache_control" in request.model_settings or any(
+        isinstance(block, dict) and "cache_control" in block
+        for message in request.messages if isinstance(message.content, list)
+        for block in message.content
+    )
+
+
+def call(middleware, request: ModelRequest) -> ModelRequest:
+    sent = []
+    middleware.wrap_model_call(request, sent.append)
+    return sent[0]
+
+
+def test_allowlist():
+    assert supports_prompt_caching(BEDROCK_MODELS["claude_sonnet_4"])
+    assert not supports_prompt_caching(BEDROCK_MODELS["claude_3_haiku"])
+    assert not supports_prompt_caching("anthropic.some-future-model")
+
+
+def test_allowed_model_keeps_cache_points():
+    sent = call(PromptCachingMiddleware(), request_for(model("claude_sonnet_4")))
+    assert sent.model_settings["cache_control"]["type"] == "ephemeral"
+    assert "cache_control" in sent.messages[0].content[0]
+
+
+def test_haiku_request_has_no_cache_control():
+    request = request_for(model("claude_3_haiku"))
+    sent = call(PromptCachingMiddleware(), request)
+    assert not has_cache_control(sent)
+    assert sent.messages[0].content == [{"type": "text", "text": "You are a travel agent."}]
+    assert "cache_control" in request.messages[0].content[0]  # The agent's own messages are untouched
+
+
+def test_turn_routed_to_haiku_has_no_cache_control(monkeypatch):
+    """The check is made on the routed model, not on the agent's own model."""
+    monkeypatch.setattr(model_routing, "MODEL_ROUTING_PER_TURN", True)
+    monkeypatch.setattr(model_routing, "MODEL_TIERS", ["claude_3_haiku", "claude_sonnet_4"])
+    monkeypatch.setattr(model_routing.model_router, "choose", lambda node, tokens, max_tokens: "claude_3_haiku")
+    monkeypatch.setattr(model_routing, "get_pooled_model", lambda name, temperature, max_tokens: model(name))
+    monkeypatch.setattr(prompt_cache, "PROMPT_CACHE_MODELS", ["claude_sonnet_4", "claude_3_5_sonnet"])
+
+    caching = PromptCachingMiddleware()
+    sent = []
+    ModelRoutingMiddleware().wrap_model_call(
+        request_for(model("claude_sonnet_4")), lambda routed: caching.wrap_model_call(routed, sent.append)
+    )
+    assert sent[0].model.model_id == BEDROCK_MODELS["claude_3_haiku"]
+    assert not has_cache_control(sent[0])
+
+
+@pytest.mark.parametrize("enabled,count", [(True, 1), (False, 0)])
+def test_middleware_disabled(monkeypatch, enabled, count):
+    monkeypatch.setattr(prompt_cache, "PROMPT_CACHE_ENABLED", enabled)
+    assert len(prompt_cache.prompt_caching_middleware()) == count
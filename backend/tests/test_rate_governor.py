@@ -0,0 +1,119 @@
+"""Tests for the Bedrock rate governor."""
+
+import pytest
+from config import rate_governor
+from config.bedrock import BEDROCK_MODELS
+from config.rate_governor import ModelRateLimiter, RateGovernor, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_governor.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_governor.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_token_bucket_refill_and_debt(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4.0)
+    assert bucket.wait_time(4) == 0
+    bucket.take(6)  # Large calls may overdraw the bucket
+    assert bucket.level == -2
+    assert bucket.wait_time(1) == pytest.approx(1.5)
+    assert bucket.wait_time(100) == pytest.approx(3.0)  # Capped at a full bucket
+    clock.now += 10
+    bucket.refill(clock.now)
+    assert bucket.level == 4  # Never above capacity
+
+
+def test_acquire_waits_for_quota(clock):
+    limiter = ModelRateLimiter("model", rpm=60, tpm=6000)
+    assert limiter.acquire(100) == 0
+    assert limiter.acquire(100) == pytest.approx(1.0)  # One request per second
+    assert limiter.stats()["waited_calls"] == 1
+
+
+def test_throttle_halves_rate_once_per_burst(clock):
+    limiter = ModelRateLimiter("model", rpm=60, tpm=6000)
+    limiter.on_throttle()
+    limiter.on_throttle()  # Same burst: counted, but not a second decrease
+    assert limiter.factor == pytest.approx(rate_governor.RATE_GOVERNOR_DECREASE)
+    assert limiter.stats()["throttles"] == 2
+    clock.now += 2
+    limiter.on_throttle()
+    assert limiter.factor == pytest.approx(rate_governor.RATE_GOVERNOR_DECREASE ** 2)
+    assert limiter._requests.rate == pytest.approx(limiter.factor)
+
+
+def test_throttle_never_below_min_factor(clock):
+    limiter = ModelRateLimiter("model", rpm=60, tpm=6000)
+    for _ in range(20):
+        clock.now += 2
+        limiter.on_throttle()
+    assert limiter.factor == rate_governor.RATE_GOVERNOR_MIN_FACTOR
+
+
+def test_success_recovers_up_to_configured_quota(clock):
+    limiter = ModelRateLimiter("model", rpm=60, tpm=6000)
+    limiter.on_throttle()
+    limiter.on_success()
+    assert limiter.factor == pytest.approx(rate_governor.RATE_GOVERNOR_DECREASE + rate_governor.RATE_GOVERNOR_INCREASE)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.factor == 1.0
+
+
+def test_unconfigured_limiter_grows_past_start_rate(clock, monkeypatch):
+    monkeypatch.setattr(rate_governor, "RATE_GOVERNOR_MAX_GROWTH", 2.0)
+    limiter = ModelRateLimiter("model", rpm=60, tpm=6000, capped=False)
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.factor == pytest.approx(1.0 + 10 * rate_governor.RATE_GOVERNOR_INCREASE)
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.factor == 2.0
+    assert limiter._requests.rate == pytest.approx(2.0)
+
+
+def test_models_adapt_without_configured_quota(monkeypatch):
+    monkeypatch.setattr(rate_governor, "load_rate_limits", dict)
+    governor = RateGovernor()
+    limiter = governor.get_limiter(BEDROCK_MODELS["claude_3_haiku"])
+    assert limiter is not None and not limiter.capped
+    assert limiter.rpm == rate_governor.RATE_GOVERNOR_START_RPM
+    assert governor.get_limiter("some.other-model") is None
+    governor.configure(BEDROCK_MODELS["claude_3_haiku"], 1000, 2000000)
+    assert governor.get_limiter(BEDROCK_MODELS["claude_3_haiku"]).capped
+
+
+class FakeHTTPResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+def test_throttled_call_backs_off_and_retries(clock, monkeypatch):
+    monkeypatch.setattr(rate_governor, "load_rate_limits", dict)
+    governor = RateGovernor()
+    model_id = BEDROCK_MODELS["claude_3_haiku"]
+    context = {}
+    governor._before_call({"modelId": model_id, "body": b'{"max_tokens": 100}'}, context)
+    throttled = (FakeHTTPResponse(400), {"Error": {"Code": "ThrottlingException"}})
+    request = {"context": context}
+
+    assert governor._needs_retry(throttled, 1, request) == 0
+    assert governor.get_limiter(model_id).factor == pytest.approx(rate_governor.RATE_GOVERNOR_DECREASE)
+    assert governor._needs_retry(throttled, rate_governor.RATE_GOVERNOR_MAX_ATTEMPTS, request) is False
+    other_error = (FakeHTTPResponse(400), {"Error": {"Code": "ValidationException"}})
+    assert governor._needs_retry(other_error, 1, request) is None
@@ -0,0 +1,122 @@
+"""Tests for single-flight coalescing of identical in-flight calls."""
+
+import asyncio
+import threading
+import time
+import pytest
+from agents import langgraph_nodes
+from tools.singleflight import SingleFlight, normalize_arg, single_flight
+
+
+def test_normalize_arg():
+    assert normalize_arg("  Paris ") == normalize_arg("paris") == "paris"
+    assert normalize_arg(" https://example.com/Page?Q=1 ") == "https://example.com/Page?Q=1"
+    assert normalize_arg(3) == 3
+
+
+def test_concurrent_blocking_calls_run_once():
+    group = SingleFlight("test")
+    runs = []
+
+    def call():
+        runs.append(1)
+        time.sleep(0.2)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("key", call))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 5 and len(runs) == 1
+    assert group.stats() == {"calls": 5, "executed": 1, "coalesced": 4, "in_flight": 0}
+    # Nothing is cached once the call finished
+    group.do("key", call)
+    assert len(runs) == 2
+
+
+def test_waiters_share_the_leaders_exception():
+    group = SingleFlight("test")
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    def follower():
+        started.wait()
+        try:
+            group.do("key", lambda: "not run")
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(ValueError):
+        group.do("key", fail)
+    thread.join()
+    assert len(errors) == 1 and group.stats()["executed"] == 1
+
+
+def test_decorator_keys_on_normalized_arguments():
+    runs = []
+
+    @single_flight("test_decorator")
+    def search(query):
+        runs.append(query)
+        time.sleep(0.2)
+        return query.strip()
+
+    threads = [threading.Thread(target=search, args=(query,)) for query in ("Paris", " paris ", "Rome")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(runs) == 2
+
+
+def test_cancelled_async_caller_does_not_cancel_the_shared_call():
+    group = SingleFlight("test")
+    runs = []
+
+    async def call():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def scenario():
+        first = asyncio.ensure_future(group.ado("key", call))
+        second = asyncio.ensure_future(group.ado("key", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "result"
+    assert len(runs) == 1
+
+
+def test_concurrent_research_runs_once_with_isolated_results(monkeypatch):
+    runs = []
+
+    async def research(state, deadline):
+        runs.append(state["trip_plan_id"])
+        await asyncio.sleep(0.05)
+        return {"research_results": "Paris research", "errors": []}
+
+    monkeypatch.setattr(langgraph_nodes, "_arun_research", research)
+    states = [
+        {"trip_plan_id": trip_plan_id, "destination": destination, "travel_request_md": "- **Travel Style:** luxury"}
+        for trip_plan_id, destination in (("a", "Paris"), ("b", " paris"))
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(langgraph_nodes.aresearch_discovery_node(state) for state in states))
+
+    first, second = asyncio.run(scenario())
+    assert len(runs) == 1
+    assert first == second and first is not second
+    first["errors"].append("changed by one workflow")
+    assert second["errors"] == []
@@ -0,0 +1,58 @@
+"""Tests for the incremental JSON parsing of streamed plans."""
+
+import json
+import random
+from agents.structured_output import IncrementalJSONParser
+
+
+PLAN = {
+    "summary": "Five days in Paris, with a brace } and a bracket ] in a \"quoted\" string",
+    "day_by_day_plan": [
+        {"day": 1, "morning": "Louvre", "notes": "Tickets: {timed} [online]"},
+        {"day": 2, "morning": "Orsay", "tags": ["art", "museums"]},
+        {"day": 3, "morning": "Montmartre \\ Sacre-Coeur"},
+    ],
+    "tips": ["Buy a Navigo pass", "Book the Eiffel Tower early"],
+    "budget": {"total": 2500, "items": [1, 2]},
+}
+EXPECTED = [("day_by_day_plan", day) for day in PLAN["day_by_day_plan"]] + [("tips", tip) for tip in PLAN["tips"]]
+
+
+def feed_all(text: str, cuts) -> list:
+    parser = IncrementalJSONParser()
+    elements = []
+    start = 0
+    for cut in list(cuts) + [len(text)]:
+        elements.extend(parser.feed(text[start:cut]))
+        start = cut
+    return elements
+
+
+def test_whole_document():
+    assert feed_all(json.dumps(PLAN), []) == EXPECTED
+
+
+def test_one_character_at_a_time():
+    text = json.dumps(PLAN)
+    assert feed_all(text, range(1, len(text))) == EXPECTED
+
+
+def test_random_chunk_boundaries():
+    text = json.dumps(PLAN, indent=2)
+    rng = random.Random(7)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 40)))
+        assert feed_all(text, cuts) == EXPECTED
+
+
+def test_element_reported_as_soon_as_complete():
+    text = json.dumps(PLAN)
+    close = text.index('}, {"day": 2')  # The brace closing day 1
+    parser = IncrementalJSONParser()
+    assert parser.feed(text[:close]) == []
+    assert parser.feed(text[close:close + 1]) == [EXPECTED[0]]
+
+
+def test_nested_arrays_and_scalars_not_reported():
+    elements = feed_all(json.dumps({"total": 3, "budget": {"items": [1, 2]}, "days": [[1, 2]]}), [])
+    assert elements == [("days", [1, 2])]
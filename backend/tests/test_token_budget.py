@@ -0,0 +1,126 @@
+"""Tests for the planning node's token budget and context compaction."""
+
+import asyncio
+import pytest
+from config import token_budget
+from config.token_budget import ContextBudget, count_tokens, planning_max_tokens, truncate_to_tokens
+
+
+class FakeSummaryModel:
+    def __init__(self, summary: str = None, error: Exception = None):
+        self.summary = summary
+        self.error = error
+        self.calls = 0
+
+    def _reply(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return type("Message", (), {"content": self.summary})()
+
+    def invoke(self, prompt, config=None):
+        return self._reply()
+
+    async def ainvoke(self, prompt, config=None):
+        return self._reply()
+
+
+def install(monkeypatch, model: FakeSummaryModel):
+    monkeypatch.setattr(token_budget, "CONTEXT_SUMMARY_ENABLED", True)
+    monkeypatch.setattr(token_budget, "get_pooled_model", lambda name, temperature, max_tokens: model)
+
+
+def text_of(tokens: int, word: str = "museum") -> str:
+    """Distinct lines of about tokens tokens in total."""
+    lines = []
+    while count_tokens("\n".join(lines)) < tokens:
+        lines.append(f"{word} number {len(lines)} is open from 9:00 to 17:00 daily")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("duration,tokens", [
+    (None, 4096),
+    (0, 4096),
+    (-2, 4096),
+    (1, 2048),  # 1500 + 500, up to the minimum
+    (3, 3072),  # 3000, rounded up to a multiple of 1024
+    (5, 4096),  # 4000
+    (7, 5120),  # 5000
+    (30, 8192),  # Capped at PLANNING_MAX_TOKENS
+])
+def test_planning_max_tokens(duration, tokens):
+    assert planning_max_tokens(duration) == tokens
+
+
+def test_allocate_redistributes_unused_share():
+    budget = ContextBudget(total_tokens=1000, shares={"research": 0.5, "booking": 0.5})
+    sections = {"research": text_of(2000), "booking": text_of(100)}
+    budgets = budget.allocate(sections)
+    assert budgets["booking"] == count_tokens(sections["booking"])
+    assert budgets["research"] == 1000 - budgets["booking"]
+
+
+def test_allocate_charges_protected_sections_first():
+    budget = ContextBudget(total_tokens=1000, shares={"research": 0.5, "booking": 0.5, "request": 0.0})
+    sections = {"research": text_of(2000), "booking": text_of(2000), "request": text_of(400)}
+    budgets = budget.allocate(sections, protected=("request",))
+    assert budgets["request"] == count_tokens(sections["request"])
+    assert budgets["research"] == budgets["booking"] == (1000 - budgets["request"]) // 2
+
+
+def test_sections_within_budget_are_unchanged(monkeypatch):
+    model = FakeSummaryModel("summary")
+    install(monkeypatch, model)
+    sections = {"research": text_of(100), "booking": text_of(100)}
+    assert ContextBudget(total_tokens=1000).compact(sections) == sections
+    assert model.calls == 0
+
+
+def test_duplicate_lines_dropped_before_summarizing(monkeypatch):
+    model = FakeSummaryModel("summary")
+    install(monkeypatch, model)
+    research = text_of(200)
+    budget = ContextBudget(total_tokens=300, shares={"research": 1.0})
+    compacted = budget.compact({"research": research + "\n" + research})
+    assert compacted["research"] == research
+    assert model.calls == 0
+
+
+def test_summary_replaces_an_over_budget_section(monkeypatch):
+    install(monkeypatch, FakeSummaryModel("Louvre, Orsay and Musee Rodin; book ahead."))
+    budget = ContextBudget(total_tokens=300, shares={"research": 1.0})
+    compacted = budget.compact({"research": text_of(2000)})
+    assert compacted["research"] == "Louvre, Orsay and Musee Rodin; book ahead."
+    assert budget.stats()["summaries"] == 1 and budget.stats()["truncations"] == 0
+
+
+def test_failed_summary_truncates(monkeypatch):
+    install(monkeypatch, FakeSummaryModel(error=RuntimeError("throttled")))
+    budget = ContextBudget(total_tokens=300, shares={"research": 1.0})
+    research = text_of(2000)
+    compacted = budget.compact({"research": research})
+    assert compacted["research"] == truncate_to_tokens(research, 300)
+    assert compacted["research"].endswith("[... condensed to fit the context budget]")
+    assert research.startswith(compacted["research"].split("\n[...")[0])
+    assert budget.stats()["summary_failures"] == 1 and budget.stats()["truncations"] == 1
+
+
+def test_summary_still_over_budget_is_truncated(monkeypatch):
+    install(monkeypatch, FakeSummaryModel(text_of(1000)))
+    budget = ContextBudget(total_tokens=300, shares={"research": 1.0})
+    compacted = budget.compact({"research": text_of(2000, word="gallery")})
+    assert compacted["research"].startswith("museum number 0")
+    assert count_tokens(compacted["research"]) <= 320
+
+
+def test_async_summary_timeout_truncates(monkeypatch):
+    class SlowModel(FakeSummaryModel):
+        async def ainvoke(self, prompt, config=None):
+            await asyncio.sleep(1)
+
+    install(monkeypatch, SlowModel("never used"))
+    budget = ContextBudget(total_tokens=300, shares={"research": 1.0})
+    research = text_of(2000)
+    compacted = asyncio.run(budget.acompact({"research": research}, timeout=0.05))
+    assert compacted["research"] == truncate_to_tokens(research, 300)
+    assert budget.stats()["summary_failures"] == 1
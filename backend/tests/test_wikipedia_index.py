@@ -0,0 +1,70 @@
+"""Tests for the local Wikipedia summary index and its use by the Wikipedia tools."""
+
+import pytest
+from tools import wikipedia_search
+from tools.wikipedia_index import WikipediaIndex
+
+
+PARIS = ("Paris", "Paris is the capital of France. It is on the Seine.", "https://en.wikipedia.org/wiki/Paris")
+TOURISM = (
+    "Tourism in Paris", "Paris received 44 million tourists in 2019. The Louvre is the most visited museum.",
+    "https://en.wikipedia.org/wiki/Tourism_in_Paris",
+)
+EIFFEL = ("Eiffel Tower", "The Eiffel Tower is a wrought-iron tower in Paris.", "https://en.wikipedia.org/wiki/Eiffel_Tower")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = WikipediaIndex(str(tmp_path / "wikipedia_index.sqlite"))
+    index.enabled = True
+    yield index
+    index.close()
+
+
+def test_title_alias_and_fts_lookups(index):
+    index.put_many([PARIS, EIFFEL])
+    index.put(*TOURISM, source="live", queries=["Paris travel tourism"])
+    assert index.lookup("  paris ") == PARIS
+    assert index.lookup("Paris travel tourism") == TOURISM
+    assert index.lookup("eiffel tower travel guide") == EIFFEL  # FTS over the dump pages
+    assert index.lookup("Kyoto") is None
+    assert (index.hits, index.misses) == (3, 1)
+
+
+def test_live_page_not_found_by_loose_match(index):
+    index.put(*TOURISM, source="live", queries=["Paris travel tourism"])
+    assert index.lookup("Tourism in Paris") == TOURISM
+    assert index.lookup("Paris") is None
+
+
+def test_index_survives_reopen(tmp_path):
+    path = str(tmp_path / "wikipedia_index.sqlite")
+    first = WikipediaIndex(path)
+    first.enabled = True
+    first.put(*PARIS, source="live", queries=["paris france"])
+    first.close()
+    second = WikipediaIndex(path)
+    second.enabled = True
+    assert second.lookup("Paris, France") == PARIS
+    second.close()
+
+
+def test_destination_info_does_not_answer_later_searches(index, monkeypatch):
+    """wikipedia_destination_info's page for "<dest> travel tourism" is not stored under the bare destination."""
+    pages = {"Paris travel tourism": TOURISM, "Paris": PARIS}
+    searches = []
+
+    def search(query, results=1):
+        searches.append(query)
+        return [pages[query][0]]
+
+    monkeypatch.setattr(wikipedia_search, "wikipedia_index", index)
+    monkeypatch.setattr(wikipedia_search, "_wikipedia_search", search)
+    monkeypatch.setattr(wikipedia_search, "_wikipedia_article", lambda title: {p[0]: p for p in pages.values()}[title])
+
+    assert "Title: Tourism in Paris" in wikipedia_search.wikipedia_destination_info.invoke({"destination": "Paris"})
+    assert "Title: Paris\n" in wikipedia_search.wikipedia_search.invoke({"query": "Paris"})
+    # Both answers now come from the index
+    assert "Title: Tourism in Paris" in wikipedia_search.wikipedia_destination_info.invoke({"destination": "Paris"})
+    assert "Title: Paris\n" in wikipedia_search.wikipedia_search.invoke({"query": "paris"})
+    assert searches == ["Paris travel tourism", "Paris"]
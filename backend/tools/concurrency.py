@@ -0,0 +1,228 @@
+"""Per-node concurrency caps and per-tool timeouts for the agents' tool calls."""
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from loguru import logger
+from tools.executor import get_tool_executor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Tool calls of one node run that may execute at once (the rest wait for a slot).
+# Override per node with e.g. NODE_TOOL_CONCURRENCY="booking_logistics=2,research_discovery=6"
+DEFAULT_NODE_TOOL_CONCURRENCY = int(os.getenv("DEFAULT_NODE_TOOL_CONCURRENCY", "4"))
+NODE_TOOL_CONCURRENCY = {
+    "research_discovery": 4,
+    "booking_logistics": 3,
+    "planning_optimization": 3,
+}
+
+# Seconds a tool call may run before the agent gets a timeout error instead.
+# Override per tool with e.g. TOOL_TIMEOUTS="get_google_flights=45,scrape_website=20"
+DEFAULT_TOOL_TIMEOUT_SECONDS = float(os.getenv("DEFAULT_TOOL_TIMEOUT_SECONDS", "30"))
+TOOL_TIMEOUTS = {
+    "get_google_flights": 40.0,
+    "get_flexible_flights": 90.0,
+    "search_kayak_hotels": 45.0,
+    "scrape_website": 40.0,
+    "scrape_kayak_hotel": 45.0,
+    "duckduckgo_search": 20.0,
+    "duckduckgo_destination_search": 20.0,
+    "duckduckgo_batch_search": 30.0,
+    "wikipedia_search": 20.0,
+    "wikipedia_destination_info": 20.0,
+}
+
+
+def _load_overrides(defaults: Dict[str, float], env_name: str) -> Dict[str, float]:
+    values = dict(defaults)
+    for entry in os.getenv(env_name, "").split(","):
+        if "=" not in entry:
+            continue
+        name, value = entry.split("=", 1)
+        values[name.strip()] = float(value)
+    return values
+
+
+_node_limits = {node: int(limit) for node, limit in _load_overrides(NODE_TOOL_CONCURRENCY, "NODE_TOOL_CONCURRENCY").items()}
+_tool_timeouts = _load_overrides(TOOL_TIMEOUTS, "TOOL_TIMEOUTS")
+
+
+def tool_timeout(name: str) -> float:
+    """Get the timeout in seconds for a tool."""
+    return _tool_timeouts.get(name, DEFAULT_TOOL_TIMEOUT_SECONDS)
+
+
+class ToolSlots:
+    """
+    Concurrency slots for the tool calls of one node run.
+
+    Sync agents take a thread semaphore and async agents an asyncio one;
+    the asyncio semaphore is created on first use, inside the running loop.
+    """
+
+    def __init__(self, node: str, limit: int):
+        self.node = node
+        self.limit = max(1, limit)
+        self._threads = threading.BoundedSemaphore(self.limit)
+        self._tasks: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def tasks(self) -> asyncio.Semaphore:
+        if self._tasks is None:
+            self._tasks = asyncio.Semaphore(self.limit)
+        return self._tasks
+
+    def threads(self) -> threading.BoundedSemaphore:
+        return self._threads
+
+    def enter(self) -> int:
+        with self._lock:
+            self._in_flight += 1
+            return self._in_flight
+
+    def leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+# Slots of the node run the current tool call belongs to
+_tool_slots: ContextVar[Optional[ToolSlots]] = ContextVar("tool_slots", default=None)
+
+
+@contextmanager
+def tool_concurrency_scope(node: str):
+    """
+    Cap the concurrent tool calls of agent runs inside the block.
+
+    Each scope gets its own slots, so concurrent requests running the same
+    node do not share a cap; the tool executor bounds the process as a whole.
+
+    Args:
+        node: Workflow node name (selects the NODE_TOOL_CONCURRENCY entry)
+    """
+    limit = _node_limits.get(node, DEFAULT_NODE_TOOL_CONCURRENCY)
+    token = _tool_slots.set(ToolSlots(node, limit))
+    try:
+        yield
+    finally:
+        _tool_slots.reset(token)
+
+
+class ToolCallStats:
+    """Tool call counters per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, node: str, tool: str, in_flight: int, waited: float, timed_out: bool):
+        with self._lock:
+            stats = self._nodes.setdefault(
+                node, {"calls": 0, "timeouts": {}, "peak_in_flight": 0, "waited_calls": 0, "wait_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], in_flight)
+            if waited > 0.001:
+                stats["waited_calls"] += 1
+                stats["wait_seconds"] += waited
+            if timed_out:
+                stats["timeouts"][tool] = stats["timeouts"].get(tool, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            nodes = {
+                node: {**stats, "timeouts": dict(stats["timeouts"]), "wait_seconds": round(stats["wait_seconds"], 3)}
+                for node, stats in self._nodes.items()
+            }
+        return {"node_limits": dict(_node_limits), "nodes": nodes}
+
+
+tool_call_stats = ToolCallStats()
+
+
+def _timeout_message(request, timeout: float) -> ToolMessage:
+    name = request.tool_call["name"]
+    logger.warning(f"Tool {name} timed out after {timeout:g} seconds")
+    return ToolMessage(
+        content=f"Error: {name} timed out after {timeout:g} seconds. Try again with other arguments or continue without it.",
+        tool_call_id=request.tool_call["id"],
+        name=name,
+        status="error",
+    )
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """
+    Agent middleware that bounds and times out the agent's tool calls.
+
+    The agent already runs the tool calls of one model turn in parallel and
+    adds their results to the conversation in the order the model made the
+    calls. This middleware caps how many of them run at once within a
+    tool_concurrency_scope, and returns a timeout error to the model for a
+    call that runs longer than its TOOL_TIMEOUTS entry, so a turn takes as
+    long as its slowest tool up to that timeout. A timed-out call keeps its
+    executor thread until it returns, but frees its slot.
+    """
+
+    def wrap_tool_call(self, request, handler: Callable[[Any], Any]) -> Any:
+        slots = _tool_slots.get()
+        timeout = tool_timeout(request.tool_call["name"])
+        time_start = time.monotonic()
+        if slots is not None:
+            slots.threads().acquire()
+        waited = time.monotonic() - time_start
+        in_flight = slots.enter() if slots is not None else 1
+        timed_out = False
+        try:
+            # Run on the tool executor so the wait, not the tool, can time out
+            context = contextvars.copy_context()
+            future = get_tool_executor().submit(context.run, handler, request)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeoutError:
+                timed_out = True
+                return _timeout_message(request, timeout)
+        finally:
+            if slots is not None:
+                slots.leave()
+                slots.threads().release()
+            self._record(slots, request, in_flight, waited, timed_out)
+
+    async def awrap_tool_call(self, request, handler: Callable[[Any], Awaitable[Any]]) -> Any:
+        slots = _tool_slots.get()
+        timeout = tool_timeout(request.tool_call["name"])
+        time_start = time.monotonic()
+        if slots is not None:
+            await slots.tasks().acquire()
+        waited = time.monotonic() - time_start
+        in_flight = slots.enter() if slots is not None else 1
+        timed_out = False
+        try:
+            return await asyncio.wait_for(handler(request), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            return _timeout_message(request, timeout)
+        finally:
+            if slots is not None:
+                slots.leave()
+                slots.tasks().release()
+            self._record(slots, request, in_flight, waited, timed_out)
+
+    @staticmethod
+    def _record(slots: Optional[ToolSlots], request, in_flight: int, waited: float, timed_out: bool):
+        node = slots.node if slots is not None else "unscoped"
+        tool_call_stats.record(node, request.tool_call["name"], in_flight, waited, timed_out)
+
+
+def get_tool_concurrency_stats() -> dict:
+    """Get tool call counters, timeouts and peak concurrency per node."""
+    return tool_call_stats.stats()
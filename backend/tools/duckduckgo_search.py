@@ -1,12 +1,176 @@
 """DuckDuckGo search tool (free, no API key required)."""
 
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from langchain.tools import tool
 try:
     from ddgs import DDGS  # New package name
 except ImportError:
     from duckduckgo_search import DDGS  # Fallback to old name
 from loguru import logger
-from typing import Optional
+from typing import List, Optional
+from tools.singleflight import single_flight
+from tools.hedging import hedged
+from tools.source_policy import source_policies
+
+
+# Long-lived DDGS sessions; each keeps its engines' HTTP connections open
+DDGS_POOL_SIZE = int(os.getenv("DDGS_POOL_SIZE", "4"))
+# Searches a session serves before it is replaced (fresh client fingerprint)
+DDGS_SESSION_MAX_USES = int(os.getenv("DDGS_SESSION_MAX_USES", "200"))
+DDGS_BATCH_MAX_QUERIES = int(os.getenv("DDGS_BATCH_MAX_QUERIES", "8"))
+
+# Query parameters that only track the click and do not change the page:
+# exact names, plus every parameter starting with a tracking prefix
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref", "ref_src", "ref_url"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+
+class DDGSPool:
+    """
+    Thread-safe pool of DDGS sessions.
+
+    A session is used by one thread at a time: callers take one from the
+    pool (creating it if the pool has not reached DDGS_POOL_SIZE, else
+    waiting for one to come back) and return it after the search. Sessions
+    are replaced after DDGS_SESSION_MAX_USES searches. DDGS raises for
+    searches without results too, so a failed search keeps its session.
+    """
+
+    def __init__(self, size: int = DDGS_POOL_SIZE):
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()  # Most recently used first: its connections are warm
+        self._lock = threading.Lock()
+        self._open = 0
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.discarded = 0
+
+    def _checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                if self._open < self.size:
+                    self._open += 1
+                    self.created += 1
+                    return [DDGS(), 0]
+                self.waits += 1
+        return self._idle.get()
+
+    def _replace(self):
+        """Put a new session in place of a worn-out one (threads may be waiting for it)."""
+        with self._lock:
+            self.discarded += 1
+            self.created += 1
+        self._idle.put([DDGS(), 0])
+
+    @contextmanager
+    def session(self):
+        """Borrow a DDGS session for one search."""
+        entry = self._checkout()
+        try:
+            yield entry[0]
+        finally:
+            entry[1] += 1
+            if entry[1] >= DDGS_SESSION_MAX_USES:
+                self._replace()
+            else:
+                self._idle.put(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "discarded": self.discarded,
+            }
+
+
+ddgs_pool = DDGSPool()
+
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    """
+    Get the pool batch searches fan out on.
+
+    Separate from the tool executor: the batch tool itself runs there and
+    waits for its searches.
+    """
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(max_workers=DDGS_POOL_SIZE, thread_name_prefix="travel-ddgs")
+    return _batch_executor
+
+
+def _is_search_failure(error: Exception) -> bool:
+    """Whether a DDGS error says the source is failing ("no results" does not)."""
+    return "no results" not in str(error).lower()
+
+
+@single_flight("duckduckgo")
+@hedged("duckduckgo")
+def _ddgs_text(query: str, max_results: int) -> list:
+    """
+    Run a DDGS text search (concurrent identical queries share one request).
+
+    Searches go through the duckduckgo.com source policy: rate limited, and
+    failing fast with SourceUnavailable while its circuit breaker is open.
+    """
+    with source_policies.get("duckduckgo.com").guard(is_failure=_is_search_failure):
+        with ddgs_pool.session() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a result URL for deduplication: drop the scheme, "www.", the
+    trailing slash and tracking parameters, and lowercase the host (paths
+    and other parameters keep their case).
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ])
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def format_results(results: list, max_results: int) -> str:
+    """Format DDGS results as a numbered list."""
+    formatted_results = []
+    for i, result in enumerate(results[:max_results], 1):
+        formatted_results.append(
+            f"{i}. {result.get('title', 'No title')}\n"
+            f"   URL: {result.get('href', 'No URL')}\n"
+            f"   {result.get('body', 'No description')}\n"
+        )
+    return "\n".join(formatted_results)
+
+
+def _search(query: str, max_results: int) -> str:
+    results = _ddgs_text(query, max_results)
+    if not results:
+        return f"No results found for: {query}"
+    return format_results(results, max_results)
 
 
 @tool
@@ -23,22 +187,7 @@ def duckduckgo_search(query: str, max_results: int = 10) -> str:
     """
     try:
         logger.info(f"DuckDuckGo search: {query}")
-        
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
-        
-        if not results:
-            return f"No results found for: {query}"
-        
-        formatted_results = []
-        for i, result in enumerate(results[:max_results], 1):
-            formatted_results.append(
-                f"{i}. {result.get('title', 'No title')}\n"
-                f"   URL: {result.get('href', 'No URL')}\n"
-                f"   {result.get('body', 'No description')}\n"
-            )
-        
-        return "\n".join(formatted_results)
+        return _search(query, max_results)
         
     except Exception as e:
         logger.error(f"Error in DuckDuckGo search: {e}")
@@ -69,24 +218,58 @@ def duckduckgo_destination_search(destination: str, query_type: str = "attractio
     # Call the underlying function directly to avoid tool-to-tool calling issues
     try:
         logger.info(f"DuckDuckGo destination search: {destination} ({query_type})")
-        
-        with DDGS() as ddgs:
-            results = list(ddgs.text(search_query, max_results=10))
-        
-        if not results:
-            return f"No results found for: {search_query}"
-        
-        formatted_results = []
-        for i, result in enumerate(results[:10], 1):
-            formatted_results.append(
-                f"{i}. {result.get('title', 'No title')}\n"
-                f"   URL: {result.get('href', 'No URL')}\n"
-                f"   {result.get('body', 'No description')}\n"
-            )
-        
-        return "\n".join(formatted_results)
+        return _search(search_query, 10)
         
     except Exception as e:
         logger.error(f"Error in DuckDuckGo destination search: {e}")
         return f"Error searching: {str(e)}"
 
+
+@tool
+def duckduckgo_batch_search(queries: List[str], max_results_per_query: int = 5) -> str:
+    """
+    Run several DuckDuckGo searches at once and return the merged results.
+    
+    Use this instead of several separate searches, e.g. attractions,
+    restaurants and activities for a destination in one call.
+    
+    Args:
+        queries: Search query strings (up to 8)
+        max_results_per_query: Maximum results per query (default: 5)
+    
+    Returns:
+        Results grouped by query; a URL already listed under an earlier
+        query is not repeated
+    """
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))[:DDGS_BATCH_MAX_QUERIES]
+    if not queries:
+        return "No queries given"
+    logger.info(f"DuckDuckGo batch search: {len(queries)} queries")
+
+    futures = [_get_batch_executor().submit(_ddgs_text, query, max_results_per_query) for query in queries]
+    seen = set()
+    sections = []
+    for query, future in zip(queries, futures):
+        try:
+            results = future.result()
+        except Exception as e:
+            logger.error(f"Error in DuckDuckGo batch search for {query!r}: {e}")
+            sections.append(f"## {query}\nError searching: {str(e)}")
+            continue
+
+        unique = []
+        for result in results:
+            key = normalize_url(result.get("href", ""))
+            if key and key in seen:
+                continue
+            seen.add(key)
+            unique.append(result)
+        body = format_results(unique, max_results_per_query) if unique else "No new results"
+        sections.append(f"## {query}\n{body}")
+
+    return "\n\n".join(sections)
+
+
+def get_ddgs_pool_stats() -> dict:
+    """Get DDGS session pool counters."""
+    return ddgs_pool.stats()
@@ -0,0 +1,88 @@
+"""Bounded thread pool for running the blocking tools from async agents."""
+
+import os
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.tools import BaseTool, StructuredTool
+from loguru import logger
+from typing import Any, Callable, List, Optional
+
+
+# Maximum number of blocking tool calls (HTTP scrapes, DDGS, Wikipedia,
+# fast-flights) running at once across every workflow in the process
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv("TOOL_EXECUTOR_MAX_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Get the shared tool executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                logger.info(f"Creating tool executor with {TOOL_EXECUTOR_MAX_WORKERS} workers")
+                _executor = ThreadPoolExecutor(
+                    max_workers=TOOL_EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix="travel-tool",
+                )
+    return _executor
+
+
+async def run_in_tool_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on the bounded tool executor.
+
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_tool_executor(), call)
+
+
+def with_tool_executor(tool: BaseTool) -> BaseTool:
+    """
+    Give a sync LangChain tool an async implementation on the tool executor.
+
+    Without this, LangChain runs sync tools on the loop's default executor,
+    which is shared with everything else and not sized for tool traffic.
+    Tools that already have a coroutine are returned unchanged.
+
+    Args:
+        tool: Tool created with the @tool decorator
+
+    Returns:
+        StructuredTool with both sync and async implementations
+    """
+    if not isinstance(tool, StructuredTool) or tool.coroutine is not None:
+        return tool
+
+    func = tool.func
+
+    async def _arun(**kwargs):
+        return await run_in_tool_executor(func, **kwargs)
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=func,
+        coroutine=_arun,
+        return_direct=tool.return_direct,
+    )
+
+
+def with_tool_executor_all(tools: List[BaseTool]) -> List[BaseTool]:
+    """Apply with_tool_executor to a list of tools."""
+    return [with_tool_executor(tool) for tool in tools]
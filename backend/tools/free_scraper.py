@@ -1,17 +1,30 @@
-"""Free web scraping tool using BeautifulSoup and requests."""
+"""Free web scraping tool using streaming HTML extraction and the pooled HTTP client."""
 
 from langchain.tools import tool
-import requests
-from bs4 import BeautifulSoup
+import httpx
 from loguru import logger
 from typing import Optional
 import time
+from tools.singleflight import single_flight
+from tools.hedging import hedged
+from tools.http_client import http_client
+from tools.html_text import StreamingTextExtractor, SCRAPER_MAX_BYTES
+from tools.source_policy import SourceUnavailable
+from tools.kayak_parser import KayakResultParser, format_hotel_table
 
 
-@tool
-def scrape_website(url: str, timeout: int = 30) -> str:
+@single_flight("scraper", key=lambda url, timeout=30: url.strip())
+def scrape_url_text(url: str, timeout: int = 30) -> str:
     """
-    Scrape a website and return text content (free, using BeautifulSoup).
+    Fetch a URL and extract its visible text.
+    
+    Concurrent scrapes of the same URL share one request, made through the
+    pooled HTTP client, which revalidates pages fetched before with their
+    ETag/Last-Modified. The text is extracted while the body downloads, and
+    the download stops once SCRAPER_MAX_CHARS of text are collected or after
+    SCRAPER_MAX_BYTES. While the site's circuit breaker is open the scrape
+    fails at once. Errors are returned as strings for the agent rather than
+    raised.
     
     Args:
         url: URL to scrape
@@ -21,47 +34,110 @@ def scrape_website(url: str, timeout: int = 30) -> str:
         Extracted text content from the webpage
     """
     try:
-        logger.info(f"Scraping URL: {url}")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Limit to first 5000 characters to avoid token limits
-        if len(text) > 5000:
-            text = text[:5000] + "... [truncated]"
-        
-        logger.info(f"Successfully scraped {len(text)} characters from {url}")
-        return text
-        
-    except requests.exceptions.Timeout:
+        return _fetch_text(url, timeout)
+    except Exception as e:
+        return _scrape_error(url, timeout, e)
+
+
+@hedged("scraper")
+def _fetch_text(url: str, timeout: int) -> str:
+    """
+    Fetch a URL and extract its visible text, raising on errors.
+    
+    Hedged here rather than on scrape_url_text: a hedge attempt wins by
+    returning, so a fast error string must not count as a result.
+    """
+    logger.info(f"Scraping URL: {url}")
+    
+    extractor = StreamingTextExtractor()
+    response = http_client.fetch(url, timeout=timeout, max_bytes=SCRAPER_MAX_BYTES, sink=extractor.feed)
+    if response.revalidated:
+        logger.info(f"Not modified, using stored copy of {url}")
+    
+    text = extractor.text(truncated=response.truncated)
+    
+    logger.info(f"Successfully scraped {len(text)} characters from {url} ({extractor.bytes_read} bytes read)")
+    return text
+
+
+def _scrape_error(url: str, timeout: int, error: Exception) -> str:
+    """Log a scraping error and describe it for the agent."""
+    if isinstance(error, SourceUnavailable):
+        logger.warning(f"Skipping {url}: {error}")
+        return f"Error scraping {url}: {str(error)}"
+    
+    if isinstance(error, httpx.TimeoutException):
         logger.error(f"Timeout scraping {url}")
         return f"Timeout error: Could not scrape {url} within {timeout} seconds"
     
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error scraping {url}: {e}")
-        return f"Error scraping {url}: {str(e)}"
+    if isinstance(error, httpx.HTTPError):
+        logger.error(f"Request error scraping {url}: {error}")
+        return f"Error scraping {url}: {str(error)}"
+    
+    logger.error(f"Unexpected error scraping {url}: {error}")
+    return f"Unexpected error: {str(error)}"
+
+
+@single_flight("scraper")
+def scrape_kayak_results(url: str, max_results: int = 10, timeout: int = 45) -> str:
+    """
+    Fetch a Kayak hotel results page and return its top hotels as a table.
+    
+    The page is parsed into HotelResult records while it downloads (see
+    KayakResultParser), and the download stops once max_results hotels are
+    read. If the page has no recognizable results (e.g. a bot check or
+    changed markup), its visible text is returned instead, as scrape_url_text
+    would. Errors are returned as strings for the agent rather than raised.
+    
+    Args:
+        url: Kayak hotel search URL
+        max_results: Number of hotels to return (default: 10)
+        timeout: Request timeout in seconds (default: 45)
     
+    Returns:
+        Markdown table of hotels, or the page text
+    """
+    try:
+        return _fetch_kayak_results(url, max_results, timeout)
     except Exception as e:
-        logger.error(f"Unexpected error scraping {url}: {e}")
-        return f"Unexpected error: {str(e)}"
+        return _scrape_error(url, timeout, e)
+
+
+@hedged("scraper")
+def _fetch_kayak_results(url: str, max_results: int, timeout: int) -> str:
+    """Fetch and parse a Kayak results page, raising on errors (see _fetch_text)."""
+    logger.info(f"Scraping Kayak results: {url}")
+    
+    parser = KayakResultParser(max_results)
+    extractor = StreamingTextExtractor()
+    
+    def sink(chunk: bytes) -> bool:
+        extractor.feed(chunk)  # Kept as the fallback answer
+        return parser.feed(chunk)
+    
+    response = http_client.fetch(url, timeout=timeout, max_bytes=SCRAPER_MAX_BYTES, sink=sink)
+    hotels = parser.hotels()
+    if not hotels:
+        logger.warning(f"No hotel results found on {url}; returning page text")
+        return extractor.text(truncated=response.truncated)
+    
+    logger.info(f"Parsed {len(hotels)} hotels from {url} ({parser.bytes_read} bytes read)")
+    return format_hotel_table(hotels, f"Top {len(hotels)} hotels on Kayak ({url}):")
+
+
+@tool
+def scrape_website(url: str, timeout: int = 30) -> str:
+    """
+    Scrape a website and return its visible text (free, no API key).
+    
+    Args:
+        url: URL to scrape
+        timeout: Request timeout in seconds (default: 30)
+    
+    Returns:
+        Extracted text content from the webpage
+    """
+    return scrape_url_text(url, timeout)
 
 
 @tool
@@ -73,7 +149,7 @@ def scrape_kayak_hotel(url: str) -> str:
         url: Kayak hotel search URL
     
     Returns:
-        Extracted hotel information
+        Table of the top hotels (name, price, rating, area, link)
     """
-    return scrape_website(url, timeout=45)
+    return scrape_kayak_results(url)
 
@@ -1,9 +1,164 @@
-"""Google Flights search tool using fast-flights library."""
+"""Google Flights search tools using fast-flights library."""
 
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as Date, timedelta
 from langchain.tools import tool
 from fast_flights import FlightData, Passengers, Result, get_flights
-from typing import Literal
+from typing import Dict, List, Literal, Optional, Tuple
 from loguru import logger
+from tools.singleflight import single_flight
+from tools.hedging import hedged
+from tools.source_policy import source_policies
+
+
+# Flexible-date searches: lookups run at once, days searched on each side of
+# a date, and lookups per search (the cells closest to the requested dates win)
+FLIGHT_MATRIX_CONCURRENCY = int(os.getenv("FLIGHT_MATRIX_CONCURRENCY", "4"))
+FLIGHT_MATRIX_MAX_DAYS = int(os.getenv("FLIGHT_MATRIX_MAX_DAYS", "3"))
+FLIGHT_MATRIX_MAX_CELLS = int(os.getenv("FLIGHT_MATRIX_MAX_CELLS", "25"))
+
+# Fares move during the day, so looked-up flights are only reused briefly
+FLIGHT_CACHE_TTL_SECONDS = float(os.getenv("FLIGHT_CACHE_TTL_SECONDS", "600"))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "2000"))
+
+
+class FlightCache:
+    """
+    Flights per (route, dates, trip, passengers, cabin), kept for
+    FLIGHT_CACHE_TTL_SECONDS; the least recently used entries are dropped
+    beyond FLIGHT_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, list]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, flights: list):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + FLIGHT_CACHE_TTL_SECONDS, flights)
+            self._entries.move_to_end(key)
+            while len(self._entries) > FLIGHT_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "ttl_seconds": FLIGHT_CACHE_TTL_SECONDS,
+            }
+
+
+flight_cache = FlightCache()
+
+_matrix_executor: Optional[ThreadPoolExecutor] = None
+_matrix_executor_lock = threading.Lock()
+
+
+def _get_matrix_executor() -> ThreadPoolExecutor:
+    """Get the pool flexible-date lookups run on (separate from the tool executor they are called from)."""
+    global _matrix_executor
+    if _matrix_executor is None:
+        with _matrix_executor_lock:
+            if _matrix_executor is None:
+                _matrix_executor = ThreadPoolExecutor(
+                    max_workers=FLIGHT_MATRIX_CONCURRENCY, thread_name_prefix="travel-flights"
+                )
+    return _matrix_executor
+
+
+def _flight_dict(flight) -> dict:
+    """Flatten a fast-flights Flight into the fields the tools report."""
+    if isinstance(flight, dict):
+        return flight
+    arrival = flight.arrival + (f" {flight.arrival_time_ahead}" if flight.arrival_time_ahead else "")
+    return {
+        "airline": flight.name,
+        "departure_time": flight.departure,
+        "arrival_time": arrival,
+        "duration": flight.duration,
+        "price": flight.price,
+        "stops": flight.stops,
+        "is_best": flight.is_best,
+    }
+
+
+@single_flight("google_flights")
+@hedged("google_flights")
+def _fetch_flights(
+    departure: str,
+    destination: str,
+    date: str,
+    trip: str,
+    adults: int,
+    children: int,
+    cabin_class: str,
+    return_date: Optional[str] = None,
+) -> list:
+    """
+    Fetch flights for one route and date, or date pair for a round trip
+    (concurrent identical searches share one request).
+    """
+    flight_data = [FlightData(date=date, from_airport=departure, to_airport=destination)]
+    if return_date:
+        flight_data.append(FlightData(date=return_date, from_airport=destination, to_airport=departure))
+    with source_policies.get("google.com").guard():
+        try:
+            result: Result = get_flights(
+                flight_data=flight_data,
+                trip=trip,
+                seat=cabin_class,
+                passengers=Passengers(
+                    adults=adults, children=children, infants_in_seat=0, infants_on_lap=0
+                ),
+                fetch_mode="fallback",
+            )
+        except RuntimeError as e:
+            if "No flights found" not in str(e):
+                raise
+            return []
+    return [_flight_dict(flight) for flight in result.flights]
+
+
+def search_flights(
+    departure: str,
+    destination: str,
+    date: str,
+    trip: str,
+    adults: int,
+    children: int,
+    cabin_class: str,
+    return_date: Optional[str] = None,
+) -> list:
+    """Fetch flights through the short-lived flight cache."""
+    key = (departure.strip().upper(), destination.strip().upper(), date, return_date, trip, adults, children, cabin_class)
+    flights = flight_cache.get(key)
+    if flights is None:
+        flights = _fetch_flights(departure, destination, date, trip, adults, children, cabin_class, return_date)
+        if flights:  # An empty answer may be a blocked request; ask again next time
+            flight_cache.put(key, flights)
+    return flights
 
 
 @tool
@@ -34,23 +189,13 @@ def get_google_flights(
     try:
         logger.info(f"Searching flights: {departure} -> {destination} on {date}")
         
-        result: Result = get_flights(
-            flight_data=[
-                FlightData(date=date, from_airport=departure, to_airport=destination)
-            ],
-            trip=trip,
-            seat=cabin_class,
-            passengers=Passengers(
-                adults=adults, children=children, infants_in_seat=0, infants_on_lap=0
-            ),
-            fetch_mode="fallback",
-        )
+        flights = search_flights(departure, destination, date, trip, adults, children, cabin_class)
         
-        if not result.flights:
+        if not flights:
             return f"No flights found for {departure} to {destination} on {date}"
         
         formatted_flights = []
-        for i, flight in enumerate(result.flights[:5], 1):  # Top 5 flights
+        for i, flight in enumerate(flights[:5], 1):  # Top 5 flights
             flight_info = f"{i}. {flight.get('airline', 'Unknown')} - {flight.get('flight_number', 'N/A')}\n"
             flight_info += f"   Departure: {flight.get('departure_time', 'N/A')}\n"
             flight_info += f"   Arrival: {flight.get('arrival_time', 'N/A')}\n"
@@ -65,3 +210,176 @@ def get_google_flights(
         logger.error(f"Error getting flights: {e}")
         return f"Error searching flights: {str(e)}"
 
+
+def _date_window(center: str, days: int) -> List[str]:
+    """Dates from center - days to center + days (YYYY-MM-DD), leaving out past dates."""
+    start = Date.fromisoformat(center)
+    today = Date.today()
+    dates = (start + timedelta(days=offset) for offset in range(-days, days + 1))
+    return [day.isoformat() for day in dates if day >= today]
+
+
+def _matrix_cells(out_dates: List[str], return_dates: List[Optional[str]],
+                  date: str, return_date: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """Date pairs to look up, closest to the requested dates first, at most FLIGHT_MATRIX_MAX_CELLS."""
+    def distance(day: Optional[str], center: Optional[str]) -> int:
+        return abs((Date.fromisoformat(day) - Date.fromisoformat(center)).days) if day else 0
+
+    cells = [(out, ret) for out in out_dates for ret in return_dates if ret is None or ret > out]
+    cells.sort(key=lambda cell: distance(cell[0], date) + distance(cell[1], return_date))
+    return sorted(cells[:FLIGHT_MATRIX_MAX_CELLS])
+
+
+def _price_value(flight: dict) -> Optional[float]:
+    digits = re.sub(r"[^\d.]", "", str(flight.get("price", "")).replace(",", ""))
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def _cheapest(flights: list) -> Optional[dict]:
+    priced = [flight for flight in flights if _price_value(flight) is not None]
+    return min(priced, key=_price_value) if priced else None
+
+
+def _day_label(day: str, requested: Optional[str], short: bool = False) -> str:
+    label = Date.fromisoformat(day).strftime("%a %m-%d" if short else "%a %Y-%m-%d")
+    return label + ("*" if day == requested else "")
+
+
+def _stops_label(stops) -> str:
+    return "nonstop" if stops == 0 else f"{stops} stop{'s' if stops != 1 else ''}"
+
+
+@tool
+def get_flexible_flights(
+    departure: str,
+    destination: str,
+    date: str,
+    days: int = 3,
+    return_date: Optional[str] = None,
+    return_days: int = 0,
+    adults: int = 1,
+    children: int = 0,
+    cabin_class: Literal["first", "business", "premium-economy", "economy"] = "economy",
+    top_n: int = 5,
+) -> str:
+    """
+    Search flights over a window of dates in one call and show the cheapest price per day.
+    
+    Use this instead of calling get_google_flights once per date when the
+    travel dates are flexible.
+    
+    Args:
+        departure: Departure airport code (e.g., "BOM", "DEL")
+        destination: Destination airport code
+        date: Preferred departure date in YYYY-MM-DD format
+        days: Also search this many days before and after the departure date (up to 3)
+        return_date: Preferred return date in YYYY-MM-DD format (round trip); omit for one-way
+        return_days: Also search this many days before and after the return date (up to 3)
+        adults: Number of adults
+        children: Number of children
+        cabin_class: Cabin class preference
+        top_n: Number of cheapest flights to list (default: 5)
+    
+    Returns:
+        Cheapest price per departure date (a departure x return grid for
+        round trips) and the cheapest flights overall
+    """
+    try:
+        days = max(0, min(days, FLIGHT_MATRIX_MAX_DAYS))
+        return_days = max(0, min(return_days, FLIGHT_MATRIX_MAX_DAYS))
+        out_dates = _date_window(date, days)
+        return_dates = _date_window(return_date, return_days) if return_date else [None]
+        cells = _matrix_cells(out_dates, return_dates, date, return_date)
+        if not cells:
+            return f"No future dates to search around {date}" + (f" / {return_date}" if return_date else "")
+        trip = "round-trip" if return_date else "one-way"
+        logger.info(f"Flexible flight search: {departure} -> {destination}, {len(cells)} date combinations")
+
+        futures = {
+            cell: _get_matrix_executor().submit(
+                search_flights, departure, destination, cell[0], trip, adults, children, cabin_class, cell[1]
+            )
+            for cell in cells
+        }
+        cheapest: Dict[Tuple[str, Optional[str]], dict] = {}
+        offers = []
+        failed = []
+        for cell, future in futures.items():
+            try:
+                flights = future.result()
+            except Exception as e:
+                logger.error(f"Error getting flights for {cell}: {e}")
+                failed.append(cell)
+                continue
+            best = _cheapest(flights)
+            if best is not None:
+                cheapest[cell] = best
+            offers.extend((cell, flight) for flight in flights if _price_value(flight) is not None)
+
+        passengers = f"{adults} adult(s)" + (f", {children} child(ren)" if children else "")
+        lines = [f"{trip.capitalize()} flights {departure} -> {destination}, {cabin_class}, {passengers}. "
+                 f"* = requested date."]
+        if return_date:
+            columns = sorted({cell[1] for cell in cells})
+            lines.append("\nCheapest round-trip price (rows: departure, columns: return):")
+            lines.append("| Depart / Return | " + " | ".join(_day_label(day, return_date, True) for day in columns) + " |")
+            lines.append("|---" * (len(columns) + 1) + "|")
+            for out in sorted({cell[0] for cell in cells}):
+                prices = [
+                    cheapest[(out, ret)]["price"] if (out, ret) in cheapest else "-"
+                    for ret in columns
+                ]
+                lines.append(f"| {_day_label(out, date, True)} | " + " | ".join(prices) + " |")
+        else:
+            lines.append("\nCheapest flight per departure date:")
+            lines.append("| Date | Price | Airline | Departs | Stops | Duration |")
+            lines.append("|---|---|---|---|---|---|")
+            for cell in cells:
+                best = cheapest.get(cell)
+                if best is None:
+                    lines.append(f"| {_day_label(cell[0], date)} | - | - | - | - | - |")
+                    continue
+                lines.append(
+                    f"| {_day_label(cell[0], date)} | {best['price']} | {best.get('airline', '')} | "
+                    f"{best.get('departure_time', '')} | {_stops_label(best.get('stops', 0))} | {best.get('duration', '')} |"
+                )
+
+        if cheapest:
+            best_cell = min(cheapest, key=lambda cell: _price_value(cheapest[cell]))
+            summary = f"\nCheapest: depart {best_cell[0]}" + (f", return {best_cell[1]}" if best_cell[1] else "")
+            summary += f" at {cheapest[best_cell]['price']}"
+            requested = cheapest.get((date, return_date))
+            if requested is not None and best_cell != (date, return_date):
+                saving = _price_value(requested) - _price_value(cheapest[best_cell])
+                summary += f" ({saving:,.0f} less than the requested dates at {requested['price']})"
+            lines.append(summary + ".")
+
+            lines.append(f"\nTop {min(top_n, len(offers))} flights:")
+            offers.sort(key=lambda offer: _price_value(offer[1]))
+            for i, (cell, flight) in enumerate(offers[:top_n], 1):
+                dates = cell[0] + (f" / return {cell[1]}" if cell[1] else "")
+                lines.append(
+                    f"{i}. {dates}: {flight.get('airline', 'Unknown')}, {flight.get('departure_time', 'N/A')} -> "
+                    f"{flight.get('arrival_time', 'N/A')}, {flight.get('duration', 'N/A')}, "
+                    f"{_stops_label(flight.get('stops', 0))}, {flight['price']}"
+                )
+        else:
+            lines.append("\nNo flights found for any of these dates.")
+
+        if failed:
+            lines.append("\nSearch failed for: " + ", ".join(
+                cell[0] + (f"/{cell[1]}" if cell[1] else "") for cell in failed
+            ))
+        return "\n".join(lines)
+
+    except Exception as e:
+        logger.error(f"Error in flexible flight search: {e}")
+        return f"Error searching flights: {str(e)}"
+
+
+def get_flight_search_stats() -> dict:
+    """Get flight cache counters."""
+    return flight_cache.stats()
@@ -0,0 +1,209 @@
+"""Opt-in request hedging for slow external tool calls."""
+
+import os
+import time
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from loguru import logger
+from typing import Any, Callable, Dict, Optional
+
+
+# Tools to hedge, e.g. "google_flights,scraper,duckduckgo" (empty disables hedging)
+HEDGE_ENABLED_TOOLS = {
+    name.strip() for name in os.getenv("HEDGE_ENABLED_TOOLS", "").split(",") if name.strip()
+}
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """
+    Get the pool hedged attempts run on.
+
+    Separate from the tool executor: a hedged call waits on its attempts, so
+    running them on the caller's own pool could exhaust it.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="travel-hedge")
+    return _executor
+
+
+class HedgePolicy:
+    """
+    Latency tracking and hedge budget for one tool.
+
+    Keeps the latencies of the last HEDGE_WINDOW attempts; the hedge delay is
+    their HEDGE_PERCENTILE. Over the same window of calls, at most
+    HEDGE_MAX_RATE of them may launch a hedge, which caps the extra traffic.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=HEDGE_WINDOW)
+        self._recent_hedges = deque(maxlen=HEDGE_WINDOW)  # 1 if a call hedged, else 0
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.name in HEDGE_ENABLED_TOOLS
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Current hedge delay, or None while there are too few samples."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))
+        return ordered[index]
+
+    def start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire_hedge(self) -> bool:
+        """Take a hedge from the budget; False if the hedge rate cap is reached."""
+        with self._lock:
+            window_calls = len(self._recent_hedges) + 1
+            if sum(self._recent_hedges) + 1 > HEDGE_MAX_RATE * window_calls:
+                self.budget_denied += 1
+                return False
+            self._recent_hedges.append(1)
+            self.hedged += 1
+            return True
+
+    def finish_call(self, hedged: bool, hedge_won: bool):
+        with self._lock:
+            if not hedged:
+                # Hedged calls were counted when the hedge was acquired
+                self._recent_hedges.append(0)
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "budget_denied": self.budget_denied,
+                "samples": len(self._latencies),
+                "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+            }
+
+
+_policies: Dict[str, HedgePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_hedge_policy(name: str) -> HedgePolicy:
+    """Get the shared hedge policy for a tool name."""
+    with _policies_lock:
+        if name not in _policies:
+            _policies[name] = HedgePolicy(name)
+        return _policies[name]
+
+
+def _timed(policy: HedgePolicy, func: Callable[[], Any]) -> Any:
+    time_start = time.perf_counter()
+    try:
+        return func()
+    finally:
+        policy.record_latency(time.perf_counter() - time_start)
+
+
+def hedged_call(policy: HedgePolicy, func: Callable[[], Any]) -> Any:
+    """
+    Run a blocking call, launching one identical backup attempt if it is slow.
+
+    The primary attempt runs on the hedge pool. If it has not finished after
+    the policy's hedge delay and the hedge budget allows, a second attempt is
+    started; the first to succeed wins. An attempt succeeds by returning, so
+    func must raise on failure (not return an error value) or a fast error
+    would beat a slower real result. The loser is cancelled if it has not
+    started; a blocking call that is already running cannot be interrupted,
+    so its result is discarded when it finishes.
+    """
+    policy.start_call()
+    delay = policy.hedge_delay()
+    executor = _get_hedge_executor()
+    primary = executor.submit(_timed, policy, func)
+
+    if delay is None:
+        result = primary.result()
+        policy.finish_call(hedged=False, hedge_won=False)
+        return result
+
+    done, _ = wait([primary], timeout=delay)
+    if done or not policy.try_acquire_hedge():
+        result = primary.result()
+        policy.finish_call(hedged=False, hedge_won=False)
+        return result
+
+    logger.debug(f"Hedging slow {policy.name} call after {delay:.2f} seconds")
+    backup = executor.submit(_timed, policy, func)
+    attempts = [primary, backup]
+    first_error = None
+
+    while attempts:
+        done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+        for future in done:
+            attempts.remove(future)
+            if future.exception() is None:
+                for loser in attempts:
+                    loser.cancel()
+                policy.finish_call(hedged=True, hedge_won=future is backup)
+                return future.result()
+            first_error = first_error or future.exception()
+
+    policy.finish_call(hedged=True, hedge_won=False)
+    raise first_error
+
+
+def hedged(name: str):
+    """
+    Decorator that hedges a blocking tool call when hedging is enabled for name.
+
+    Calls go straight through (no extra thread) unless name is listed in
+    HEDGE_ENABLED_TOOLS.
+    """
+    def decorator(func):
+        policy = get_hedge_policy(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not policy.enabled:
+                return func(*args, **kwargs)
+            return hedged_call(policy, lambda: func(*args, **kwargs))
+
+        wrapper.hedge_policy = policy
+        return wrapper
+
+    return decorator
+
+
+def get_hedge_stats() -> dict:
+    """Get hedging counters for every tool."""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {policy.name: policy.stats() for policy in policies}
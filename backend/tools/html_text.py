@@ -0,0 +1,169 @@
+"""Streaming visible-text extraction from HTML for the scraper."""
+
+import os
+import re
+import codecs
+from html.parser import HTMLParser
+from typing import List
+
+try:
+    from lxml import etree
+except ImportError:  # Fall back to the (slower) standard library parser
+    etree = None
+
+
+SCRAPER_MAX_CHARS = int(os.getenv("SCRAPER_MAX_CHARS", "5000"))
+SCRAPER_MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", str(2 * 1024 * 1024)))
+TRUNCATION_MARK = "... [truncated]"
+
+# Subtrees whose text is never page content
+SKIP_TAGS = {"script", "style", "nav", "noscript", "template", "svg"}
+# Elements that end a line of text
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+    "section", "article", "header", "footer", "main", "aside", "table", "ul", "ol", "dd", "dt", "title",
+}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w:.-]+)""", re.IGNORECASE)
+
+
+def clean_lines(text: str) -> List[str]:
+    """Split text into stripped, non-empty phrases (one per output line)."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return [chunk for chunk in chunks if chunk]
+
+
+def sniff_encoding(head: bytes) -> str:
+    """Guess a page's encoding from a byte order mark or <meta charset> (default UTF-8)."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = _META_CHARSET.search(head[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser adapter calling the same target methods as lxml."""
+
+    def __init__(self, target: "StreamingTextExtractor"):
+        super().__init__(convert_charrefs=True)
+        self._target = target
+
+    def handle_starttag(self, tag, attrs):
+        self._target.start(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self._target.end(tag)
+
+    def handle_data(self, data):
+        self._target.data(data)
+
+
+class StreamingTextExtractor:
+    """
+    Extracts a page's visible text while it downloads.
+
+    Feed it the body chunk by chunk; it decodes incrementally, parses with
+    lxml's event-driven HTML parser (html.parser if lxml is missing) without
+    building a tree, ignores text inside script, style, nav and similar
+    subtrees, and reports when max_chars of text have been collected so the
+    caller can stop reading.
+    """
+
+    def __init__(self, max_chars: int = SCRAPER_MAX_CHARS):
+        self.max_chars = max_chars
+        self.bytes_read = 0
+        self._decoder = None
+        self._parser = etree.HTMLParser(target=self) if etree is not None else _StdlibParser(self)
+        self._skip_depth = 0
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._lines: List[str] = []
+        self._chars = 0
+
+    @property
+    def done(self) -> bool:
+        return self._chars > self.max_chars
+
+    # Parser target methods
+
+    def start(self, tag, attrib):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS and not self._skip_depth:
+            self.data("\n")
+
+    def data(self, data):
+        if not self._skip_depth:
+            self._pending.append(data)
+            self._pending_chars += len(data)
+
+    def close(self):
+        pass
+
+    def _flush(self, final: bool = False):
+        """Move complete lines of pending text into the output."""
+        text = "".join(self._pending)
+        cut = len(text) if final else text.rfind("\n") + 1
+        if not final and cut == 0 and len(text) > 4 * self.max_chars:
+            cut = len(text)  # A huge run of text without line breaks
+        self._pending = [text[cut:]] if cut < len(text) else []
+        self._pending_chars = len(text) - cut
+        for line in clean_lines(text[:cut]):
+            if self.done:
+                break
+            self._lines.append(line)
+            self._chars += len(line) + 1
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Add a chunk of the body.
+
+        Returns:
+            True once enough text has been collected (stop reading)
+        """
+        if self.done:
+            return True
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder(sniff_encoding(chunk))(errors="replace")
+        self.bytes_read += len(chunk)
+        text = self._decoder.decode(chunk)
+        if text:
+            self._parser.feed(text)
+        self._flush()
+        return self.done
+
+    def text(self, truncated: bool = False) -> str:
+        """
+        Get the extracted text.
+
+        Args:
+            truncated: The body was cut off before its end (e.g. at the byte cap)
+        """
+        if not self.done:
+            try:
+                if self._decoder is not None:
+                    tail = self._decoder.decode(b"", final=True)
+                    if tail:
+                        self._parser.feed(tail)
+                self._parser.close()
+            except Exception:
+                pass  # Unparseable trailing markup; keep the text so far
+            self._flush(final=True)
+        text = "\n".join(self._lines)
+        if len(text) > self.max_chars:
+            return text[:self.max_chars] + TRUNCATION_MARK
+        if truncated or self.done:
+            return text + TRUNCATION_MARK
+        return text
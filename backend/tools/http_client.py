@@ -0,0 +1,384 @@
+"""Shared pooled async HTTP client with ETag/Last-Modified revalidation for the scrapers."""
+
+import os
+import time
+import zlib
+import asyncio
+import sqlite3
+import threading
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import httpx
+from loguru import logger
+from typing import Callable, Dict, Optional, Tuple
+from tools.source_policy import SourcePolicy, source_policies
+
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_STREAM_CHUNK_BYTES = int(os.getenv("HTTP_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+@dataclass
+class FetchResult:
+    """A fetched page: final URL, status of the network response and body."""
+
+    url: str
+    status: int
+    content: bytes  # Empty when the body went to a sink and was not stored
+    revalidated: bool = False  # True if the server answered 304 and the stored body was used
+    truncated: bool = False  # True if reading stopped before the end of the body
+
+
+class HTTPValidatorCache:
+    """
+    Response bodies with their ETag and Last-Modified validators, in SQLite.
+
+    Only responses that carry a validator (and no Cache-Control: no-store)
+    are stored, since only those can be revalidated. Bodies are compressed;
+    the least recently used entries are evicted beyond HTTP_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self):
+        self.path = os.getenv("HTTP_CACHE_DB_PATH", "http_cache.sqlite")
+        self.max_bytes = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held; the database is opened on first use
+        if self._conn is None:
+            logger.info(f"Opening HTTP validator cache: {self.path}")
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS http_responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS http_responses_last_used ON http_responses (last_used_at)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+        return self._conn
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """Get (etag, last_modified, body) stored for a URL."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT etag, last_modified, body FROM http_responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], zlib.decompress(row[2])
+
+    def touch(self, url: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("UPDATE http_responses SET last_used_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], content: bytes):
+        body = zlib.compress(content)
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            previous = conn.execute("SELECT size FROM http_responses WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO http_responses (url, etag, last_modified, body, size, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, len(body), time.time()),
+            )
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Called with the lock held
+        evicted = []
+        for url, size in conn.execute("SELECT url, size FROM http_responses ORDER BY last_used_at").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM http_responses WHERE url = ?", evicted)
+        self.evictions += len(evicted)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._total_bytes = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"bytes": self._total_bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class PooledHTTPClient:
+    """
+    One httpx.AsyncClient shared by every scraping tool.
+
+    The client runs on its own event loop thread, so the sync tools (which
+    run on the tool executor) share its keep-alive connection pool through
+    fetch(), and async code can use afetch(). Each request goes through its
+    source's policy (tools/source_policy.py): it fails fast while the
+    source's breaker is open, else waits for one of the source's slots and
+    its turn in the source's rate. Timeouts, connection errors and 429, 403
+    and 5xx answers count as failures of the source.
+    Stored ETag/Last-Modified validators are sent as If-None-Match and
+    If-Modified-Since, and a 304 answer is served from the stored body.
+
+    Bodies are read in HTTP_STREAM_CHUNK_BYTES chunks. A fetch can cap the
+    bytes read and pass the chunks to a sink as they arrive; the sink runs
+    off the client loop and can end the download early by returning True. A
+    revalidatable body is still read to the end (within the cap) so it can
+    be stored; only complete bodies are stored.
+    """
+
+    def __init__(self):
+        self.cache = HTTPValidatorCache()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._source_slots: Dict[str, asyncio.Semaphore] = {}
+        self._stats_lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.truncated = 0
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the client's event loop thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="travel-http", daemon=True)
+                self._thread.start()
+                self._loop = loop
+                logger.info(f"Started pooled HTTP client ({HTTP_MAX_CONNECTIONS} connections)")
+            return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Called on the client loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+                ),
+            )
+        return self._client
+
+    def _host_stats(self, host: str) -> Dict[str, int]:
+        # Called with the stats lock held
+        return self._hosts.setdefault(host, {"requests": 0, "not_modified": 0, "in_flight": 0, "peak_in_flight": 0})
+
+    @staticmethod
+    def _storable(response: httpx.Response) -> bool:
+        return HTTP_CACHE_ENABLED and response.status_code == 200 \
+            and bool(response.headers.get("ETag") or response.headers.get("Last-Modified")) \
+            and "no-store" not in response.headers.get("Cache-Control", "").lower()
+
+    async def _read(self, response: httpx.Response, max_bytes: Optional[int],
+                    sink: Optional[Callable[[bytes], bool]]) -> Tuple[bytes, int, bool]:
+        """Read a body up to max_bytes, feeding the sink; returns (kept body, bytes read, truncated)."""
+        if not response.is_success:
+            return b"", 0, False
+        storable = self._storable(response)
+        keep = sink is None or storable
+        body = bytearray()
+        received = 0
+        truncated = False
+        async for chunk in response.aiter_bytes(HTTP_STREAM_CHUNK_BYTES):
+            if max_bytes is not None and received + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - received]
+                truncated = True
+            received += len(chunk)
+            if keep:
+                body += chunk
+            # Parsing is CPU work, so it runs on the loop's default executor
+            if sink is not None and await asyncio.to_thread(sink, chunk):
+                sink = None
+                if not storable:
+                    truncated = True
+            if truncated:
+                break
+        return bytes(body), received, truncated
+
+    @staticmethod
+    def _failure(response: httpx.Response) -> Tuple[Optional[str], Optional[float]]:
+        """Classify a response: (failure reason or None, Retry-After seconds)."""
+        status = response.status_code
+        if status == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            return "HTTP 429", float(retry_after) if retry_after.isdigit() else None
+        if status == 403 or status >= 500:
+            return f"HTTP {status}", None
+        return None, None
+
+    async def _request(self, url: str, timeout: float, validators: Dict[str, str], max_bytes: Optional[int],
+                       sink: Optional[Callable[[bytes], bool]]) -> Tuple[httpx.Response, bytes, int, bool]:
+        # Runs on the client loop
+        host = urlsplit(url).netloc.lower()
+        policy: SourcePolicy = source_policies.get(host)
+        probe = policy.admit()
+        outcome = False
+        try:
+            slot = self._source_slots.setdefault(policy.name, asyncio.Semaphore(policy.max_concurrency))
+            async with slot:
+                policy.recheck(probe)
+                await asyncio.sleep(policy.reserve())
+                with self._stats_lock:
+                    stats = self._host_stats(host)
+                    stats["in_flight"] += 1
+                    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+                try:
+                    async with self._get_client().stream("GET", url, headers=validators, timeout=timeout) as response:
+                        result = (response, *await self._read(response, max_bytes, sink))
+                except httpx.TransportError as e:  # Timeouts and connection errors
+                    outcome = True
+                    policy.finish(probe, type(e).__name__)
+                    raise
+                finally:
+                    with self._stats_lock:
+                        stats["in_flight"] -= 1
+            outcome = True
+            policy.finish(probe, *self._failure(response))
+            return result
+        finally:
+            if not outcome:
+                policy.abandon(probe)
+
+    def _validators(self, url: str) -> Tuple[Dict[str, str], Optional[bytes]]:
+        stored = self.cache.get(url) if HTTP_CACHE_ENABLED else None
+        if stored is None:
+            return {}, None
+        etag, last_modified, content = stored
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers, content
+
+    @staticmethod
+    def _replay(stored: bytes, max_bytes: Optional[int], sink: Callable[[bytes], bool]) -> bool:
+        """Feed a stored body to a sink like a download; returns whether it was cut short."""
+        end = len(stored) if max_bytes is None else min(len(stored), max_bytes)
+        for start in range(0, end, HTTP_STREAM_CHUNK_BYTES):
+            if sink(stored[start:min(start + HTTP_STREAM_CHUNK_BYTES, end)]):
+                return True
+        return end < len(stored)
+
+    def _finish(self, url: str, result: Tuple[httpx.Response, bytes, int, bool], stored: Optional[bytes],
+                max_bytes: Optional[int], sink: Optional[Callable[[bytes], bool]]) -> FetchResult:
+        """Serve a 304 from the stored body, or store a revalidatable 200 read to the end."""
+        response, content, received, truncated = result
+        host = urlsplit(url).netloc.lower()
+        revalidated = response.status_code == 304 and stored is not None
+        with self._stats_lock:
+            self.requests += 1
+            self._host_stats(host)["requests"] += 1
+            self.bytes_downloaded += received
+            self.truncated += truncated
+            if revalidated:
+                self.not_modified += 1
+                self.bytes_saved += len(stored)
+                self._host_stats(host)["not_modified"] += 1
+
+        if revalidated:
+            self.cache.touch(url)
+            if sink is not None:
+                return FetchResult(str(response.url), 304, stored, True, self._replay(stored, max_bytes, sink))
+            if max_bytes is not None and len(stored) > max_bytes:
+                return FetchResult(str(response.url), 304, stored[:max_bytes], True, True)
+            return FetchResult(str(response.url), 304, stored, revalidated=True)
+
+        response.raise_for_status()
+        if not truncated and self._storable(response):
+            self.cache.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), content)
+        if sink is not None and not self._storable(response):
+            content = b""
+        return FetchResult(str(response.url), response.status_code, content, truncated=truncated)
+
+    def fetch(self, url: str, timeout: float = 30, max_bytes: Optional[int] = None,
+              sink: Optional[Callable[[bytes], bool]] = None) -> FetchResult:
+        """
+        Fetch a URL through the shared client (blocking).
+
+        Args:
+            url: URL to fetch
+            timeout: Timeout in seconds for connecting and for each read
+            max_bytes: Stop reading the body after this many bytes
+            sink: Called with each body chunk; returning True stops the download
+
+        Raises:
+            httpx.TimeoutException: The request timed out
+            httpx.HTTPError: Connection error or error status
+        """
+        validators, stored = self._validators(url)
+        future = asyncio.run_coroutine_threadsafe(
+            self._request(url, timeout, validators, max_bytes, sink), self._get_loop()
+        )
+        return self._finish(url, future.result(), stored, max_bytes, sink)
+
+    async def afetch(self, url: str, timeout: float = 30, max_bytes: Optional[int] = None,
+                     sink: Optional[Callable[[bytes], bool]] = None) -> FetchResult:
+        """Async version of fetch, usable from any event loop."""
+        validators, stored = self._validators(url)
+        future = asyncio.run_coroutine_threadsafe(
+            self._request(url, timeout, validators, max_bytes, sink), self._get_loop()
+        )
+        return self._finish(url, await asyncio.wrap_future(future), stored, max_bytes, sink)
+
+    def close(self):
+        """Close the connections and stop the client loop (restarted on next use)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+            client, self._client = self._client, None
+            self._source_slots = {}
+        if loop is not None:
+            if client is not None:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+        self.cache.close()
+
+    def stats(self) -> dict:
+        """Get request, 304, byte and truncation counters, overall and per host."""
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "bytes_downloaded": self.bytes_downloaded,
+                "bytes_saved": self.bytes_saved,
+                "truncated": self.truncated,
+                "hosts": {host: dict(stats) for host, stats in self._hosts.items()},
+                "cache": self.cache.stats(),
+            }
+
+
+# Global client (the event loop thread and connections start on first use)
+http_client = PooledHTTPClient()
@@ -2,7 +2,7 @@
 
 from langchain.tools import tool
 from loguru import logger
-from tools.free_scraper import scrape_website
+from tools.free_scraper import scrape_kayak_results
 
 
 @tool
@@ -66,10 +66,11 @@ def search_kayak_hotels(
     check_out: str,
     adults: int = 1,
     children: int = 0,
-    rooms: int = 1
+    rooms: int = 1,
+    max_results: int = 10
 ) -> str:
     """
-    Search for hotels on Kayak and return results.
+    Search for hotels on Kayak and return the top results.
     
     Args:
         destination: Destination city
@@ -78,9 +79,10 @@ def search_kayak_hotels(
         adults: Number of adults
         children: Number of children
         rooms: Number of rooms
+        max_results: Number of hotels to return (default: 10)
     
     Returns:
-        Scraped hotel information
+        Table of hotels with name, price per night, rating, area and link
     """
     try:
         # Generate URL directly
@@ -95,8 +97,8 @@ def search_kayak_hotels(
         if url.startswith("Error"):
             return url
         
-        # Scrape the URL
-        return scrape_website(url, timeout=45)
+        # Scrape and parse the results page
+        return scrape_kayak_results(url, max_results=max_results, timeout=45)
         
     except Exception as e:
         logger.error(f"Error searching Kayak hotels: {e}")
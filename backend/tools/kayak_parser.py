@@ -0,0 +1,317 @@
+"""Streaming parser for Kayak hotel result pages into HotelResult records."""
+
+import re
+import json
+import codecs
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from loguru import logger
+from typing import Dict, List, Optional
+from models.travel_plan import HotelResult
+from tools.html_text import etree, sniff_encoding
+
+KAYAK_BASE_URL = "https://www.kayak.com"
+
+# Kayak's class names are generated ("FLpo-big-name", "c1XBO-price"); only the
+# part after the generated prefix is stable, so fields are matched on it.
+# Checked in order: the first field whose pattern matches a class wins.
+FIELD_CLASSES = (
+    ("location", re.compile(r"(^|-)(location-name|location|address|neighborhood)$")),
+    ("name", re.compile(r"(^|-)(big-name|hotel-name|result-name)$")),
+    ("rating", re.compile(r"(^|-)(rating-badge|rating-score|score-badge)$")),
+    ("rating_label", re.compile(r"(^|-)rating-label$")),
+    ("reviews", re.compile(r"(^|-)review-count$")),
+    ("price", re.compile(r"(^|-)price$")),
+    ("provider", re.compile(r"(^|-)provider$")),
+)
+AMENITIES_CLASS = re.compile(r"(^|-)amenities$")
+STARS_CLASS = re.compile(r"(^|-)stars$")
+RESULT_ATTRIBUTE = "data-resultid"
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+JSON_LD_TYPES = {"Hotel", "LodgingBusiness", "Hostel", "Motel", "Resort", "BedAndBreakfast"}
+
+_SPACES = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _clean(text: str) -> str:
+    return _SPACES.sub(" ", text).strip()
+
+
+def _field(classes: str) -> Optional[str]:
+    tokens = classes.split()
+    for name, pattern in FIELD_CLASSES:
+        if any(pattern.search(token) for token in tokens):
+            return name
+    return None
+
+
+def _short_url(url: str) -> str:
+    """Absolute URL without query or fragment (the tracking parameters)."""
+    parts = urlsplit(urljoin(KAYAK_BASE_URL, url))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def _hotel_from_card(card: Dict[str, str], amenities: List[str], url: str) -> Optional[HotelResult]:
+    name = _clean(card.get("name", ""))
+    if not name:
+        return None
+    rating = _clean(card.get("rating", ""))
+    if rating and card.get("rating_label"):
+        rating += f" {_clean(card['rating_label'])}"
+    reviews = _NUMBER.search(card.get("reviews", ""))
+    if rating and reviews:
+        rating += f" ({reviews.group()} reviews)"
+    if card.get("stars"):
+        rating = f"{card['stars']}-star" + (f", {rating}" if rating else "")
+    price = _clean(card.get("price", ""))
+    provider = _clean(card.get("provider", ""))
+    return HotelResult(
+        hotel_name=name,
+        price=f"{price} per night" if price else "",
+        rating=rating,
+        address=_clean(card.get("location", "")),
+        amenities=amenities,
+        description=f"Best price on {provider}" if provider else "",
+        url=_short_url(url) if url else "",
+    )
+
+
+def _hotels_from_json_ld(data) -> List[HotelResult]:
+    """Get the hotels of a JSON-LD document (a Hotel, a list, an ItemList or an @graph)."""
+    hotels = []
+    items = data if isinstance(data, list) else [data]
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        nested = item.get("@graph") or item.get("itemListElement")
+        if nested:
+            hotels.extend(_hotels_from_json_ld(nested))
+            continue
+        if item.get("@type") == "ListItem" and isinstance(item.get("item"), dict):
+            hotels.extend(_hotels_from_json_ld(item["item"]))
+            continue
+        types = item.get("@type")
+        if not set(types if isinstance(types, list) else [types]) & JSON_LD_TYPES or not item.get("name"):
+            continue
+
+        offers = item.get("offers") or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        price = ""
+        if offers.get("price"):
+            currency = offers.get("priceCurrency", "")
+            price = f"{'$' if currency == 'USD' else currency + ' '}{offers['price']} per night"
+        elif item.get("priceRange"):
+            price = str(item["priceRange"])
+
+        rating = ""
+        aggregate = item.get("aggregateRating") or {}
+        if aggregate.get("ratingValue"):
+            rating = str(aggregate["ratingValue"])
+            if aggregate.get("bestRating"):
+                rating += f"/{aggregate['bestRating']}"
+            if aggregate.get("reviewCount"):
+                rating += f" ({aggregate['reviewCount']} reviews)"
+        stars = (item.get("starRating") or {}).get("ratingValue") if isinstance(item.get("starRating"), dict) else None
+        if stars:
+            rating = f"{stars}-star" + (f", {rating}" if rating else "")
+
+        address = item.get("address") or ""
+        if isinstance(address, dict):
+            address = ", ".join(str(address[key]) for key in ("streetAddress", "addressLocality") if address.get(key))
+        amenities = [
+            feature.get("name", "") if isinstance(feature, dict) else str(feature)
+            for feature in item.get("amenityFeature") or []
+        ]
+        hotels.append(HotelResult(
+            hotel_name=_clean(str(item["name"])),
+            price=price,
+            rating=rating,
+            address=_clean(str(address)),
+            amenities=[amenity for amenity in amenities if amenity],
+            description=_clean(str(item.get("description", "")))[:200],
+            url=_short_url(item["url"]) if item.get("url") else "",
+        ))
+    return hotels
+
+
+class _StdlibParser(HTMLParser):
+    """html.parser adapter calling the same target methods as lxml."""
+
+    def __init__(self, target: "KayakResultParser"):
+        super().__init__(convert_charrefs=True)
+        self._target = target
+
+    def handle_starttag(self, tag, attrs):
+        self._target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self._target.end(tag)
+
+    def handle_data(self, data):
+        self._target.data(data)
+
+
+class KayakResultParser:
+    """
+    Extracts hotel results from a Kayak results page while it downloads.
+
+    Each result card (an element with a data-resultid attribute) becomes a
+    HotelResult: name and link, price, rating and review count, location,
+    star class, amenities and the cheapest provider, read from the elements
+    whose class names end in the stable part of Kayak's class names (see
+    FIELD_CLASSES). Hotels in JSON-LD scripts are read as well, for pages
+    that describe their results that way. Like StreamingTextExtractor, no
+    tree is built, and feed() reports when max_results hotels (of either
+    kind) are complete.
+    """
+
+    def __init__(self, max_results: int = 10):
+        self.max_results = max_results
+        self.bytes_read = 0
+        self._decoder = None
+        self._parser = etree.HTMLParser(target=self) if etree is not None else _StdlibParser(self)
+        self._depth = 0
+        self._card: Optional[Dict[str, str]] = None
+        self._card_depth = 0
+        self._card_url = ""
+        self._amenities: List[str] = []
+        self._field: Optional[str] = None
+        self._field_depth = 0
+        self._in_amenities = 0
+        self._amenity: Optional[List[str]] = None
+        self._json_ld: Optional[List[str]] = None
+        self.cards: List[HotelResult] = []
+        self.json_ld: List[HotelResult] = []
+
+    @property
+    def done(self) -> bool:
+        return max(len(self.cards), len(self.json_ld)) >= self.max_results
+
+    # Parser target methods
+
+    def start(self, tag, attrib):
+        if tag in VOID_TAGS:
+            return
+        self._depth += 1
+        if tag == "script":
+            if (attrib.get("type") or "").lower() == "application/ld+json":
+                self._json_ld = []
+            return
+        if self._card is None:
+            if RESULT_ATTRIBUTE in attrib:
+                self._card = {}
+                self._card_depth = self._depth
+                self._card_url = ""
+                self._amenities = []
+            return
+
+        classes = attrib.get("class") or ""
+        if tag == "a" and attrib.get("href") and not self._card_url and (self._field == "name" or "/hotels/" in attrib["href"]):
+            self._card_url = attrib["href"]
+        if STARS_CLASS.search(classes) and "stars" not in self._card:
+            stars = _NUMBER.search(attrib.get("aria-label") or "")
+            if stars:
+                self._card["stars"] = stars.group()
+        if AMENITIES_CLASS.search(classes):
+            self._in_amenities = self._depth
+        elif self._in_amenities and tag == "li":
+            self._amenity = []
+        if self._field is None:
+            field = _field(classes)
+            if field and field not in self._card:
+                self._field = field
+                self._field_depth = self._depth
+                self._card[field] = ""
+
+    def end(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag == "script" and self._json_ld is not None:
+            self._read_json_ld("".join(self._json_ld))
+            self._json_ld = None
+        if self._card is not None:
+            if self._field is not None and self._depth == self._field_depth:
+                self._field = None
+            if self._amenity is not None and tag == "li":
+                amenity = _clean("".join(self._amenity))
+                if amenity:
+                    self._amenities.append(amenity)
+                self._amenity = None
+            if self._in_amenities == self._depth:
+                self._in_amenities = 0
+            if self._depth == self._card_depth:
+                hotel = _hotel_from_card(self._card, self._amenities, self._card_url)
+                if hotel is not None and len(self.cards) < self.max_results:
+                    self.cards.append(hotel)
+                self._card = None
+                self._field = None
+                self._in_amenities = 0
+        self._depth = max(0, self._depth - 1)
+
+    def data(self, data):
+        if self._json_ld is not None:
+            self._json_ld.append(data)
+        elif self._card is not None:
+            if self._field is not None:
+                self._card[self._field] += data
+            elif self._amenity is not None:
+                self._amenity.append(data)
+
+    def close(self):
+        pass
+
+    def _read_json_ld(self, text: str):
+        try:
+            self.json_ld.extend(_hotels_from_json_ld(json.loads(text)))
+        except ValueError as e:
+            logger.debug(f"Skipping malformed JSON-LD on Kayak page: {e}")
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Add a chunk of the page.
+
+        Returns:
+            True once max_results hotels have been read (stop reading)
+        """
+        if self.done:
+            return True
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder(sniff_encoding(chunk))(errors="replace")
+        self.bytes_read += len(chunk)
+        text = self._decoder.decode(chunk)
+        if text:
+            self._parser.feed(text)
+        return self.done
+
+    def hotels(self) -> List[HotelResult]:
+        """Get the parsed hotels in page order, from the cards or JSON-LD (whichever has more)."""
+        if not self.done:
+            try:
+                if self._decoder is not None:
+                    tail = self._decoder.decode(b"", final=True)
+                    if tail:
+                        self._parser.feed(tail)
+                self._parser.close()
+            except Exception:
+                pass  # Unparseable trailing markup; keep the hotels so far
+        return max(self.cards, self.json_ld, key=len)[:self.max_results]
+
+
+def parse_kayak_hotels(html: bytes, max_results: int = 10) -> List[HotelResult]:
+    """Parse a complete Kayak results page."""
+    parser = KayakResultParser(max_results)
+    parser.feed(html)
+    return parser.hotels()
+
+
+def format_hotel_table(hotels: List[HotelResult], title: str = "") -> str:
+    """Render hotels as a compact markdown table (one row per hotel)."""
+    lines = [title] if title else []
+    lines.append("| # | Hotel | Price | Rating | Area | Link |")
+    lines.append("|---|---|---|---|---|---|")
+    for i, hotel in enumerate(hotels, 1):
+        cells = [hotel.hotel_name, hotel.price, hotel.rating, hotel.address, hotel.url]
+        lines.append(f"| {i} | " + " | ".join(cell.replace("|", "/") or "-" for cell in cells) + " |")
+    return "\n".join(lines)
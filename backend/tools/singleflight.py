@@ -0,0 +1,170 @@
+"""Single-flight coalescing of identical in-flight calls."""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from loguru import logger
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def normalize_arg(value: Any) -> Any:
+    """
+    Normalize a call argument for keying ("  Paris " and "paris" match).
+
+    URLs are only stripped: their paths and queries are case-sensitive.
+    """
+    if isinstance(value, str):
+        if value.lstrip().lower().startswith(("http://", "https://")):
+            return value.strip()
+        return " ".join(value.split()).lower()
+    return value
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the call; callers that arrive
+    while it is in flight wait for and share its result or exception. Nothing
+    is cached: once the call finishes, the next caller runs it again.
+
+    Works for blocking calls made from several threads (do) and for
+    coroutines on the event loop (ado).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Run a blocking call, or wait for the identical call already in flight.
+
+        Args:
+            key: Normalized call key
+            func: Zero-argument callable to run if no call is in flight
+
+        Returns:
+            The (possibly shared) result
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.debug(f"Coalesced {self.name} call: {key}")
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a coroutine, or await the identical coroutine already in flight.
+
+        The shared call runs as its own task, so a cancelled caller does not
+        cancel it for the others.
+
+        Args:
+            key: Normalized call key
+            func: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            The (possibly shared) result
+        """
+        with self._lock:
+            self.calls += 1
+            task = self._async_calls.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func())
+                self._async_calls[key] = task
+                task.add_done_callback(functools.partial(self._forget_async, key))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+                logger.debug(f"Coalesced {self.name} call: {key}")
+
+        return await asyncio.shield(task)
+
+    def _forget_async(self, key: Hashable, task: asyncio.Future):
+        with self._lock:
+            if self._async_calls.get(key) is task:
+                del self._async_calls[key]
+
+    def stats(self) -> dict:
+        """Get call counters for this group."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get the shared single-flight group for a name."""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def single_flight(name: str, key: Optional[Callable[..., Hashable]] = None):
+    """
+    Decorator that coalesces concurrent identical calls to a blocking function.
+
+    Args:
+        name: Group name used for the counters
+        key: Optional function mapping the call arguments to a key; by default
+            the function name plus the normalized arguments are used
+    """
+    def decorator(func):
+        group = get_single_flight(name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                call_key = key(*args, **kwargs)
+            else:
+                call_key = (
+                    func.__qualname__,
+                    tuple(normalize_arg(arg) for arg in args),
+                    tuple(sorted((k, normalize_arg(v)) for k, v in kwargs.items())),
+                )
+            return group.do(call_key, lambda: func(*args, **kwargs))
+
+        wrapper.single_flight = group
+        return wrapper
+
+    return decorator
+
+
+def get_single_flight_stats() -> dict:
+    """Get call counters for every single-flight group."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
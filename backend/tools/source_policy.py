@@ -0,0 +1,267 @@
+"""Per-source concurrency limits, request rates and circuit breakers for external services."""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+from loguru import logger
+from typing import Callable, Dict, Optional, Tuple
+
+
+# Per source domain: (max concurrent requests, requests per second). A host
+# uses the entry of its domain or parent domain, else the defaults below.
+# Override with e.g. SOURCE_LIMITS="kayak.com=1:0.5,duckduckgo.com=4:2"
+SOURCE_LIMITS = {
+    "kayak.com": (2, 1.0),
+    "duckduckgo.com": (4, 4.0),
+    "wikipedia.org": (6, 10.0),
+    "google.com": (4, 2.0),
+}
+DEFAULT_SOURCE_CONCURRENCY = int(os.getenv("DEFAULT_SOURCE_CONCURRENCY", "6"))
+DEFAULT_SOURCE_RATE = float(os.getenv("DEFAULT_SOURCE_RATE", "5"))
+# Bucket capacity in seconds of rate, i.e. the burst allowed after an idle period
+SOURCE_BURST_SECONDS = float(os.getenv("SOURCE_BURST_SECONDS", "2"))
+
+# Consecutive failures (timeouts, connection errors, 429/403/5xx) that open a
+# source's breaker, and how long it stays open before one probe is let through
+SOURCE_BREAKER_FAILURES = int(os.getenv("SOURCE_BREAKER_FAILURES", "5"))
+SOURCE_BREAKER_OPEN_SECONDS = float(os.getenv("SOURCE_BREAKER_OPEN_SECONDS", "60"))
+SOURCE_BREAKER_MAX_OPEN_SECONDS = float(os.getenv("SOURCE_BREAKER_MAX_OPEN_SECONDS", "600"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def load_source_limits() -> Dict[str, Tuple[int, float]]:
+    limits = dict(SOURCE_LIMITS)
+    for entry in os.getenv("SOURCE_LIMITS", "").split(","):
+        if "=" not in entry:
+            continue
+        domain, values = entry.split("=", 1)
+        concurrency, rate = values.split(":", 1)
+        limits[domain.strip().lower()] = (int(concurrency), float(rate))
+    return limits
+
+
+class SourceUnavailable(Exception):
+    """Raised instead of sending a request while a source's breaker is open."""
+
+    def __init__(self, source: str, retry_in: float):
+        self.source = source
+        self.retry_in = retry_in
+        super().__init__(
+            f"{source} is temporarily unavailable (blocked or failing); "
+            f"not retrying for {retry_in:.0f} seconds, continue without it"
+        )
+
+
+class SourcePolicy:
+    """
+    Concurrency slots, a request rate and a circuit breaker for one source.
+
+    A request first asks the breaker: while open it fails at once with
+    SourceUnavailable. After SOURCE_BREAKER_OPEN_SECONDS one probe request
+    is let through (half open); its success closes the breaker, its failure
+    opens it again for twice as long, up to SOURCE_BREAKER_MAX_OPEN_SECONDS.
+    A 429 with Retry-After keeps it open at least that long. Admitted
+    requests then wait for a concurrency slot and their turn in the rate.
+
+    Sync callers use guard(). Async callers (the HTTP client) use admit(),
+    recheck(), reserve() and finish() directly, with their own asyncio
+    semaphore of max_concurrency slots on their event loop.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, rate: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._threads = threading.BoundedSemaphore(self.max_concurrency)
+        self._capacity = max(1.0, rate * SOURCE_BURST_SECONDS)
+        self._level = self._capacity
+        self._updated = time.monotonic()
+        self.state = CLOSED
+        self._open_until = 0.0
+        self._open_seconds = SOURCE_BREAKER_OPEN_SECONDS
+        self._probing = False
+        self.consecutive_failures = 0
+        self.last_failure: Optional[str] = None
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self.wait_seconds = 0.0
+
+    def _reject(self, now: float):
+        # Called with the lock held
+        self.rejected += 1
+        raise SourceUnavailable(self.name, max(0.0, self._open_until - now))
+
+    def admit(self) -> bool:
+        """
+        Check the breaker before a request.
+
+        Returns:
+            True if the request is the half-open probe
+
+        Raises:
+            SourceUnavailable: The breaker is open (or a probe is already out)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    self._reject(now)
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    self._reject(now)
+                self._probing = True
+                return True
+            return False
+
+    def recheck(self, probe: bool):
+        """Check the breaker again once a slot is free (it may have opened meanwhile)."""
+        with self._lock:
+            if self.state != CLOSED and not probe:
+                self._reject(time.monotonic())
+
+    def reserve(self) -> float:
+        """Take one request from the rate; returns the seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate <= 0:
+                return 0.0
+            self._level = min(self._capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            # The level may go negative; later requests then wait for the debt to refill
+            self._level -= 1
+            wait = max(0.0, -self._level / self.rate)
+            self.wait_seconds += wait
+            return wait
+
+    def finish(self, probe: bool, failure: Optional[str] = None, retry_after: Optional[float] = None):
+        """
+        Record a request's outcome.
+
+        Args:
+            probe: The request was the half-open probe
+            failure: Why the request failed (None on success)
+            retry_after: Seconds the source asked us to wait (429 Retry-After)
+        """
+        with self._lock:
+            self.requests += 1
+            if failure is None:
+                if probe or self.state == HALF_OPEN:
+                    logger.info(f"Source {self.name} recovered; circuit closed")
+                self.state = CLOSED
+                self._probing = False
+                self._open_seconds = SOURCE_BREAKER_OPEN_SECONDS
+                self.consecutive_failures = 0
+                return
+
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = failure
+            now = time.monotonic()
+            if probe:
+                self._open_seconds = min(SOURCE_BREAKER_MAX_OPEN_SECONDS, self._open_seconds * 2)
+            elif self.state == OPEN or self.consecutive_failures < SOURCE_BREAKER_FAILURES:
+                return
+            open_seconds = max(self._open_seconds, retry_after or 0.0)
+            self.state = OPEN
+            self._probing = False
+            self._open_until = now + open_seconds
+            self.opened += 1
+        logger.warning(
+            f"Source {self.name} failing ({failure}, {self.consecutive_failures} in a row); "
+            f"circuit open for {open_seconds:.0f} seconds"
+        )
+
+    def abandon(self, probe: bool):
+        """Release a request that ended without an outcome (e.g. cancelled)."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    @contextmanager
+    def guard(self, is_failure: Callable[[Exception], bool] = lambda e: True):
+        """
+        Run a sync request under this policy.
+
+        The block's exceptions are recorded as failures if is_failure says
+        so (else as successes, e.g. "no results") and re-raised.
+
+        Raises:
+            SourceUnavailable: The breaker is open
+        """
+        probe = self.admit()
+        try:
+            with self._threads:
+                self.recheck(probe)
+                time.sleep(self.reserve())
+                try:
+                    yield
+                except Exception as e:
+                    self.finish(probe, type(e).__name__ if is_failure(e) else None)
+                    raise
+                self.finish(probe)
+        except SourceUnavailable:
+            self.abandon(probe)
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "state": self.state,
+                "open_for_seconds": round(max(0.0, self._open_until - now), 1) if self.state == OPEN else 0,
+                "max_concurrency": self.max_concurrency,
+                "rate_per_second": self.rate,
+                "requests": self.requests,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_failure": self.last_failure,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class SourcePolicies:
+    """Policies by source domain; hosts without a configured domain get their own default policy."""
+
+    def __init__(self):
+        self._limits = load_source_limits()
+        self._lock = threading.Lock()
+        self._policies: Dict[str, SourcePolicy] = {}
+
+    def _source(self, host: str) -> str:
+        host = host.lower().split(":", 1)[0]
+        parts = host.split(".")
+        for i in range(len(parts) - 1):
+            domain = ".".join(parts[i:])
+            if domain in self._limits:
+                return domain
+        return host[4:] if host.startswith("www.") else host
+
+    def get(self, host: str) -> SourcePolicy:
+        """Get the policy for a host (or a configured domain such as "duckduckgo.com")."""
+        source = self._source(host)
+        with self._lock:
+            policy = self._policies.get(source)
+            if policy is None:
+                concurrency, rate = self._limits.get(source, (DEFAULT_SOURCE_CONCURRENCY, DEFAULT_SOURCE_RATE))
+                policy = self._policies[source] = SourcePolicy(source, concurrency, rate)
+            return policy
+
+    def stats(self) -> dict:
+        with self._lock:
+            policies = dict(self._policies)
+        return {source: policy.stats() for source, policy in policies.items()}
+
+
+# Global policies, shared by the HTTP client and the search tools
+source_policies = SourcePolicies()
@@ -0,0 +1,225 @@
+"""Local SQLite FTS5 index of Wikipedia page summaries."""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from loguru import logger
+from typing import Iterable, Optional, Tuple
+
+
+WIKIPEDIA_INDEX_ENABLED = os.getenv("WIKIPEDIA_INDEX_ENABLED", "true").lower() == "true"
+
+# Words that describe the kind of lookup rather than the page being looked up
+QUERY_STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "to", "for", "travel", "tourism", "tourist", "guide",
+    "information", "info", "about", "visit", "visiting",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+def normalize_key(text: str) -> str:
+    """Normalize a title or query for exact matching."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def first_sentences(text: str, sentences: int) -> str:
+    """Get the first sentences of a summary (all of it if sentences is 0)."""
+    if sentences <= 0:
+        return text
+    return " ".join(_SENTENCE_END.split(text.strip())[:sentences])
+
+
+class WikipediaIndex:
+    """
+    Page summaries stored in SQLite, searchable with FTS5.
+
+    The index is filled from a Wikipedia abstracts or extracts dump (see
+    build_wikipedia_index.py) and by the tools writing back pages they had
+    to fetch live. Lookups try, in order: the query as a page title, the
+    query as an earlier live lookup (alias), and an FTS5 search over the
+    dump pages requiring every significant query word in the title, ranked
+    by BM25. Pages fetched live are only found by their title or the exact
+    query that found them: a live search for "Paris travel tourism" may
+    return "Tourism in Paris", which is no answer to "Paris". Anything
+    looser is a miss, so the tools fall back to the live API rather than
+    answering with the wrong page.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("WIKIPEDIA_INDEX_PATH", "wikipedia_index.sqlite")
+        self.enabled = WIKIPEDIA_INDEX_ENABLED
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held; the database is opened on first use
+        if self._conn is None:
+            logger.info(f"Opening Wikipedia index: {self.path}")
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY,
+                    title_key TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS aliases (
+                    query_key TEXT PRIMARY KEY,
+                    page_id INTEGER NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+                    title, summary, content='pages', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+                    INSERT INTO pages_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+                    INSERT INTO pages_fts (pages_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+                    INSERT INTO pages_fts (pages_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+                    INSERT INTO pages_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def _match_query(query: str) -> Optional[str]:
+        words = [word for word in normalize_key(query).split() if word not in QUERY_STOPWORDS]
+        if not words:
+            return None
+        # Quoted so FTS5 operators in user text are taken literally
+        return " AND ".join(f'title:"{word}"' for word in words)
+
+    def lookup(self, query: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Find the page for a query.
+
+        Returns:
+            (title, summary, url), or None on a miss
+        """
+        if not self.enabled:
+            return None
+        key = normalize_key(query)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT title, summary, url FROM pages WHERE title_key = ?", (key,)).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT p.title, p.summary, p.url FROM aliases a JOIN pages p ON p.id = a.page_id "
+                    "WHERE a.query_key = ?",
+                    (key,),
+                ).fetchone()
+            match = self._match_query(query)
+            if row is None and match:
+                row = conn.execute(
+                    "SELECT p.title, p.summary, p.url FROM pages_fts f JOIN pages p ON p.id = f.rowid "
+                    "WHERE pages_fts MATCH ? AND p.source = 'dump' ORDER BY bm25(pages_fts, 10.0, 1.0) LIMIT 1",
+                    (match,),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return row
+
+    def put(self, title: str, summary: str, url: str, source: str = "live", queries: Iterable[str] = ()):
+        """
+        Store a page summary and the queries that led to it.
+
+        Args:
+            title: Page title
+            summary: Page summary (the lead section)
+            url: Page URL
+            source: "dump" or "live"
+            queries: Lookups that should find this page from now on
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            page_id = self._upsert(conn, title, summary, url, source)
+            conn.executemany(
+                "INSERT OR REPLACE INTO aliases (query_key, page_id) VALUES (?, ?)",
+                [(normalize_key(query), page_id) for query in queries if normalize_key(query)],
+            )
+            conn.commit()
+            self.writes += 1
+
+    def put_many(self, pages: Iterable[Tuple[str, str, str]], source: str = "dump", batch_size: int = 5000) -> int:
+        """
+        Bulk-load (title, summary, url) pages, committing every batch_size pages.
+
+        Returns:
+            Number of pages stored
+        """
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            for title, summary, url in pages:
+                self._upsert(conn, title, summary, url, source)
+                count += 1
+                if count % batch_size == 0:
+                    conn.commit()
+                    logger.info(f"Indexed {count} Wikipedia pages")
+            conn.commit()
+            self.writes += count
+        return count
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, title: str, summary: str, url: str, source: str) -> int:
+        # Called with the lock held
+        conn.execute(
+            "INSERT INTO pages (title_key, title, summary, url, source, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (title_key) DO UPDATE SET title = excluded.title, summary = excluded.summary, "
+            "url = excluded.url, source = excluded.source, updated_at = excluded.updated_at",
+            (normalize_key(title), title, summary, url, source, time.time()),
+        )
+        return conn.execute("SELECT id FROM pages WHERE title_key = ?", (normalize_key(title),)).fetchone()[0]
+
+    def optimize(self):
+        """Merge the FTS5 index segments (run after a bulk load)."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("INSERT INTO pages_fts (pages_fts) VALUES ('optimize')")
+            conn.commit()
+
+    def close(self):
+        """Close the database (it is reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        """Get hit/miss counters and the number of indexed pages."""
+        with self._lock:
+            pages = None
+            if self._conn is not None:
+                pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "pages": pages,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+# Global index instance (the database is opened on first use)
+wikipedia_index = WikipediaIndex()
@@ -4,6 +4,76 @@ from langchain.tools import tool
 import wikipedia
 from loguru import logger
 from typing import Optional
+from tools.singleflight import single_flight
+from tools.source_policy import source_policies
+from tools.wikipedia_index import wikipedia_index, first_sentences
+
+
+def _is_wikipedia_failure(error: Exception) -> bool:
+    """Whether a wikipedia error says the source is failing (an ambiguous or missing page does not)."""
+    return not isinstance(error, (wikipedia.exceptions.DisambiguationError, wikipedia.exceptions.PageError))
+
+
+@single_flight("wikipedia")
+def _wikipedia_search(query: str, results: int = 1) -> list:
+    """
+    Search Wikipedia titles (concurrent identical searches share one request).
+
+    Live requests go through the wikipedia.org source policy, like the
+    article fetches below.
+    """
+    with source_policies.get("wikipedia.org").guard(is_failure=_is_wikipedia_failure):
+        return wikipedia.search(query, results=results)
+
+
+@single_flight("wikipedia")
+def _wikipedia_article(title: str) -> tuple:
+    """
+    Fetch an article's page and full summary (concurrent identical fetches share one request).
+
+    Returns:
+        (title, summary, url)
+    """
+    with source_policies.get("wikipedia.org").guard(is_failure=_is_wikipedia_failure):
+        page = wikipedia.page(title)
+        summary = wikipedia.summary(title, sentences=0)
+    return page.title, summary, page.url
+
+
+def _format_article(title: str, summary: str, url: str, sentences: int) -> str:
+    return f"Title: {title}\n\n{first_sentences(summary, sentences)}\n\nURL: {url}"
+
+
+def _indexed_article(lookup: str) -> Optional[tuple]:
+    """Get (title, summary, url) from the local index, or None on a miss or index error."""
+    try:
+        return wikipedia_index.lookup(lookup)
+    except Exception as e:
+        logger.warning(f"Wikipedia index lookup failed, using the live API: {e}")
+        return None
+
+
+def _live_article(search_query: str) -> Optional[tuple]:
+    """
+    Search and fetch an article live, and write it back to the local index
+    (found from then on by its title or by search_query).
+
+    Raises:
+        wikipedia.exceptions.DisambiguationError: The best match is a disambiguation page
+    """
+    search_results = _wikipedia_search(search_query, results=1)
+    if not search_results:
+        return None
+    try:
+        article = _wikipedia_article(search_results[0])
+    except wikipedia.exceptions.DisambiguationError as e:
+        # If disambiguation, use first option
+        article = _wikipedia_article(e.options[0])
+    try:
+        wikipedia_index.put(*article, source="live", queries=[search_query])
+    except Exception as e:
+        logger.warning(f"Could not write Wikipedia article to the index: {e}")
+    return article
 
 
 @tool
@@ -21,27 +91,17 @@ def wikipedia_search(query: str, sentences: int = 5) -> str:
     try:
         logger.info(f"Wikipedia search: {query}")
         
-        # Search for pages
-        search_results = wikipedia.search(query, results=1)
+        # Local index first; the live API only on a miss
+        article = _indexed_article(query) or _live_article(query)
         
-        if not search_results:
+        if not article:
             return f"No Wikipedia article found for: {query}"
         
-        # Get page summary
-        page = wikipedia.page(search_results[0])
-        summary = wikipedia.summary(search_results[0], sentences=sentences)
-        
-        return f"Title: {page.title}\n\n{summary}\n\nURL: {page.url}"
+        return _format_article(*article, sentences)
         
     except wikipedia.exceptions.DisambiguationError as e:
-        # If disambiguation, use first option
-        try:
-            page = wikipedia.page(e.options[0])
-            summary = wikipedia.summary(e.options[0], sentences=sentences)
-            return f"Title: {page.title}\n\n{summary}\n\nURL: {page.url}"
-        except Exception as e2:
-            logger.error(f"Error in Wikipedia disambiguation: {e2}")
-            return f"Multiple options found for {query}. Please be more specific."
+        logger.error(f"Error in Wikipedia disambiguation: {e}")
+        return f"Multiple options found for {query}. Please be more specific."
     
     except Exception as e:
         logger.error(f"Error in Wikipedia search: {e}")
@@ -63,29 +123,21 @@ def wikipedia_destination_info(destination: str) -> str:
     try:
         logger.info(f"Wikipedia destination search: {destination}")
         
-        # Search for pages
-        search_results = wikipedia.search(f"{destination} travel tourism", results=1)
+        # Local index first; the live API only on a miss. Both use the query
+        # actually searched, so the page found for it (e.g. "Tourism in Paris")
+        # is not stored as the answer to the bare destination
+        search_query = f"{destination} travel tourism"
+        article = _indexed_article(search_query) or _live_article(search_query)
         
-        if not search_results:
+        if not article:
             return f"No Wikipedia article found for: {destination}"
         
-        # Get page summary
-        page = wikipedia.page(search_results[0])
-        summary = wikipedia.summary(search_results[0], sentences=10)
-        
-        return f"Title: {page.title}\n\n{summary}\n\nURL: {page.url}"
+        return _format_article(*article, 10)
         
     except wikipedia.exceptions.DisambiguationError as e:
-        # If disambiguation, use first option
-        try:
-            page = wikipedia.page(e.options[0])
-            summary = wikipedia.summary(e.options[0], sentences=10)
-            return f"Title: {page.title}\n\n{summary}\n\nURL: {page.url}"
-        except Exception as e2:
-            logger.error(f"Error in Wikipedia disambiguation: {e2}")
-            return f"Multiple options found for {destination}. Please be more specific."
+        logger.error(f"Error in Wikipedia disambiguation: {e}")
+        return f"Multiple options found for {destination}. Please be more specific."
     
     except Exception as e:
         logger.error(f"Error in Wikipedia destination search: {e}")
         return f"Error searching Wikipedia: {str(e)}"
-